@@ -41,7 +41,7 @@ bolts = [boltAnim0, boltAnim1, boltAnim2, boltAnim3, boltAnim4]
 
 # supply a "start time" argument to play() so that the bolt animations are
 # all in sync with each other.
-rightNow = time.time()
+rightNow = pyganim.TIME_FUNC()
 for i in range(len(bolts)):
     if i == 2:
         continue # we're not going to call play() on boltAnim2
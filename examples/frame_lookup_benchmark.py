@@ -0,0 +1,64 @@
+"""
+This example measures how long it takes to find the current frame of an animation, comparing the binary search that findStartTime() used to do with the lookup tables that PygAnimation objects use now.
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath('..'))
+
+import timeit
+import pyganim
+
+NUM_LOOKUPS = 200000
+
+def oldFindStartTime(startTimes, target):
+    # findStartTime() as it was before the lookup tables were added.
+    assert startTimes[0] == 0, 'The first value in the start times list should always be 0.'
+    lb = 0 # "lb" is lower bound
+    ub = len(startTimes) - 1 # "ub" is upper bound
+
+    # handle special cases:
+    if len(startTimes) == 0:
+        return 0
+    if target >= startTimes[-1]:
+        return ub - 1
+
+    # perform binary search:
+    while True:
+        i = int((ub - lb) / 2) + lb
+
+        if startTimes[i] == target or (startTimes[i] < target and startTimes[i+1] > target):
+            if i == len(startTimes):
+                return i - 1
+            else:
+                return i
+
+        if startTimes[i] < target:
+            lb = i
+        elif startTimes[i] > target:
+            ub = i
+
+animations = [('10 frames of 100 ms', [100] * 10),
+              ('8 mixed durations', [80, 120, 40, 200, 80, 80, 160, 40]),
+              ('5000 mixed durations', [17, 33, 50, 1000] * 1250)]
+
+for description, durations in animations:
+    startTimes = pyganim._getStartTimes(durations)
+    lookup = pyganim._FrameLookup(startTimes)
+    # targets advance like a game loop at 60 FPS, wrapping around like a looping animation
+    targets = [(i * 16) % startTimes[-1] for i in range(1000)]
+
+    def runOld():
+        for target in targets:
+            oldFindStartTime(startTimes, target)
+    def runNew():
+        for target in targets:
+            pyganim.findStartTime(startTimes, target)
+    def runLookup():
+        for target in targets:
+            lookup.find(target)
+
+    print('%s:' % (description))
+    for name, func in (('old findStartTime()', runOld), ('new findStartTime()', runNew), ('_FrameLookup.find()', runLookup)):
+        seconds = min(timeit.repeat(func, number=NUM_LOOKUPS // len(targets), repeat=3))
+        print('    %-20s %6.0f ns per lookup' % (name, seconds * 1000000000 / NUM_LOOKUPS))
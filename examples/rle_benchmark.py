@@ -0,0 +1,49 @@
+"""
+This example measures how many frames per second can be blitted from colorkeyed pixel art animations, with and without RLE acceleration (the colorkey option of PygAnimation and getImagesFromSpriteSheet()).
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath('..'))
+
+import pygame
+import time
+import pyganim
+
+pygame.init()
+
+NUM_BLITS = 20000
+
+windowSurface = pygame.display.set_mode((640, 480), 0, 32)
+pygame.display.set_caption('Pyganim RLE Benchmark')
+
+def loadFrames():
+    # the crono sprites are GIFs with a solid background color, like most pixel art
+    frames = []
+    for num in range(6):
+        surf = pygame.image.load('gameimages/crono_front_walk.%s.gif' % (str(num).rjust(3, '0'))).convert()
+        surf = pygame.transform.scale(surf, (surf.get_width() * 4, surf.get_height() * 4))
+        frames.append((surf, 100))
+    return frames
+
+def blitsPerSecond(animObj):
+    animObj.play()
+    startTime = time.time()
+    for i in range(NUM_BLITS):
+        animObj.blitFrameNum(i % animObj.numFrames, windowSurface, ((i * 7) % 500, (i * 13) % 350))
+    return NUM_BLITS / (time.time() - startTime)
+
+colorkey = loadFrames()[0][0].get_at((0, 0)) # the background color in the top left corner
+
+plainAnim = pyganim.PygAnimation(loadFrames())
+for surf in plainAnim._images:
+    surf.set_colorkey(colorkey) # a colorkey without RLE acceleration
+rleAnim = pyganim.PygAnimation(loadFrames(), colorkey=colorkey)
+
+blitsPerSecond(rleAnim) # the first blit of each frame does the RLE encoding
+
+plainRate = blitsPerSecond(plainAnim)
+rleRate = blitsPerSecond(rleAnim)
+print('Colorkey without RLE: %8.0f blits per second' % (plainRate))
+print('Colorkey with RLE:    %8.0f blits per second (%.1fx)' % (rleRate, rleRate / plainRate))
+pygame.quit()
@@ -1,5 +1,5 @@
 """
-This example shows how Pyganim can be used with "simulation time", instead of the actual system clock time as returned by time.time()
+This example shows how Pyganim can be used with "simulation time", instead of the actual system clock time, by giving the animations a pyganim.VirtualClock
 """
 
 import sys
@@ -50,8 +50,8 @@ mainClock = pygame.time.Clock()
 
 
 simulationTime = 0 # this is the variable that contains the current "simulation time"
-simulationClockFunction = lambda: simulationTime
-pyganim.TIME_FUNC = simulationClockFunction
+simulationClock = pyganim.VirtualClock(simulationTime) # only the conductor's animations use this clock, other animations still use the system clock
+moveConductor.clock = simulationClock
 moveConductor.play()
 
 def getPositionAtTime(t):
@@ -88,6 +88,7 @@ while True:
             if not (200 <= mousex < 300) or not (390 <= mousey < 430):
                 continue
             simulationTime = mousex - 200
+            simulationClock.setTime(simulationTime)
 
         elif event.type == MOUSEBUTTONUP:
             mouseDown = False
@@ -98,6 +99,7 @@ while True:
             if not (200 <= mousex < 300) or not (390 <= mousey < 430):
                 continue
             simulationTime = mousex - 200
+            simulationClock.setTime(simulationTime)
 
 
     # draw scene
@@ -13,7 +13,6 @@
 #
 
 
-# TODO: Feature idea: if the same image file is specified, re-use the Surface object. (Make this optional though.)
 # TODO: Dynamically change durations and number of frames.
 
 __version__ = '0.9.2'
@@ -21,6 +20,16 @@ __version__ = '0.9.2'
 import pygame
 import time
 import os
+import collections
+import threading
+import weakref
+import struct
+import io
+import math
+import hashlib
+import json
+import bisect
+import array
 
 
 # setting up constants
@@ -39,19 +48,452 @@ SW = SOUTHWEST = 'sw'
 S = SOUTH = 's'
 SE = SOUTHEAST = 'se'
 
-TIME_FUNC = lambda: int(time.time() * 1000)
+# A monotonic clock in integer nanoseconds. Unlike time.time(), it doesn't
+# jump when the system clock is adjusted.
+if hasattr(time, 'perf_counter_ns'):
+    _monotonicNs = time.perf_counter_ns
+else:
+    _monotonicClock = getattr(time, 'perf_counter', None) or getattr(time, 'monotonic', None) or time.time # (Python 2 only has time.time())
+    _monotonicNs = lambda: int(_monotonicClock() * 1000000000)
+
+def _defaultTimeFunc():
+    # The current time in milliseconds, from the monotonic clock.
+    return _monotonicNs() // 1000000
+
+# The clock that animations use, in milliseconds. This can be replaced (for
+# example, with a simulation clock). Internally, animations keep time in
+# integer nanoseconds: with the default TIME_FUNC they read the monotonic
+# clock directly, and with any other function they use TIME_FUNC() * 1000000.
+TIME_FUNC = _defaultTimeFunc
+
+# The time (in nanoseconds) sampled by beginFrame() for the current game loop
+# iteration, or None outside of beginFrame()/endFrame().
+_frameTimeNs = None
+
+# Maps the id of a playhead to the pyganim.events.EventScheduler that has
+# events for it. (Playheads call the scheduler from _timingChanged().)
+_scheduledPlayheads = {}
+
+# A high resolution timer (in seconds) used for measuring how long loading takes.
+_perfCounter = getattr(time, 'perf_counter', time.time)
 
 DEFAULT_DURATION = 100 # 100ms
 
-def getImagesFromSpriteSheet(filename, width=None, height=None, rows=None, cols=None, rects=None):
+# The most entries that an animation's frame lookup table can have. Animations
+# with mixed durations get a table of which frame is shown in each slice of
+# time (the slices are the greatest common divisor of the durations), which
+# makes finding the current frame constant time. Longer animations use a
+# binary search instead.
+LOOKUP_TABLE_SIZE = 4096
+
+# The extensions of image files that PygAnimation's constructor loads as
+# animations (through Pillow) when passed a single filename.
+_ANIMATION_EXTENSIONS = ('.gif', '.png', '.apng', '.webp')
+
+# The number of decoded frames that lazily-loaded animations keep in memory.
+LAZY_WINDOW = 8
+
+# If True, getImagesFromSpriteSheet() remembers the Surfaces it slices from
+# each sheet, so slicing the same sheet the same way again costs nothing.
+# (The Surfaces are then shared by everything that slices the sheet that way.)
+CACHE_SPRITE_SHEETS = False
+
+# If True, cells of a sprite sheet sliced by width/height or rows/cols that
+# are fully transparent or a single solid color are left out. (This changes
+# the frame numbers of the cells after a blank one.)
+SKIP_BLANK_CELLS = False
+
+# Set this to an ImageCache object to have frames loaded by filename share
+# their Surface objects. When None, every filename is loaded from disk.
+IMAGE_CACHE = None
+
+# The default for PygAnimation's convert parameter. If True, frames that are
+# loaded from image files are converted to the display's pixel format once,
+# when they're loaded, so they don't have to be converted on every blit.
+CONVERT_FRAMES = False
+
+# The default for PygAnimation's dedupe parameter. If True, new animations
+# call dedupe() on themselves, so identical frames share one Surface object
+# (even across different animations) and repeated frames are merged.
+DEDUPE_FRAMES = False
+
+# Maps a hash of a frame's pixels and pixel format to the Surface that
+# dedupe() uses for every frame with those pixels. Surfaces are dropped from
+# it once no animation uses them.
+_frameRegistry = weakref.WeakValueDictionary()
+
+# The default for PygAnimation's trim parameter. If True, new animations call
+# trim() on themselves, so the transparent borders of frames aren't stored or drawn.
+TRIM_FRAMES = False
+
+
+class ImageCache(object):
+    # A reference-counted cache of the Surface objects loaded from image files.
+    # Loading the same file again returns the same Surface object, so fifty
+    # PygAnimation objects made from the same files share one copy of each image.
+    #
+    # Entries are keyed by the file's resolved path and modification time, so
+    # a file that changes on disk is loaded again. (Images converted to the
+    # display's pixel format are cached separately from unconverted ones.) Each PygAnimation holds a
+    # reference to the entries it uses. Entries that are no longer referenced
+    # are evicted, least recently used first, whenever the cache holds more
+    # than maxBytes of pixel data. (Pass None for maxBytes for no limit.)
+    #
+    # NOTE: Since the Surface objects are shared, drawing on one of them
+    # changes it for every animation that uses the file.
+    def __init__(self, maxBytes=64 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict() # maps key to [surface, numBytes, refCount], least recently used first
+        self._currentKeys = {} # maps (resolved path, convert) to the key for its current mtime
+        self._owners = {} # maps id of owner to (weakref to owner, list of keys)
+        self._numBytes = 0
+        self._lock = threading.RLock()
+
+
+    def load(self, filename, owner=None, convert=False):
+        # Returns the Surface object for the image file, loading it if it isn't
+        # in the cache. If owner is given (usually a PygAnimation object), the
+        # entry is kept until the owner is released or garbage collected. If
+        # convert is True, the image is converted to the display's pixel format
+        # (see convertFrame()).
+        path = os.path.realpath(filename)
+        key = ((path, convert), os.path.getmtime(path))
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                surf = pygame.image.load(filename)
+                if convert:
+                    surf = convertFrame(surf)
+                entry = [surf, surf.get_pitch() * surf.get_height(), 0]
+                self._numBytes += entry[1]
+
+                staleKey = self._currentKeys.get(key[0])
+                self._currentKeys[key[0]] = key
+                if staleKey is not None and staleKey in self._entries and self._entries[staleKey][2] == 0:
+                    self._remove(staleKey) # the file changed on disk, so the old image is of no further use
+            else:
+                self.hits += 1
+            self._entries[key] = entry # (re)inserting moves the key to the most recently used end
+
+            if owner is not None:
+                self._ownerKeys(owner).append(key)
+                entry[2] += 1
+
+            self._evict()
+            return entry[0]
+
+
+    def copyReferences(self, fromOwner, toOwner):
+        # Gives toOwner a reference to every entry that fromOwner references.
+        # (getCopies() uses this since the copies share the original's Surfaces.)
+        with self._lock:
+            if id(fromOwner) not in self._owners:
+                return
+            keys = self._owners[id(fromOwner)][1]
+            toKeys = self._ownerKeys(toOwner)
+            for key in keys:
+                if key in self._entries:
+                    toKeys.append(key)
+                    self._entries[key][2] += 1
+
+
+    def release(self, owner):
+        # Drops all of the references that owner holds. This happens
+        # automatically when the owner is garbage collected.
+        self._releaseOwnerId(id(owner))
+
+
+    def clear(self):
+        # Removes every entry from the cache. Surfaces already handed out are
+        # not affected.
+        with self._lock:
+            self._entries.clear()
+            self._currentKeys.clear()
+            self._owners.clear()
+            self._numBytes = 0
+
+
+    def getInfo(self):
+        # Returns a dict describing the cache's current size and hit rate.
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'bytes': self._numBytes,
+                    'maxBytes': self.maxBytes,
+                    'referencedEntries': len([e for e in self._entries.values() if e[2] > 0]),
+                    'hits': self.hits,
+                    'misses': self.misses}
+
+
+    def _ownerKeys(self, owner):
+        # Internal-method. Returns the list of keys referenced by owner, and
+        # starts watching for owner to be garbage collected.
+        ownerId = id(owner)
+        if ownerId not in self._owners:
+            ref = weakref.ref(owner, lambda ref, ownerId=ownerId: self._releaseOwnerId(ownerId))
+            self._owners[ownerId] = (ref, [])
+        return self._owners[ownerId][1]
+
+
+    def _releaseOwnerId(self, ownerId):
+        # Internal-method. Drops the references held by the owner with this id.
+        with self._lock:
+            ref, keys = self._owners.pop(ownerId, (None, []))
+            for key in keys:
+                if key not in self._entries:
+                    continue # already removed by clear() or a stale reload
+                entry = self._entries[key]
+                entry[2] -= 1
+                if entry[2] == 0 and self._currentKeys.get(key[0]) != key:
+                    self._remove(key) # unreferenced copy of an image that has since changed on disk
+            self._evict()
+
+
+    def _evict(self):
+        # Internal-method. Removes unreferenced entries, least recently used
+        # first, until the cache is within its byte budget.
+        if self.maxBytes is None:
+            return
+        for key in list(self._entries.keys()):
+            if self._numBytes <= self.maxBytes:
+                break
+            if self._entries[key][2] == 0:
+                self._remove(key)
+
+
+    def _remove(self, key):
+        # Internal-method. Removes the entry for key from the cache.
+        entry = self._entries.pop(key)
+        self._numBytes -= entry[1]
+        if self._currentKeys.get(key[0]) == key:
+            del self._currentKeys[key[0]]
+
+
+def _loadImage(filename, owner=None, convert=False):
+    # Loads an image file into a Surface, going through IMAGE_CACHE if it is set.
+    if IMAGE_CACHE is None:
+        surf = pygame.image.load(filename)
+        return convertFrame(surf) if convert else surf
+    return IMAGE_CACHE.load(filename, owner, convert)
+
+
+def convertFrame(surf):
+    """Returns a copy of surf in the display's pixel format, which is the
+    fastest format to blit to the display.
+
+    Surfaces whose pixels are all fully opaque are converted with convert(),
+    even if they have an alpha channel. Surfaces with pixels that are actually
+    transparent or translucent are converted with convert_alpha(). Surfaces
+    with a colorkey are converted with convert() and get RLE acceleration for
+    their colorkey.
+
+    If no display mode has been set, surf is returned as it is.
+    """
+    if pygame.display.get_surface() is None:
+        return surf
+    if _usesAlpha(surf):
+        return surf.convert_alpha()
+    colorkey = surf.get_colorkey()
+    surf = surf.convert()
+    if colorkey is not None:
+        surf.set_colorkey(colorkey, pygame.RLEACCEL)
+    return surf
+
+
+def _usesAlpha(surf):
+    # Returns True if the Surface has per-pixel alpha and any of its pixels
+    # aren't fully opaque.
+    if not surf.get_flags() & pygame.SRCALPHA:
+        return False
+    width, height = surf.get_size()
+    return pygame.mask.from_surface(surf, 254).count() != width * height # the mask has the pixels with alpha above 254
+
+
+_spriteSheetCache = {} # maps (path, mtime, slicing args) to a dict of the sheet Surface, its rects, and the Surfaces sliced from it
+
+
+def getImagesFromSpriteSheet(filename, width=None, height=None, rows=None, cols=None, rects=None, subsurfaces=False, skipBlank=None, colorkey=None):
     """Loads several sprites from a single image file (a "spritesheet").
 
     One (and only one) of the following parameters should be specified:
         * width & height of each sprite (all must be the same size)
         * number of rows and columns of sprites (all must be the same size)
         * rects, which is a list of tuples formatted as (pygame.Rect, index) or (left, top, width, height)
-    """
 
+    If subsurfaces is True, the returned Surfaces are subsurfaces of the sheet
+    rather than copies. They share the sheet's pixels, so slicing costs no
+    extra memory and one sheet can be used by any number of animations.
+
+    If skipBlank is True, cells that are fully transparent or a single solid
+    color are left out of the returned list. It defaults to SKIP_BLANK_CELLS
+    for width/height and rows/cols, and to False for rects.
+
+    If colorkey is given, every returned Surface has it set as its colorkey
+    with RLE acceleration (pygame.RLEACCEL), which makes blitting pixel art
+    with a colorkey much faster.
+
+    While CACHE_SPRITE_SHEETS is True, slicing the same sheet file the same
+    way returns the same Surface objects (in a new list) without reloading it.
+    Call clearSpriteSheetCache() to free them.
+    """
+    entry = _sliceSpriteSheet(filename, width, height, rows, cols, rects, skipBlank)
+    colorkeyKey = colorkey if colorkey is None else tuple(colorkey) # Surfaces with different colorkeys are cached separately
+
+    if subsurfaces:
+        if colorkeyKey not in entry['subsurfaces']:
+            entry['subsurfaces'][colorkeyKey] = _setColorkeys([entry['sheet'].subsurface(rect) for rect in entry['rects']], colorkey)
+        return list(entry['subsurfaces'][colorkeyKey])
+
+    if colorkeyKey not in entry['copies']:
+        # create a list of Surface objects from the sprite sheet
+        sheetImage = entry['sheet']
+        copies = []
+        for rect in entry['rects']:
+            surf = pygame.Surface((rect[2], rect[3]), sheetImage.get_flags() & pygame.SRCALPHA, sheetImage) # create Surface with width/height in rect
+            surf.blit(sheetImage, (0, 0), rect, pygame.BLEND_RGBA_ADD)
+            copies.append(surf)
+        entry['copies'][colorkeyKey] = _setColorkeys(copies, colorkey)
+
+    return list(entry['copies'][colorkeyKey])
+
+
+def clearSpriteSheetCache():
+    # Forgets all of the Surfaces that getImagesFromSpriteSheet() has cached.
+    _spriteSheetCache.clear()
+
+
+def getAnimationsFromSpriteSheet(filename, width=None, height=None, rows=None, cols=None, durations=DEFAULT_DURATION, loop=True, skipBlank=None, colorkey=None):
+    """Returns a list of PygAnimation objects, one for each row of a sprite
+    sheet. (This is the common layout where each row is a different animation,
+    such as walking in each direction.)
+
+    The width/height, rows/cols, skipBlank, and colorkey parameters are the
+    same as for getImagesFromSpriteSheet(). durations is either a single duration for every
+    frame or a list of durations for the frames in each row (ValueError is
+    raised if a row has a different number of frames). All of the
+    animations' frames are subsurfaces of one sheet Surface, so no pixels are
+    copied. Rows with no frames (after skipping blank cells) are left out.
+    """
+    entry = _sliceSpriteSheet(filename, width, height, rows, cols, None, skipBlank)
+    sheetImage = entry['sheet']
+
+    rowRects = collections.OrderedDict() # maps the top of each row to the rects in that row
+    for rect in entry['rects']:
+        rowRects.setdefault(rect[1], []).append(rect)
+
+    animations = []
+    for rowRect in rowRects.values():
+        frames = list(zip([sheetImage.subsurface(rect) for rect in rowRect], _getDurationList(durations, len(rowRect))))
+        animations.append(PygAnimation(frames, loop=loop, colorkey=colorkey))
+    return animations
+
+
+def _getDurationList(durations, numFrames):
+    # Returns a list of the durations of numFrames frames. durations is either
+    # one duration for every frame, or a list that must have exactly one
+    # duration for each frame.
+    if type(durations) in (int, float):
+        return [durations] * numFrames
+    if len(durations) != numFrames:
+        raise ValueError('%s durations were given for %s frames' % (len(durations), numFrames))
+    return list(durations)
+
+
+def getAnimationsFromSpriteSheetData(filename, loop=True):
+    """Loads the animations described by a sprite sheet's JSON data file, as
+    exported by Aseprite or TexturePacker (in either the "hash" or "array"
+    JSON format). Returns a dict that maps each tag name in the file's
+    meta.frameTags to a PygAnimation object. The None key maps to an animation
+    of all of the frames, in order.
+
+    The sheet image (meta.image, relative to the JSON file) is loaded once,
+    and every animation's frames are subsurfaces of it, so no pixels are
+    copied. (Except for frames that TexturePacker stored rotated, which are
+    rotated back into their own Surface.) Each frame's duration comes from
+    its "duration" key, or DEFAULT_DURATION if it has none. Trimmed frames
+    keep their trim as an offset, the same as frames trimmed by
+    PygAnimation.trim(). A tag's direction can be "forward", "reverse",
+    "pingpong", or "pingpong_reverse".
+    """
+    dataFile = open(filename)
+    data = json.load(dataFile, object_pairs_hook=collections.OrderedDict)
+    dataFile.close()
+
+    meta = data.get('meta', {})
+    if 'image' not in meta:
+        raise ValueError('%s has no meta.image for the sprite sheet filename' % (filename))
+    sheetImage = _loadImage(os.path.join(os.path.dirname(filename), meta['image']))
+
+    frameData = data.get('frames')
+    if isinstance(frameData, dict):
+        frameData = list(frameData.values())
+    if not frameData:
+        raise ValueError('%s has no frames' % (filename))
+
+    frames = [] # (Surface, duration, offset, size) tuples, shared by all of the animations
+    for i, frameInfo in enumerate(frameData):
+        rect = frameInfo['frame']
+        if frameInfo.get('rotated'):
+            # TexturePacker turns rotated sprites 90 degrees clockwise, so w and h are swapped on the sheet
+            surf = pygame.transform.rotate(sheetImage.subsurface((rect['x'], rect['y'], rect['h'], rect['w'])), 90)
+        else:
+            surf = sheetImage.subsurface((rect['x'], rect['y'], rect['w'], rect['h']))
+        duration = frameInfo.get('duration', DEFAULT_DURATION)
+        assert duration > 0, 'Frame %s duration must be greater than zero.' % (i)
+
+        offset, size = (0, 0), None
+        if frameInfo.get('trimmed') and 'spriteSourceSize' in frameInfo and 'sourceSize' in frameInfo:
+            offset = (frameInfo['spriteSourceSize']['x'], frameInfo['spriteSourceSize']['y'])
+            size = (frameInfo['sourceSize']['w'], frameInfo['sourceSize']['h'])
+        frames.append((surf, duration, offset, size))
+
+    sequences = collections.OrderedDict([(None, list(range(len(frames))))]) # maps each animation's name to its frame numbers
+    for tag in meta.get('frameTags', []):
+        frameNums = list(range(tag['from'], tag['to'] + 1))
+        direction = tag.get('direction', 'forward')
+        if direction not in ('forward', 'reverse', 'pingpong', 'pingpong_reverse'):
+            raise ValueError('%s: tag %r has an unknown direction %r' % (filename, tag['name'], direction))
+        if direction in ('reverse', 'pingpong_reverse'):
+            frameNums.reverse()
+        if direction in ('pingpong', 'pingpong_reverse'):
+            frameNums = frameNums + frameNums[-2:0:-1] # e.g. 0, 1, 2, 3 becomes 0, 1, 2, 3, 2, 1
+        sequences[tag['name']] = frameNums
+
+    animations = {}
+    for name, frameNums in sequences.items():
+        animObj = PygAnimation([frames[i][:2] for i in frameNums], loop=loop, trim=False, dedupe=False)
+        animObj._offsets = [frames[i][2] for i in frameNums]
+        animObj._sizes = [frames[i][3] for i in frameNums]
+        animations[name] = animObj
+    return animations
+
+
+def _setColorkeys(surfaces, colorkey):
+    # Sets colorkey, with RLE acceleration, as the colorkey of each Surface
+    # (unless colorkey is None). Returns surfaces.
+    if colorkey is not None:
+        for surf in surfaces:
+            surf.set_colorkey(colorkey, pygame.RLEACCEL)
+    return surfaces
+
+
+def _hasColorkey(surf, colorkey):
+    # Returns True if colorkey (a color or a mapped color int) is already the
+    # colorkey of the Surface.
+    if isinstance(colorkey, int):
+        return surf.get_colorkey() == surf.unmap_rgb(colorkey)
+    return surf.get_colorkey() == surf.unmap_rgb(surf.map_rgb(colorkey))
+
+
+def _sliceSpriteSheet(filename, width=None, height=None, rows=None, cols=None, rects=None, skipBlank=None):
+    # Loads the sprite sheet and works out the rect of each sprite in it from
+    # the arguments of getImagesFromSpriteSheet(). Returns the sheet's cache
+    # entry: a dict with the sheet's Surface under 'sheet', a list of
+    # (left, top, width, height) tuples under 'rects', and the Surfaces
+    # sliced so far under 'copies' and 'subsurfaces'.
     argsType = '' # there should be exactly 1 set of arguments passed (i.e. don't pass width/height AND rows/cols)
     if (width is not None or height is not None) and (argsType == ''):
         argsType = 'width/height'
@@ -72,55 +514,200 @@ def getImagesFromSpriteSheet(filename, width=None, height=None, rows=None, cols=
     if argsType == '':
         raise ValueError('Only pass one set of args: width & height, rows & cols, *or* rects')
 
-    sheetImage = pygame.image.load(filename)
+    if skipBlank is None:
+        skipBlank = SKIP_BLANK_CELLS and argsType != 'rects'
 
-    if argsType == 'width/height':
-        for y in range(0, sheetImage.get_height(), (sheetImage.get_height() // height)):
-            if y + height > sheetImage.get_height():
-                continue
-            for x in range(0, sheetImage.get_width(), (sheetImage.get_width() // width)):
-                if x + width > sheetImage.get_width():
-                    continue
+    path = os.path.realpath(filename)
+    if rects is not None:
+        rects = [tuple(rect) for rect in rects]
+    key = (path, os.path.getmtime(path), width, height, rows, cols, rects if rects is None else tuple(rects), skipBlank)
+    if CACHE_SPRITE_SHEETS and key in _spriteSheetCache:
+        return _spriteSheetCache[key]
+
+    sheetImage = _loadImage(filename)
+    if argsType == 'rects':
+        rects = _getSpriteSheetRects(sheetImage, rects, skipBlank)
+    else:
+        rects = _getSpriteSheetGridRects(sheetImage, argsType, width, height, rows, cols, skipBlank)
+
+    entry = {'sheet': sheetImage, 'rects': rects, 'copies': {}, 'subsurfaces': {}} # copies and subsurfaces map colorkeys to lists of Surfaces
+    if CACHE_SPRITE_SHEETS:
+        _spriteSheetCache[key] = entry
+    return entry
 
-                rects.append((x, y, width, height))
 
-    if argsType == 'rows/cols':
+def _getSpriteSheetGridRects(sheetImage, argsType, width, height, rows, cols, skipBlank):
+    # Returns the rects of the cells in a grid of sprites, going across each
+    # row from the top left.
+    if argsType == 'width/height':
+        spriteWidth = width
+        spriteHeight = height
+    elif argsType == 'rows/cols':
         spriteWidth = sheetImage.get_width() // cols
         spriteHeight = sheetImage.get_height() // rows
 
-        for y in range(0, sheetImage.get_height(), spriteHeight):
-            if y + spriteHeight > sheetImage.get_height():
+    rects = []
+    for y in range(0, sheetImage.get_height(), spriteHeight):
+        if y + spriteHeight > sheetImage.get_height():
+            continue
+        for x in range(0, sheetImage.get_width(), spriteWidth):
+            if x + spriteWidth > sheetImage.get_width():
                 continue
-            for x in range(0, sheetImage.get_width(), spriteWidth):
-                if x + spriteWidth > sheetImage.get_width():
-                    continue
 
-                rects.append((x, y, spriteWidth, spriteHeight))
+            rects.append((x, y, spriteWidth, spriteHeight))
+    return _getSpriteSheetRects(sheetImage, rects, skipBlank)
 
-    # create a list of Surface objects from the sprite sheet
-    returnedSurfaces = []
-    for rect in rects:
-        surf = pygame.Surface((rect[2], rect[3]), 0, sheetImage) # create Surface with width/height in rect
-        surf.blit(sheetImage, (0, 0), rect, pygame.BLEND_RGBA_ADD)
-        returnedSurfaces.append(surf)
 
-    return returnedSurfaces
+def _getSpriteSheetRects(sheetImage, rects, skipBlank):
+    # Returns rects, leaving out the blank cells if skipBlank is True.
+    if not skipBlank:
+        return rects
 
+    # Check all of the cells directly on the sheet's pixels with NumPy if it is
+    # installed. Otherwise (or if the sheet's pixel format isn't supported by
+    # surfarray) each cell is checked with _isBlankCell().
+    try:
+        import numpy
+        pixels = pygame.surfarray.pixels2d(sheetImage)
+    except (ImportError, ValueError, pygame.error):
+        return [rect for rect in rects if not _isBlankCell(sheetImage.subsurface(rect))]
+
+    alphas = None
+    if sheetImage.get_flags() & pygame.SRCALPHA:
+        alphas = pygame.surfarray.pixels_alpha(sheetImage)
+    keptRects = []
+    for rect in rects:
+        left, top, width, height = rect
+        cell = pixels[left:left + width, top:top + height]
+        if cell.size == 0 or (cell == cell[0, 0]).all():
+            continue # a single color (or a single colorkey'd color)
+        if alphas is not None and not alphas[left:left + width, top:top + height].any():
+            continue # fully transparent
+        keptRects.append(rect)
+    del pixels, alphas # the sheet stays locked while its pixel arrays exist
+    return keptRects
+
+
+def _isBlankCell(surf):
+    # Returns True if the Surface is fully transparent or all one color.
+    width, height = surf.get_size()
+    if surf.get_bounding_rect().width == 0:
+        return True # every pixel is transparent, either by alpha or by colorkey
+    color = surf.get_at((0, 0))
+    if pygame.mask.from_threshold(surf, color, (1, 1, 1, 255)).count() != width * height:
+        return False
+    if not surf.get_flags() & pygame.SRCALPHA:
+        return True
+    # every pixel has the same RGB values, so check that they have the same alpha too
+    return color.a > 0 and pygame.mask.from_surface(surf, color.a - 1).count() == width * height and pygame.mask.from_surface(surf, color.a).count() == 0
 
 
 
-class PygAnimation():
-    def __init__(self, frames, loop=True):
-        # Constructor function for the animation object. Starts off in the STOPPED state.
-        #
-        # @param frames
-        #     A list of tuples for each frame of animation, in one of the following format:
-        #       (image_of_frame<pygame.Surface>, duration_in_milliseconds<int>)
-        #       (filename_of_image<str>, duration_in_milliseconds<int>)
-        #     Note that the images and duration cannot be changed. A new PygAnimation object
-        #     will have to be created.
-        # @param loop Tells the animation object to keep playing in a loop.
 
+def beginFrame(now=None):
+    # Samples the clock once for this iteration of the game loop. Until
+    # endFrame() is called, every animation and conductor (except those with
+    # their own clock, see VirtualClock) uses this time instead of calling
+    # TIME_FUNC() again, so all of them show the frame for the same instant,
+    # and blitting many animations doesn't read the clock for each one.
+    # Returns the sampled time in milliseconds (with a fraction, since the
+    # clock has sub-millisecond resolution).
+    #
+    # @param now The time to use, in milliseconds from TIME_FUNC(). Defaults to the current time.
+    global _frameTimeNs
+    _frameTimeNs = None
+    if now is None:
+        _frameTimeNs = _nowNs()
+        return _frameTimeNs / 1000000.0
+    _frameTimeNs = _msToNs(now)
+    return now
+
+
+def endFrame():
+    # Goes back to reading the clock (with TIME_FUNC()) every time the current
+    # time is needed.
+    global _frameTimeNs
+    _frameTimeNs = None
+
+
+def getTime():
+    # Returns the current time in milliseconds (with a fraction) on the clock
+    # that animations without their own clock play by: the time sampled by
+    # beginFrame(), or TIME_FUNC()'s time outside of beginFrame()/endFrame().
+    return _nowNs() / 1000000.0
+
+
+def _nowNs():
+    # Returns the current time in integer nanoseconds: the time sampled by
+    # beginFrame(), or the clock's time outside of beginFrame()/endFrame().
+    if _frameTimeNs is not None:
+        return _frameTimeNs
+    if TIME_FUNC is _defaultTimeFunc:
+        return _monotonicNs()
+    return _msToNs(TIME_FUNC())
+
+
+def _msToNs(milliseconds):
+    # Converts a time in milliseconds (an int or float) to integer nanoseconds.
+    return int(round(milliseconds * 1000000))
+
+
+class VirtualClock(object):
+    # A clock that only moves when tick() or setTime() is called. Give it to
+    # animations, conductors, pools, and event schedulers (with their clock
+    # attribute or argument) to step them in fixed timesteps, faster or slower
+    # than real time, without changing TIME_FUNC for everything else. The
+    # same steps always show the same frames, so simulations and tests are
+    # deterministic and never have to sleep.
+    #
+    # Example:
+    #
+    #     clock = pyganim.VirtualClock()
+    #     boltAnim.clock = clock
+    #     boltAnim.play()
+    #     clock.tick(250) # boltAnim is now 250 milliseconds in
+    def __init__(self, now=0):
+        # @param now The time to start at, in milliseconds.
+        self._ns = _msToNs(now) # the time in integer nanoseconds
+
+    def tick(self, dt):
+        # Moves the clock forward by dt milliseconds. Returns the new time in milliseconds.
+        self._ns += _msToNs(dt)
+        return self._ns / 1000000.0
+
+    def setTime(self, now):
+        # Sets the clock to now milliseconds (which can be earlier than the current time).
+        self._ns = _msToNs(now)
+
+    def __call__(self):
+        # Returns the time in milliseconds, so the clock can also be used as TIME_FUNC.
+        return self._ns / 1000000.0
+
+
+def _clockNs(clock):
+    # Returns the current time in integer nanoseconds of clock, which is a
+    # VirtualClock, a function that returns milliseconds (like TIME_FUNC), or
+    # None for the pyganim clock (see _nowNs()).
+    if clock is None:
+        return _nowNs()
+    if isinstance(clock, VirtualClock):
+        return clock._ns
+    if isinstance(clock, _Timeline):
+        return clock._getNs()
+    return _msToNs(clock())
+
+
+class PygClip(object):
+    # The frames of an animation: their Surfaces, durations, start times,
+    # offsets, canvas sizes, and transformed versions, plus the table for
+    # looking up the frame shown at a time. getCopies() and getPlayheads()
+    # share their animation's clip instead of copying its lists, so making a
+    # copy takes the same time however many frames there are.
+    #
+    # A clip is never changed once it's shared. PygAnimation methods that
+    # change frames (transforms, trim(), reverse(), and so on) first give
+    # their animation its own copy of a shared clip (copy-on-write).
+    def __init__(self):
         # _images stores the pygame.Surface objects of each frame
         self._images = []
         # _durations stores the durations (in milliseconds) of each frame.
@@ -133,92 +720,144 @@ class PygAnimation():
         # The values are in milliseconds.
         # So self._startTimes[-1] tells you the length of the entire animation.
         # e.g. if _durations is [1000, 1000, 2500], then _startTimes will be [0, 1000, 2000, 4500]
-        self._startTimes = None
+        self._startTimes = [0]
+        self._frameLookup = None # a _FrameLookup for _startTimes, made when it's first needed
+
+        # _offsets stores where each frame's Surface is drawn, as an (x, y)
+        # offset from the position passed to blit(). _sizes stores the size of
+        # the area (the "canvas") that each frame is drawn on, or None if it's
+        # the size of the frame's Surface. Frames that have been trimmed or
+        # anchored have a Surface smaller than their canvas and an offset
+        # instead of transparent borders.
+        # e.g. a 10 x 10 frame trimmed to its 4 x 6 opaque pixels at (3, 2)
+        # has an offset of (3, 2) and a size of (10, 10)
+        self._offsets = []
+        self._sizes = []
 
         # if the sprites are transformed, the originals are kept in _images
-        # and the transformed sprites are kept in _transformedImages.
+        # and the transformed sprites are kept in _transformedImages. (Their
+        # offsets and sizes are kept in _transformedOffsets and _transformedSizes.)
         self._transformedImages = []
+        self._transformedOffsets = []
+        self._transformedSizes = []
 
-        self._state = STOPPED # The state is always either PLAYING, PAUSED, or STOPPED
-        self._loop = loop # If True, the animation will keep looping. If False, the animation stops after playing once.
-        self._rate = 1.0 # 2.0 means play the animation twice as fast, 0.5 means twice as slow
-        self._visibility = True # If False, then nothing is drawn when the blit() methods are called
+        self._colorkey = None # If not None, the colorkey (with RLE acceleration) of every frame, including transformed frames
 
-        self._playingStartTime = 0 # the time that the play() function was last called. Epoch timestamp in milliseconds.
-        self._pausedStartTime = 0 # the time that the pause() function was last called. Epoch timestamp in milliseconds.
+        # _decodeTimes stores how many milliseconds it took to load each frame
+        # from an image file. (Frames passed as Surface objects record 0.)
+        self._decodeTimes = []
 
-        # NOTE: There is no "self._elapsed" attribute. "Elapsed" is always calculated based on the current time and _playingStartTime.
-        if type(frames) == str and frames.lower().endswith('.gif'):
-            # frames is an animated gif filename
-            gifImages = splitGif(frames)
-            # NOTE: I can't understand how PIL and Pygame's tobytes()/tostring()/fromstring() methods work, hence the use of temporary files.
-            # NOTE: Named temp files delete themselves on close on Windows, so the temp file has to be created here.
-            frames = []
-            for im in gifImages:
-                im.save('.temp_pyganim.gif')
-                frames.append((pygame.image.load('.temp_pyganim.gif'), im.info['duration'])) # gif duration is already in milliseconds
-                os.unlink('.temp_pyganim.gif')
-        elif len(frames) > 0 and type(frames[0]) == str:
-            # frames is a list of strings (image filenames without durations)
-            frames = list(zip(frames, [DEFAULT_DURATION] * len(frames))) # add default duration
+        self._shared = False # True once other animations or playheads may be using this clip
+        self._generation = 0 # incremented each time the frames or transformed frames may have changed (see frameChanged())
 
-        if frames != '_copy': # ('_copy' is passed for frames by the getCopies() method)
-            self.numFrames = len(frames)
-            assert self.numFrames > 0, 'Must contain at least one frame.'
-            for i in range(self.numFrames):
-                # load each frame of animation into _images
-                frame = (frames[i][0], int(frames[i][1]))
-                assert type(frame) in (list, tuple) and len(frame) == 2, 'Frame %s has incorrect format. It should be a tuple of length 2, first item a pygame.Surface or image filename, second item an int/float of duration.' % (i)
-                assert type(frame[0]) in (str, pygame.Surface), 'Frame %s image must be a string filename or a pygame.Surface' % (i)
-                assert frame[1] > 0, 'Frame %s duration must be greater than zero.' % (i)
-                if type(frame[0]) == str:
-                    frame = (pygame.image.load(frame[0]), frame[1])
-                self._images.append(frame[0])
-                self._durations.append(frame[1])
 
-            # calculate start times of each frame
-            self._startTimes = [0]
-            for i in range(self.numFrames):
-                self._startTimes.append(self._startTimes[-1] + self._durations[i])
+    def _propGetNumFrames(self):
+        return len(self._images)
 
+    numFrames = property(_propGetNumFrames)
 
-    def reverse(self):
-        # Reverses the order of the frames.
-        self.elapsed = (self._durations[-1] + self._startTimes[-1]) - self.elapsed
-        self._images.reverse()
-        self._transformedImages.reverse()
-        self._durations.reverse()
 
+    def copy(self):
+        # Returns a new, unshared clip with copies of this clip's lists. (The
+        # Surface objects are the same ones.)
+        newClip = PygClip()
+        newClip._images = self._images[:]
+        newClip._durations = self._durations[:]
+        newClip._startTimes = self._startTimes # (start time lists are replaced, never changed, so they can be shared)
+        newClip._frameLookup = self._frameLookup
+        newClip._offsets = self._offsets[:]
+        newClip._sizes = self._sizes[:]
+        newClip._transformedImages = self._transformedImages[:]
+        newClip._transformedOffsets = self._transformedOffsets[:]
+        newClip._transformedSizes = self._transformedSizes[:]
+        newClip._colorkey = self._colorkey
+        newClip._decodeTimes = self._decodeTimes[:]
+        newClip._generation = self._generation
+        return newClip
 
-    def getCopy(self):
-        # Returns a copy of this PygAnimation object, but one that refers to the
-        # Surface objects of the original so it efficiently uses memory.
+
+    def getFrame(self, frameNum):
+        # Returns the pygame.Surface object of the frameNum-th frame. If there
+        # is a transformed version of the frame, it will return that one.
         #
-        # NOTE: Messing around with the original Surface objects will affect all
-        # the copies. If you want to modify the Surface objects, then just make
-        # copies using constructor function instead.
-        return self.getCopies(1)[0]
+        # NOTE: For trimmed or anchored frames, the Surface has to be drawn at
+        # the offset returned by getFrameOffset().
+        if self._transformedImages == []:
+            return self._images[frameNum]
+        else:
+            return self._transformedImages[frameNum]
 
 
-    def getCopies(self, numCopies=1):
-        # Returns a list of copies of this PygAnimation object, but one that refers to the
-        # Surface objects of the original so it efficiently uses memory.
-        #
-        # NOTE: Messing around with the original Surface objects will affect all
-        # the copies. If you want to modify the Surface objects, then just make
-        # copies using constructor function instead.
-        retval = []
-        for i in range(numCopies):
-            newAnim = PygAnimation('_copy', loop=self.loop)
-            newAnim._images = self._images[:]
-            newAnim._transformedImages = self._transformedImages[:]
-            newAnim._durations = self._durations[:]
-            newAnim._startTimes = self._startTimes[:]
-            newAnim.numFrames = self.numFrames
-            retval.append(newAnim)
-        return retval
+    def getFrameOffset(self, frameNum):
+        # Returns the (x, y) offset that the frameNum-th frame's Surface is
+        # drawn at, relative to the position passed to blit(). This is (0, 0)
+        # unless the frames have been trimmed or anchored.
+        if self._transformedImages == []:
+            return self._offsets[frameNum]
+        else:
+            return self._transformedOffsets[frameNum]
+
+
+    def _findFrameNum(self, elapsed):
+        # Internal-method. Returns the number of the frame shown at elapsed
+        # milliseconds into the animation. (The same as findStartTime(), but
+        # usually constant time.)
+        lookup = self._frameLookup
+        if lookup is None or lookup.startTimes is not self._startTimes:
+            lookup = self._frameLookup = _FrameLookup(self._startTimes) # _startTimes was replaced since the lookup was made
+        return lookup.find(elapsed)
+
+
+
+def _clipAttribute(name):
+    # Returns a property for a PygAnimation attribute that is kept on its
+    # clip. Setting the attribute gives the animation its own copy of the clip
+    # first, if the clip is shared.
+    def getter(self):
+        return getattr(self.clip, name)
+    def setter(self, value):
+        setattr(self._writableClip(), name, value)
+    return property(getter, setter)
+
+
+class PygPlayhead(object):
+    # The playing state of an animation: whether it's playing, paused, or
+    # stopped, when it started playing, its rate, loop setting, and
+    # visibility. The frames are in the PygClip object in the clip attribute.
+    #
+    # PygAnimation objects are playheads (with methods for changing their
+    # frames). Plain playheads, from PygAnimation's getPlayheads(), use
+    # __slots__, so each one is under a hundred bytes. They're for when
+    # thousands of instances of the same animation are playing.
+    __slots__ = ('clip', '_state', '_loop', '_rate', '_visibility', '_playingStartTime', '_pausedStartTime', '_clock')
+
+    def __init__(self, clip, loop=True):
+        self.clip = clip # the PygClip with the frames
+        self._state = STOPPED # The state is always either PLAYING, PAUSED, or STOPPED
+        self._loop = loop # If True, the animation will keep looping. If False, the animation stops after playing once.
+        self._rate = 1.0 # 2.0 means play the animation twice as fast, 0.5 means twice as slow
+        self._visibility = True # If False, then nothing is drawn when the blit() methods are called
+
+        self._clock = None # the clock that the animation plays by (see _clockNs()). None means the pyganim clock.
+        self._playingStartTime = 0 # the time that the play() function was last called. In nanoseconds (see _now()).
+        self._pausedStartTime = 0 # the time that the pause() function was last called. In nanoseconds (see _now()).
+        # NOTE: There is no "self._elapsed" attribute. "Elapsed" is always calculated based on the current time and _playingStartTime.
+
+
+    def _now(self):
+        # Internal-method. Returns the current time of this animation's clock, in nanoseconds.
+        return _clockNs(self._clock)
 
 
+    def _timingChanged(self):
+        # Internal-method. Called whenever the state, start times, rate, or
+        # loop setting change, so that the EventScheduler watching this
+        # animation (if there is one) can recompute when its next event is.
+        if _scheduledPlayheads:
+            scheduler = _scheduledPlayheads.get(id(self))
+            if scheduler is not None:
+                scheduler._reschedule(self)
+
     def blit(self, destSurface, dest=(0, 0)):
         # Draws the appropriate frame of the animation to the destination Surface
         # at the specified position.
@@ -231,22 +870,58 @@ class PygAnimation():
         #     The position to draw the frame. This is passed to Pygame's Surface's
         #     blit() function, so it can be either a (top, left) tuple or a Rect
         #     object.
-        if self.isFinished():
-            self.state = STOPPED
-        if not self.visibility or self.state == STOPPED:
+        elapsed = self._updateFinished()
+        if not self._visibility or self._state == STOPPED:
             return
-        frameNum = findStartTime(self._startTimes, self.elapsed)
-        destSurface.blit(self.getFrame(frameNum), dest)
+        self._blitFrame(self.clip._findFrameNum(elapsed), destSurface, dest)
+
+
+    def _updateFinished(self):
+        # Internal-method. Sets the state to STOPPED if the animation has
+        # finished playing, and returns the elapsed time. The clock is only
+        # read once, so the finished check and the frame drawn agree.
+        elapsed = self._propGetElapsed()
+        if not self._loop and elapsed >= self.clip._startTimes[-1]:
+            self._state = STOPPED
+        return elapsed
+
+
+    def _getFrameKey(self):
+        # Internal-method. Returns a tuple that is the same as long as blit()
+        # would draw the same thing: the frame number (or None if nothing is
+        # drawn), the clip, and the clip's generation.
+        elapsed = self._updateFinished()
+        if not self._visibility or self._state == STOPPED:
+            frameNum = None
+        else:
+            frameNum = self.clip._findFrameNum(elapsed)
+        return (frameNum, id(self.clip), self.clip._generation)
+
+
+    def _blitFrame(self, frameNum, destSurface, dest):
+        # Internal-method. Draws the frame at dest plus the frame's offset.
+        clip = self.clip
+        dx, dy = clip.getFrameOffset(frameNum)
+        if dx or dy:
+            dest = (dest[0] + dx, dest[1] + dy)
+        destSurface.blit(clip.getFrame(frameNum), dest)
 
 
     def getFrame(self, frameNum):
         # Returns the pygame.Surface object of the frameNum-th frame in this
         # animation object. If there is a transformed version of the frame,
         # it will return that one.
-        if self._transformedImages == []:
-            return self._images[frameNum]
-        else:
-            return self._transformedImages[frameNum]
+        #
+        # NOTE: For trimmed or anchored frames, the Surface has to be drawn at
+        # the offset returned by getFrameOffset().
+        return self.clip.getFrame(frameNum)
+
+
+    def getFrameOffset(self, frameNum):
+        # Returns the (x, y) offset that the frameNum-th frame's Surface is
+        # drawn at, relative to the position passed to blit(). This is (0, 0)
+        # unless the frames have been trimmed or anchored.
+        return self.clip.getFrameOffset(frameNum)
 
 
     def getCurrentFrame(self):
@@ -256,23 +931,6 @@ class PygAnimation():
         return self.getFrame(self.currentFrameNum)
 
 
-    def clearTransforms(self):
-        # Deletes all the transformed frames so that the animation object
-        # displays the original Surfaces/images as they were before
-        # transformation functions were called on them.
-        #
-        # This is handy to do for multiple transformation, where calling
-        # the rotation or scaling functions multiple times results in
-        # degraded/noisy images.
-        self._transformedImages = []
-
-
-    def makeTransformsPermanent(self):
-        self._images = [pygame.Surface(surfObj.get_size(), 0, surfObj) for surfObj in self._transformedImages]
-        for i in range(len(self._transformedImages)):
-            self._images[i].blit(self._transformedImages[i], (0,0))
-
-
     def blitFrameNum(self, frameNum, destSurface, dest):
         # Draws the specified frame of the animation object. This ignores the
         # current playing state.
@@ -287,11 +945,10 @@ class PygAnimation():
         #     The position to draw the frame. This is passed to Pygame's Surface's
         #     blit() function, so it can be either a (top, left) tuple or a Rect
         #     object.
-        if self.isFinished():
-            self.state = STOPPED
-        if not self.visibility or self.state == STOPPED:
+        self._updateFinished()
+        if not self._visibility or self._state == STOPPED:
             return
-        destSurface.blit(self.getFrame(frameNum), dest)
+        self._blitFrame(frameNum, destSurface, dest)
 
 
     def blitFrameAtTime(self, elapsed, destSurface, dest):
@@ -310,26 +967,26 @@ class PygAnimation():
         #     The position to draw the frame. This is passed to Pygame's Surface's
         #     blit() function, so it can be either a (top, left) tuple or a Rect
         #     object.        elapsed = int(elapsed * self.rate)
-        if self.isFinished():
-            self.state = STOPPED
-        if not self.visibility or self.state == STOPPED:
+        self._updateFinished()
+        if not self._visibility or self._state == STOPPED:
             return
-        frameNum = findStartTime(self._startTimes, elapsed)
-        destSurface.blit(self.getFrame(frameNum), dest)
+        self._blitFrame(self.clip._findFrameNum(elapsed), destSurface, dest)
 
 
     def isFinished(self):
         # Returns True if this animation doesn't loop and has finished playing
         # all the frames it has.
-        return not self.loop and self.elapsed >= self._startTimes[-1]
+        return not self.loop and self.elapsed >= self.clip._startTimes[-1]
 
 
-    def play(self, startTime=None): # startTime is epoch timestamp in milliseconds. TODO: Change this?
+    def play(self, startTime=None): # startTime is in milliseconds, from TIME_FUNC() or beginFrame()
         # Start playing the animation.
 
         # play() is essentially a setter function for self._state
         if startTime is None:
-            startTime = TIME_FUNC()
+            startTime = self._now()
+        else:
+            startTime = _msToNs(startTime)
 
         if self._state == PLAYING:
             if self.isFinished():
@@ -345,6 +1002,7 @@ class PygAnimation():
         else:
             assert False, '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
         self._state = PLAYING
+        self._timingChanged()
 
 
     def pause(self, startTime=None):
@@ -352,19 +1010,22 @@ class PygAnimation():
 
         # pause() is essentially a setter function for self._state
         if startTime is None:
-            startTime = TIME_FUNC()
+            startTime = self._now()
+        else:
+            startTime = _msToNs(startTime)
 
         if self._state == PAUSED:
             return # do nothing
         elif self._state == PLAYING:
             self._pausedStartTime = startTime
         elif self._state == STOPPED:
-            rightNow = TIME_FUNC()
+            rightNow = self._now()
             self._playingStartTime = rightNow
             self._pausedStartTime = rightNow
         else:
             assert False, '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
         self._state = PAUSED
+        self._timingChanged()
 
 
     def stop(self):
@@ -375,26 +1036,574 @@ class PygAnimation():
         if self._state == STOPPED:
             return # do nothing
         self._state = STOPPED
+        self._timingChanged()
+
+
+    def togglePause(self):
+        # If paused, start playing. If playing, then pause.
+
+        # togglePause() is essentially a setter function for self._state
+        if self._state == PLAYING:
+            self.pause()
+        elif self._state in (PAUSED, STOPPED):
+            self.play()
+        else:
+            assert False, '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
+
+
+    def nextFrame(self, jump=1):
+        # Set the elapsed time to the beginning of the next frame.
+        # You can jump ahead by multiple frames by specifying a different
+        # argument for jump.
+        # Negative values have the same effect as calling prevFrame()
+        self.currentFrameNum += int(jump)
+
+
+    def prevFrame(self, jump=1):
+        # Set the elapsed time to the beginning of the previous frame.
+        # You can jump ahead by multiple frames by specifying a different
+        # argument for jump.
+        # Negative values have the same effect as calling nextFrame()
+        self.currentFrameNum -= int(jump)
+
+
+    def rewind(self, milliseconds=None):
+        # Set the elapsed time back relative to the current elapsed time.
+        if milliseconds is None:
+            self.elapsed = 0.0
+        else:
+            self.elapsed -= milliseconds
+
+
+    def fastForward(self, milliseconds):
+        # Set the elapsed time forward relative to the current elapsed time.
+        if milliseconds is None:
+            self.elapsed = self.clip._startTimes[-1]
+        else:
+            self.elapsed += milliseconds
+
+
+    # Getter and setter methods for properties
+    def _propGetRate(self):
+        return self._rate
+
+    def _propSetRate(self, rate):
+        rate = float(rate)
+        if rate < 0:
+            raise ValueError('rate must be greater than 0.')
+        self._rate = rate
+        self._timingChanged()
+
+    rate = property(_propGetRate, _propSetRate)
+
+
+    def _propGetLoop(self):
+        return self._loop
+
+    def _propSetLoop(self, loop):
+        if self.state == PLAYING and self._loop and not loop:
+            # if we are turning off looping while the animation is playing,
+            # we need to modify the _playingStartTime so that the rest of
+            # the animation will play, and then stop. (Otherwise, the
+            # animation will immediately stop playing if it has already looped.)
+            self._playingStartTime = self._now() - _msToNs(self.elapsed)
+        self._loop = bool(loop)
+        self._timingChanged()
+
+    loop = property(_propGetLoop, _propSetLoop)
+
+
+    def _propGetState(self):
+        if self.isFinished():
+            self._state = STOPPED # if finished playing, then set state to STOPPED.
+
+        return self._state
+
+    def _propSetState(self, state):
+        if state not in (PLAYING, PAUSED, STOPPED):
+            raise ValueError('state must be one of pyganim.PLAYING, pyganim.PAUSED, or pyganim.STOPPED')
+        if state == PLAYING:
+            self.play()
+        elif state == PAUSED:
+            self.pause()
+        elif state == STOPPED:
+            self.stop()
+
+    state = property(_propGetState, _propSetState)
+
+
+    def _propGetVisibility(self):
+        return self._visibility
+
+    def _propSetVisibility(self, visibility):
+        self._visibility = bool(visibility)
+
+    visibility = property(_propGetVisibility, _propSetVisibility)
+
+
+    def _propGetClock(self):
+        return self._clock
+
+    def _propSetClock(self, clock):
+        # Changes the clock (a VirtualClock, a function that returns
+        # milliseconds, or None for the pyganim clock) without changing the
+        # elapsed time.
+        shift = _clockNs(clock) - self._now()
+        self._clock = clock
+        self._playingStartTime += shift
+        self._pausedStartTime += shift
+        self._timingChanged()
+
+    clock = property(_propGetClock, _propSetClock)
+
+
+    def _propSetElapsed(self, elapsed):
+        # Set the elapsed time to a specific value.
+        # NOTE: elapsed is in milliseconds
+
+        if self.state == STOPPED:
+            self.state = PAUSED
+
+        if self._loop:
+            elapsed = elapsed % self.clip._startTimes[-1]
+        else:
+            elapsed = getBoundedValue(0, elapsed, self.clip._startTimes[-1])
+
+        rightNow = self._now()
+        self._playingStartTime = rightNow - _msToNs(elapsed * self.rate)
+
+        if self.state in (PAUSED, STOPPED):
+            self.state = PAUSED # if stopped, then set to paused
+            self._pausedStartTime = rightNow
+        self._timingChanged()
+
+
+    def _propGetElapsed(self):
+        # To prevent infinite recursion, don't use the self.state property,
+        # just read/set self._state directly because the state getter calls
+        # this method.
+
+        # NOTE: Elapsed is in milliseconds, not seconds.
+        assert self._state in (PLAYING, PAUSED, STOPPED), '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
+
+        # Find out how long ago the play()/pause() functions were called.
+        if self._state == STOPPED:
+            # if stopped, then just return 0
+            return 0
+        elif self._state == PLAYING:
+            # if playing, then draw the current frame (based on when the animation
+            # started playing). If not looping and the animation has gone through
+            # all the frames already, then draw the last frame.
+            elapsed = (self._now() - self._playingStartTime) * self.rate
+        elif self._state == PAUSED:
+            # if paused, then draw the frame that was playing at the time the
+            # PygAnimation object was paused
+            elapsed = (self._pausedStartTime - self._playingStartTime) * self.rate
+
+        elapsed = int(elapsed // 1000000) # from nanoseconds to whole milliseconds (rounding down, so frames change on time)
+
+        if self._loop:
+            elapsed = elapsed % self.clip._startTimes[-1]
+        else:
+            elapsed = getBoundedValue(0, elapsed, self.clip._startTimes[-1])
+        return int(elapsed)
+
+    elapsed = property(_propGetElapsed, _propSetElapsed)
+
+
+    def _propGetCurrentFrameNum(self):
+        # Return the frame number of the frame that will be currently
+        # displayed if the animation object were drawn right now.
+        return self.clip._findFrameNum(self.elapsed)
+
+
+    def _propSetCurrentFrameNum(self, frameNum):
+        # Change the elapsed time to the beginning of a specific frame.
+        if self._state == STOPPED:
+            self._state = PAUSED # setting the frame num automatically puts it as paused.
+
+        if self.loop:
+            frameNum = frameNum % self.clip.numFrames
+        else:
+            frameNum = getBoundedValue(0, frameNum, self.clip.numFrames - 1)
+        self.elapsed = self.clip._startTimes[frameNum]
+
+    currentFrameNum = property(_propGetCurrentFrameNum, _propSetCurrentFrameNum)
+
+
+    def _propGetNumFrames(self):
+        return self.clip.numFrames
+
+    numFrames = property(_propGetNumFrames)
+
+
+
+class PygAnimation(PygPlayhead):
+    def __init__(self, frames, loop=True, lazy=False, convert=None, dedupe=None, trim=None, colorkey=None):
+        # Constructor function for the animation object. Starts off in the STOPPED state.
+        #
+        # @param frames
+        #     A list of tuples for each frame of animation, in one of the following format:
+        #       (image_of_frame<pygame.Surface>, duration_in_milliseconds<int>)
+        #       (filename_of_image<str>, duration_in_milliseconds<int>)
+        #     Or the filename of an animated GIF, PNG (APNG), or WebP file.
+        #     Note that the images and duration cannot be changed. A new PygAnimation object
+        #     will have to be created.
+        # @param loop Tells the animation object to keep playing in a loop.
+        # @param lazy
+        #     If True, frames loaded from files (an animated GIF or image filenames)
+        #     are not decoded until they are first drawn, and only the LAZY_WINDOW
+        #     most recently drawn frames are kept in memory. This makes long
+        #     animations much quicker to create and much smaller in memory.
+        # @param convert
+        #     If True, frames loaded from files (an animated GIF or image
+        #     filenames) are converted to the display's pixel format with
+        #     convertFrame() as they are loaded. Surfaces passed in frames are
+        #     used as they are. Defaults to CONVERT_FRAMES.
+        # @param dedupe
+        #     If True, dedupe() is called once the frames are loaded. Defaults
+        #     to DEDUPE_FRAMES.
+        # @param trim
+        #     If True, trim() is called once the frames are loaded. Defaults to
+        #     TRIM_FRAMES.
+        # @param colorkey
+        #     If given, this color is set as the colorkey of every frame, with
+        #     RLE acceleration (pygame.RLEACCEL), which makes blitting pixel art
+        #     much faster. (The Surfaces passed in frames are left unchanged:
+        #     the colorkey is set on copies of them.) The colorkey is kept by
+        #     copies of the animation, transforms, and makeTransformsPermanent().
+
+        PygPlayhead.__init__(self, PygClip(), loop)
+        self._colorkey = colorkey
+        self._lastFrameKey = None # what frameChanged() last saw (see _getFrameKey())
+
+        if convert is None:
+            convert = CONVERT_FRAMES
+
+        loadedFrames = set() # the numbers of the frames whose Surfaces were loaded here, so nothing else has them
+        if lazy and frames != '_copy':
+            # _images is a _LazyFrames object instead of a list, which decodes frames as they are needed
+            self._images, self._durations = _makeLazyFrames(frames, convert, colorkey)
+            self._decodeTimes = self._images.decodeTimes
+            numFrames = len(self._images)
+            assert numFrames > 0, 'Must contain at least one frame.'
+            self._startTimes = _getStartTimes(self._durations)
+            self._offsets = [(0, 0)] * numFrames
+            self._sizes = [None] * numFrames
+        elif _isAnimationFilename(frames):
+            # frames is an animated gif, png, or webp filename
+            frames, self._decodeTimes = _loadAnimatedFrames(frames, convert)
+            loadedFrames.update(range(len(frames)))
+        elif frames != '_copy' and len(frames) > 0 and type(frames[0]) == str:
+            # frames is a list of strings (image filenames without durations)
+            frames = list(zip(frames, [DEFAULT_DURATION] * len(frames))) # add default duration
+
+        if frames != '_copy' and not lazy: # ('_copy' is passed for frames by the getCopies() method)
+            numFrames = len(frames)
+            assert numFrames > 0, 'Must contain at least one frame.'
+            for i in range(numFrames):
+                # load each frame of animation into _images
+                frame = (frames[i][0], int(frames[i][1]))
+                assert type(frame) in (list, tuple) and len(frame) == 2, 'Frame %s has incorrect format. It should be a tuple of length 2, first item a pygame.Surface or image filename, second item an int/float of duration.' % (i)
+                assert type(frame[0]) in (str, pygame.Surface), 'Frame %s image must be a string filename or a pygame.Surface' % (i)
+                assert frame[1] > 0, 'Frame %s duration must be greater than zero.' % (i)
+                if type(frame[0]) == str:
+                    loadStartTime = _perfCounter()
+                    frame = (_loadImage(frame[0], self, convert), frame[1])
+                    self._decodeTimes.append((_perfCounter() - loadStartTime) * 1000.0)
+                    if IMAGE_CACHE is None:
+                        loadedFrames.add(i)
+                elif len(self._decodeTimes) < i + 1:
+                    self._decodeTimes.append(0.0)
+                self._images.append(frame[0])
+                self._durations.append(frame[1])
+
+            # calculate start times of each frame
+            self._startTimes = _getStartTimes(self._durations)
+            self._offsets = [(0, 0)] * numFrames
+            self._sizes = [None] * numFrames
+
+            if colorkey is not None:
+                # Surfaces that were passed in or came from IMAGE_CACHE may be
+                # shared (with other animations or the sprite sheet cache), so
+                # set the colorkey on copies of them instead.
+                for i in range(numFrames):
+                    if i not in loadedFrames and not _hasColorkey(self._images[i], colorkey):
+                        self._images[i] = self._images[i].copy()
+            _setColorkeys(self._images, colorkey) # (before trimming, so that trimming leaves out colorkey'd borders)
+            if trim or (trim is None and TRIM_FRAMES):
+                self.trim()
+            if dedupe or (dedupe is None and DEDUPE_FRAMES):
+                self.dedupe()
+
+
+    def reverse(self):
+        # Reverses the order of the frames.
+        self.elapsed = (self._durations[-1] + self._startTimes[-1]) - self.elapsed
+        clip = self._writableClip()
+        clip._images.reverse()
+        clip._transformedImages.reverse()
+        clip._durations.reverse()
+        for frameInfo in (clip._offsets, clip._sizes, clip._transformedOffsets, clip._transformedSizes):
+            frameInfo.reverse()
+        clip._startTimes = _getStartTimes(clip._durations)
+        self._timingChanged()
+
+
+    def getCopy(self):
+        # Returns a copy of this PygAnimation object, but one that refers to the
+        # Surface objects of the original so it efficiently uses memory.
+        #
+        # NOTE: Messing around with the original Surface objects will affect all
+        # the copies. If you want to modify the Surface objects, then just make
+        # copies using constructor function instead.
+        return self.getCopies(1)[0]
+
+
+    def getCopies(self, numCopies=1):
+        # Returns a list of copies of this PygAnimation object, but one that refers to the
+        # Surface objects of the original so it efficiently uses memory.
+        # (The copies share this animation's clip, until one of them changes its frames.)
+        # The copies start off stopped, and play by this animation's clock.
+        #
+        # NOTE: Messing around with the original Surface objects will affect all
+        # the copies. If you want to modify the Surface objects, then just make
+        # copies using constructor function instead.
+        self.clip._shared = True
+        retval = []
+        for i in range(numCopies):
+            newAnim = PygAnimation('_copy', loop=self.loop)
+            newAnim.clip = self.clip
+            newAnim._clock = self._clock # (it's stopped, so there's no elapsed time to keep)
+            if IMAGE_CACHE is not None:
+                IMAGE_CACHE.copyReferences(self, newAnim)
+            retval.append(newAnim)
+        return retval
+
+
+    def getPlayheads(self, numPlayheads=1):
+        # Returns a list of new PygPlayhead objects that play this animation's
+        # frames. They start off stopped, with this animation's loop setting.
+        # A playhead is much smaller than a PygAnimation object, but has no
+        # methods for changing the frames. (Changing this animation's frames
+        # afterwards doesn't change the playheads' frames.) They play by this
+        # animation's clock.
+        self.clip._shared = True
+        playheads = [PygPlayhead(self.clip, self._loop) for i in range(numPlayheads)]
+        for playhead in playheads:
+            playhead._clock = self._clock
+        return playheads
+
+
+    def frameChanged(self):
+        # Returns True if what blit() would draw right now is different from
+        # what it would have drawn the last time frameChanged() was called:
+        # a different frame, frames that have been changed or transformed, or
+        # nothing at all (when stopped or not visible). Returns True the
+        # first time it's called. Sprites can call this every game loop
+        # iteration, and only redraw when it returns True.
+        frameKey = self._getFrameKey()
+        if frameKey == self._lastFrameKey:
+            return False
+        self._lastFrameKey = frameKey
+        return True
+
 
+    def _takeFramesFrom(self, animObj):
+        # Internal-method. Replaces this animation object's frames with the
+        # frames of animObj, keeping this object's state, timing, loop, rate,
+        # and visibility. (pyganim.loader uses this to fill in the placeholder
+        # animations it hands out.) Any transforms are replaced too.
+        animObj.clip._shared = True
+        self.clip = animObj.clip
+        self._timingChanged()
 
-    def togglePause(self):
-        # If paused, start playing. If playing, then pause.
 
-        # togglePause() is essentially a setter function for self._state
-        if self._state == PLAYING:
-            self.pause()
-        elif self._state in (PAUSED, STOPPED):
-            self.play()
+    def _getCanvasSize(self, frameNum):
+        # Internal-method. Returns the (width, height) of the area that the
+        # frameNum-th frame is drawn on (see _sizes).
+        if self._transformedImages == []:
+            size = self._sizes[frameNum]
         else:
-            assert False, '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
+            size = self._transformedSizes[frameNum]
+        if size is None:
+            return self.getFrame(frameNum).get_size()
+        return size
+
+
+    def trim(self):
+        # Crops each frame's Surface to the smallest rect that holds all of
+        # its non-transparent pixels, and draws it at an offset so that the
+        # animation looks the same. Blitting then doesn't touch the transparent
+        # borders. Frames that are subsurfaces (such as those from sprite
+        # sheets) are trimmed to smaller subsurfaces, so no pixels are copied.
+        #
+        # Lazily-loaded frames are left as they are. Any transforms are cleared.
+        if isinstance(self._images, _LazyFrames):
+            return
+        self.clearTransforms()
+        self._writableClip()
+
+        trimmed = {} # maps id of a Surface to its trimmed Surface and rect, for frames that share a Surface
+        for i, surf in enumerate(self._images):
+            if id(surf) not in trimmed:
+                rect = surf.get_bounding_rect()
+                if rect.width == 0 or rect.height == 0:
+                    rect = pygame.Rect(0, 0, 1, 1) # keep one transparent pixel of a blank frame
+                if rect.size == surf.get_size():
+                    trimmedSurf = surf
+                elif surf.get_parent() is None:
+                    trimmedSurf = surf.subsurface(rect).copy() # copy, so the untrimmed Surface can be freed
+                else:
+                    trimmedSurf = surf.subsurface(rect)
+                trimmed[id(surf)] = (trimmedSurf, rect)
+
+            trimmedSurf, rect = trimmed[id(surf)]
+            if trimmedSurf is not surf:
+                self._sizes[i] = self._getCanvasSize(i)
+                self._offsets[i] = (self._offsets[i][0] + rect.left, self._offsets[i][1] + rect.top)
+                self._images[i] = trimmedSurf
+
+
+    def dedupe(self, merge=True):
+        # Makes frames with identical pixels (and pixel formats) use the same
+        # Surface object. This works across animations: a frame identical to a
+        # frame of any other deduplicated animation uses that animation's
+        # Surface. If merge is True, runs of consecutive identical frames (with
+        # the same offset and canvas size) are also merged into a single frame whose duration is their total, which
+        # changes numFrames (but not the length of the animation).
+        #
+        # Lazily-loaded frames are left as they are. If the frames have been
+        # transformed, the transformed frames of merged frames are dropped with them.
+        #
+        # Returns a dict with these keys:
+        #     'framesSaved': the number of frames that no longer have their own Surface, including merged frames
+        #     'framesMerged': the number of frames removed by merging
+        #     'bytesSaved': the bytes of pixel data of the Surfaces this animation no longer uses
+        info = {'framesSaved': 0, 'framesMerged': 0, 'bytesSaved': 0}
+        if isinstance(self._images, _LazyFrames):
+            return info
+
+        oldImages = dict([(id(surf), surf) for surf in self._images])
+        images = []
+        keptFrameNums = [] # the frame numbers of the frames that aren't merged away
+        durations = []
+        decodeTimes = []
+        for i, surf in enumerate(self._images):
+            key = _getFrameKey(surf)
+            sharedSurf = _frameRegistry.get(key)
+            if sharedSurf is None:
+                _frameRegistry[key] = sharedSurf = surf
+            if merge and images and images[-1] is sharedSurf and (self._offsets[i], self._sizes[i]) == (self._offsets[keptFrameNums[-1]], self._sizes[keptFrameNums[-1]]):
+                durations[-1] += self._durations[i]
+                decodeTimes[-1] += self._decodeTimes[i]
+                info['framesMerged'] += 1
+                continue
+            images.append(sharedSurf)
+            keptFrameNums.append(i)
+            durations.append(self._durations[i])
+            decodeTimes.append(self._decodeTimes[i])
+
+        newIds = set([id(surf) for surf in images])
+        info['framesSaved'] = len(self._images) - len(set([id(surf) for surf in images if id(surf) in oldImages]))
+        info['bytesSaved'] = sum([surf.get_pitch() * surf.get_height() for surfId, surf in oldImages.items() if surfId not in newIds])
+
+        self._images = images
+        self._offsets = [self._offsets[i] for i in keptFrameNums]
+        self._sizes = [self._sizes[i] for i in keptFrameNums]
+        if self._transformedImages:
+            self._transformedImages = [self._transformedImages[i] for i in keptFrameNums]
+            self._transformedOffsets = [self._transformedOffsets[i] for i in keptFrameNums]
+            self._transformedSizes = [self._transformedSizes[i] for i in keptFrameNums]
+        self._durations = durations
+        self._decodeTimes = decodeTimes
+        self._startTimes = _getStartTimes(durations)
+        self._timingChanged()
+        return info
+
+
+    def deltaEncode(self):
+        # Stores the frames as the first frame (the "keyframe") plus, for every
+        # other frame, only the rect of pixels that differ from the keyframe.
+        # This saves a lot of memory for animations where only a small part
+        # changes, such as a blinking character or a flickering torch. Each
+        # frame is reconstructed on one reusable Surface as it is drawn, by
+        # restoring the previous frame's changed rect and copying in the new
+        # one. (So a Surface returned by getFrame() is only good until the next
+        # frame is drawn or gotten.)
+        #
+        # The frames must all be the same size and untrimmed. Any transforms
+        # are cleared, and transforming the animation afterwards makes full
+        # transformed copies of the frames.
+        #
+        # Returns a dict with these keys:
+        #     'bytesBefore': the bytes of pixel data of the frames before encoding
+        #     'bytesAfter': the bytes of pixel data of the keyframe and changed rects
+        #     'bytesSaved': bytesBefore minus bytesAfter (negative if encoding cost memory)
+        #     'reconstructTime': the average milliseconds spent reconstructing a frame
+        frames = list(self._images)
+        for i in range(len(frames)):
+            if frames[i].get_size() != frames[0].get_size() or self._offsets[i] != (0, 0) or self._sizes[i] is not None:
+                raise ValueError('Frame %s is not the same size as the first frame, or has been trimmed or anchored. Delta encoded frames must all be the same size.' % (i))
+        self.clearTransforms()
+
+        uniqueFrames = dict([(id(surf), surf) for surf in frames])
+        bytesBefore = sum([surf.get_pitch() * surf.get_height() for surf in uniqueFrames.values()])
+        source = _DeltaFrameSource(frames)
+        self._images = _DeltaFrames(source)
+
+        # time drawing every frame once, going from each frame to the next like playing does
+        reconstructStartTime = _perfCounter()
+        for i in range(len(source)):
+            source.getSurface(i)
+        reconstructTime = (_perfCounter() - reconstructStartTime) * 1000.0 / len(source)
+
+        return {'bytesBefore': bytesBefore,
+                'bytesAfter': source.getBytes(),
+                'bytesSaved': bytesBefore - source.getBytes(),
+                'reconstructTime': reconstructTime}
+
+
+    def getDecodeTimes(self):
+        # Returns a list of how many milliseconds it took to decode each frame
+        # when this animation object was created. This is handy for profiling
+        # how long loading large animated GIFs takes.
+        return self._decodeTimes[:]
+
+
+    def clearTransforms(self):
+        # Deletes all the transformed frames so that the animation object
+        # displays the original Surfaces/images as they were before
+        # transformation functions were called on them.
+        #
+        # This is handy to do for multiple transformation, where calling
+        # the rotation or scaling functions multiple times results in
+        # degraded/noisy images.
+        self._transformedImages = []
+        self._transformedOffsets = []
+        self._transformedSizes = []
+
+
+    def makeTransformsPermanent(self):
+        # Makes the transformed frames the original frames. (The transformed
+        # frames are already this animation's own copies, so they're used as
+        # they are, keeping their pixel format and colorkey.)
+        if self._transformedImages == []:
+            return # nothing has been transformed
+        self._images = self._transformedImages
+        self._offsets = self._transformedOffsets
+        self._sizes = self._transformedSizes
+        self._transformedImages = []
+        self._transformedOffsets = []
+        self._transformedSizes = []
 
 
     def framesAreSameSize(self):
         # Returns True if all the Surface objects in this animation object
         # have the same width and height. Otherwise, returns False
-        width, height = self.getFrame(0).get_size()
+        width, height = self._getCanvasSize(0)
         for i in range(len(self._images)):
-            if self.getFrame(i).get_size() != (width, height):
+            if self._getCanvasSize(i) != (width, height):
                 return False
         return True
 
@@ -406,7 +1615,7 @@ class PygAnimation():
         frameWidths = []
         frameHeights = []
         for i in range(len(self._images)):
-            frameWidth, frameHeight = self._images[i].get_size()
+            frameWidth, frameHeight = self._sizes[i] or self._images[i].get_size()
             frameWidths.append(frameWidth)
             frameHeights.append(frameHeight)
         maxWidth = max(frameWidths)
@@ -428,89 +1637,109 @@ class PygAnimation():
         # specific "anchor point" (one of the NORTH, SOUTH, SOUTHEAST, etc. constants)
         #
         # By default, they are all anchored to the NORTHWEST corner.
+        #
+        # The frames are aligned by changing their offsets (see getFrameOffset()),
+        # so no Surfaces are created or padded.
         if self.framesAreSameSize():
             return # nothing needs to be anchored
             # This check also prevents additional calls to anchor() from doing
-            # anything, since anchor() sets all the image to the same size.
+            # anything, since anchor() sets all the frames to the same size.
             # The lesson is, you can only effectively call anchor() once.
 
         self.clearTransforms() # clears transforms since this method anchors the original images.
+        self._writableClip()
 
         maxWidth, maxHeight = self.getMaxSize()
         halfMaxWidth = int(maxWidth / 2)
         halfMaxHeight = int(maxHeight / 2)
 
         for i in range(len(self._images)):
-            # go through and copy all frames to a max-sized Surface object
-            # NOTE: This makes changes to the original images in self._images, not the transformed images in self._transformedImages
-            newSurf = pygame.Surface((maxWidth, maxHeight)) # TODO: this is probably going to have errors since I'm using the default depth.
-
-            # set the expanded areas to be transparent
-            newSurf = newSurf.convert_alpha()
-            newSurf.fill((0,0,0,0))
-
-            frameWidth, frameHeight = self._images[i].get_size()
+            # NOTE: This changes the offsets of the original images in self._images, not the transformed images in self._transformedImages
+            frameWidth, frameHeight = self._getCanvasSize(i)
             halfFrameWidth = int(frameWidth / 2)
             halfFrameHeight = int(frameHeight / 2)
 
-            # position the Surface objects to the specified anchor point
+            # position the frames to the specified anchor point
             if anchorPoint == NORTHWEST:
-                newSurf.blit(self._images[i], (0, 0))
+                x, y = (0, 0)
             elif anchorPoint == NORTH:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, 0))
+                x, y = (halfMaxWidth - halfFrameWidth, 0)
             elif anchorPoint == NORTHEAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, 0))
+                x, y = (maxWidth - frameWidth, 0)
             elif anchorPoint == WEST:
-                newSurf.blit(self._images[i], (0, halfMaxHeight - halfFrameHeight))
+                x, y = (0, halfMaxHeight - halfFrameHeight)
             elif anchorPoint == CENTER:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, halfMaxHeight - halfFrameHeight))
+                x, y = (halfMaxWidth - halfFrameWidth, halfMaxHeight - halfFrameHeight)
             elif anchorPoint == EAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, halfMaxHeight - halfFrameHeight))
+                x, y = (maxWidth - frameWidth, halfMaxHeight - halfFrameHeight)
             elif anchorPoint == SOUTHWEST:
-                newSurf.blit(self._images[i], (0, maxHeight - frameHeight))
+                x, y = (0, maxHeight - frameHeight)
             elif anchorPoint == SOUTH:
-                newSurf.blit(self._images[i], (halfMaxWidth - halfFrameWidth, maxHeight - frameHeight))
+                x, y = (halfMaxWidth - halfFrameWidth, maxHeight - frameHeight)
             elif anchorPoint == SOUTHEAST:
-                newSurf.blit(self._images[i], (maxWidth - frameWidth, maxHeight - frameHeight))
-            self._images[i] = newSurf
-
-
-    def nextFrame(self, jump=1):
-        # Set the elapsed time to the beginning of the next frame.
-        # You can jump ahead by multiple frames by specifying a different
-        # argument for jump.
-        # Negative values have the same effect as calling prevFrame()
-        self.currentFrameNum += int(jump)
-
-
-    def prevFrame(self, jump=1):
-        # Set the elapsed time to the beginning of the previous frame.
-        # You can jump ahead by multiple frames by specifying a different
-        # argument for jump.
-        # Negative values have the same effect as calling nextFrame()
-        self.currentFrameNum -= int(jump)
-
-
-    def rewind(self, milliseconds=None):
-        # Set the elapsed time back relative to the current elapsed time.
-        if milliseconds is None:
-            self.elapsed = 0.0
-        else:
-            self.elapsed -= milliseconds
+                x, y = (maxWidth - frameWidth, maxHeight - frameHeight)
+            self._offsets[i] = (self._offsets[i][0] + x, self._offsets[i][1] + y)
+            self._sizes[i] = (maxWidth, maxHeight)
 
 
-    def fastForward(self, milliseconds):
-        # Set the elapsed time forward relative to the current elapsed time.
-        if milliseconds is None:
-            self.elapsed = self._startTimes[-1]
-        else:
-            self.elapsed += milliseconds
-
     def _makeTransformedSurfacesIfNeeded(self):
         # Internal-method. Creates the Surface objects for the _transformedImages list.
         # Don't call this method.
+        self._writableClip() # the transforms change the transformed lists in place
         if self._transformedImages == []:
-            self._transformedImages = [surf.copy() for surf in self._images]
+            self._transformedImages = _setColorkeys([surf.copy() for surf in self._images], self._colorkey)
+            self._transformedOffsets = self._offsets[:]
+            self._transformedSizes = self._sizes[:]
+
+
+    def _setTransformedFrame(self, frameNum, surf, matrix):
+        # Internal-method. Sets the frameNum-th transformed frame to surf, the
+        # current transformed frame after being transformed by the linear map
+        # matrix, a ((a, b), (c, d)) tuple, about its center. If the frame has
+        # an offset, the offset and canvas size are transformed to match, so
+        # that the frame is drawn where the transform would have put it on an
+        # untrimmed frame.
+        if self._transformedSizes[frameNum] is not None:
+            (a, b), (c, d) = matrix
+            canvasWidth, canvasHeight = self._transformedSizes[frameNum]
+            offsetX, offsetY = self._transformedOffsets[frameNum]
+            oldWidth, oldHeight = self._transformedImages[frameNum].get_size()
+
+            # the vector from the canvas's center to the frame's center, before and after the transform
+            x = offsetX + oldWidth / 2.0 - canvasWidth / 2.0
+            y = offsetY + oldHeight / 2.0 - canvasHeight / 2.0
+            x, y = (a * x + b * y, c * x + d * y)
+
+            newWidth = abs(a) * canvasWidth + abs(b) * canvasHeight
+            newHeight = abs(c) * canvasWidth + abs(d) * canvasHeight
+            self._transformedOffsets[frameNum] = (int(round(newWidth / 2.0 + x - surf.get_width() / 2.0)),
+                                                  int(round(newHeight / 2.0 + y - surf.get_height() / 2.0)))
+            self._transformedSizes[frameNum] = (int(round(newWidth)), int(round(newHeight)))
+        if self._colorkey is not None:
+            surf.set_colorkey(self._colorkey, pygame.RLEACCEL) # pygame.transform functions don't keep the RLE acceleration
+        self._transformedImages[frameNum] = surf
+
+
+    def _getScaledSize(self, frameNum, width_height):
+        # Internal-method. Returns the size to scale the frameNum-th frame's
+        # Surface to so that its canvas is scaled to width_height, and the
+        # matrix for _setTransformedFrame().
+        canvasWidth, canvasHeight = self._getCanvasSize(frameNum)
+        scaleX = float(width_height[0]) / canvasWidth
+        scaleY = float(width_height[1]) / canvasHeight
+        width, height = self.getFrame(frameNum).get_size()
+        if (width, height) == (canvasWidth, canvasHeight):
+            return tuple(width_height), ((scaleX, 0), (0, scaleY))
+        return (int(round(width * scaleX)), int(round(height * scaleY))), ((scaleX, 0), (0, scaleY))
+
+
+    def _getRotationMatrix(self, angle, scale=1.0):
+        # Internal-method. Returns the matrix for _setTransformedFrame() of a
+        # counterclockwise rotation by angle degrees (with y going down) and a scale.
+        radians = math.radians(angle)
+        cos = math.cos(radians) * scale
+        sin = math.sin(radians) * scale
+        return ((cos, sin), (-sin, cos))
 
 
     # Transformation methods.
@@ -520,8 +1749,9 @@ class PygAnimation():
         # Flips the image horizontally, vertically, or both.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.flip
         self._makeTransformedSurfacesIfNeeded()
+        matrix = ((-1 if xbool else 1, 0), (0, -1 if ybool else 1))
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.flip(self.getFrame(i), xbool, ybool)
+            self._setTransformedFrame(i, pygame.transform.flip(self.getFrame(i), xbool, ybool), matrix)
 
 
     def scale(self, width_height):
@@ -530,23 +1760,26 @@ class PygAnimation():
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.scale
         self._makeTransformedSurfacesIfNeeded()
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.scale(self.getFrame(i), width_height)
+            size, matrix = self._getScaledSize(i, width_height)
+            self._setTransformedFrame(i, pygame.transform.scale(self.getFrame(i), size), matrix)
 
 
     def rotate(self, angle):
         # Rotates the image.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.rotate
         self._makeTransformedSurfacesIfNeeded()
+        matrix = self._getRotationMatrix(angle)
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.rotate(self.getFrame(i), angle)
+            self._setTransformedFrame(i, pygame.transform.rotate(self.getFrame(i), angle), matrix)
 
 
     def rotozoom(self, angle, scale):
         # Rotates and scales the image simultaneously.
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.rotozoom
         self._makeTransformedSurfacesIfNeeded()
+        matrix = self._getRotationMatrix(angle, scale)
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.rotozoom(self.getFrame(i), angle, scale)
+            self._setTransformedFrame(i, pygame.transform.rotozoom(self.getFrame(i), angle, scale), matrix)
 
 
     def scale2x(self):
@@ -555,7 +1788,7 @@ class PygAnimation():
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.scale2x
         self._makeTransformedSurfacesIfNeeded()
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.scale2x(self.getFrame(i))
+            self._setTransformedFrame(i, pygame.transform.scale2x(self.getFrame(i)), ((2, 0), (0, 2)))
 
 
     def smoothscale(self, width_height):
@@ -565,7 +1798,8 @@ class PygAnimation():
         # See http://pygame.org/docs/ref/transform.html#pygame.transform.smoothscale
         self._makeTransformedSurfacesIfNeeded()
         for i in range(len(self._images)):
-            self._transformedImages[i] = pygame.transform.smoothscale(self.getFrame(i), width_height)
+            size, matrix = self._getScaledSize(i, width_height)
+            self._setTransformedFrame(i, pygame.transform.smoothscale(self.getFrame(i), size), matrix)
 
 
 
@@ -585,12 +1819,16 @@ class PygAnimation():
     # but I don't want to make the code even more unreadable.
     def convert(self, *args, **kwargs):
         # See http://pygame.org/docs/ref/surface.html#Surface.convert
-        self._surfaceMethodWrapper('convert', *args, **kwargs)
+        # (Surface.convert() returns a new Surface rather than changing the
+        # Surface, so the transformed images are replaced.)
+        self._makeTransformedSurfacesIfNeeded()
+        self._transformedImages = _setColorkeys([surf.convert(*args, **kwargs) for surf in self._transformedImages], self._colorkey)
 
 
     def convert_alpha(self, *args, **kwargs):
         # See http://pygame.org/docs/ref/surface.html#Surface.convert_alpha
-        self._surfaceMethodWrapper('convert_alpha', *args, **kwargs)
+        self._makeTransformedSurfacesIfNeeded()
+        self._transformedImages = _setColorkeys([surf.convert_alpha(*args, **kwargs) for surf in self._transformedImages], self._colorkey)
 
 
     def set_alpha(self, *args, **kwargs):
@@ -623,146 +1861,57 @@ class PygAnimation():
         self._surfaceMethodWrapper('unlock', *args, **kwargs)
 
 
+    def _writableClip(self):
+        # Internal-method. Returns this animation's clip, first replacing it
+        # with a copy if it's shared, so changing it doesn't change the frames
+        # of other animations. Call this before changing the clip's lists in place.
+        if self.clip._shared:
+            self.clip = self.clip.copy()
+        self.clip._generation += 1
+        return self.clip
 
-    # Getter and setter methods for properties
-    def _propGetRate(self):
-        return self._rate
-
-    def _propSetRate(self, rate):
-        rate = float(rate)
-        if rate < 0:
-            raise ValueError('rate must be greater than 0.')
-        self._rate = rate
-
-    rate = property(_propGetRate, _propSetRate)
-
-
-    def _propGetLoop(self):
-        return self._loop
-
-    def _propSetLoop(self, loop):
-        if self.state == PLAYING and self._loop and not loop:
-            # if we are turning off looping while the animation is playing,
-            # we need to modify the _playingStartTime so that the rest of
-            # the animation will play, and then stop. (Otherwise, the
-            # animation will immediately stop playing if it has already looped.)
-            self._playingStartTime = TIME_FUNC() - self.elapsed
-        self._loop = bool(loop)
-
-    loop = property(_propGetLoop, _propSetLoop)
-
-
-    def _propGetState(self):
-        if self.isFinished():
-            self._state = STOPPED # if finished playing, then set state to STOPPED.
-
-        return self._state
-
-    def _propSetState(self, state):
-        if state not in (PLAYING, PAUSED, STOPPED):
-            raise ValueError('state must be one of pyganim.PLAYING, pyganim.PAUSED, or pyganim.STOPPED')
-        if state == PLAYING:
-            self.play()
-        elif state == PAUSED:
-            self.pause()
-        elif state == STOPPED:
-            self.stop()
-
-    state = property(_propGetState, _propSetState)
-
-
-    def _propGetVisibility(self):
-        return self._visibility
-
-    def _propSetVisibility(self, visibility):
-        self._visibility = bool(visibility)
-
-    visibility = property(_propGetVisibility, _propSetVisibility)
-
-
-    def _propSetElapsed(self, elapsed):
-        # Set the elapsed time to a specific value.
-        # NOTE: elapsed is in milliseconds
-
-        if self.state == STOPPED:
-            self.state = PAUSED
-
-        if self._loop:
-            elapsed = elapsed % self._startTimes[-1]
-        else:
-            elapsed = getBoundedValue(0, elapsed, self._startTimes[-1])
-
-        rightNow = TIME_FUNC()
-        self._playingStartTime = rightNow - (elapsed * self.rate)
-
-        if self.state in (PAUSED, STOPPED):
-            self.state = PAUSED # if stopped, then set to paused
-            self._pausedStartTime = rightNow
-
-
-    def _propGetElapsed(self):
-        # To prevent infinite recursion, don't use the self.state property,
-        # just read/set self._state directly because the state getter calls
-        # this method.
-
-        # NOTE: Elapsed is in milliseconds, not seconds.
-        assert self._state in (PLAYING, PAUSED, STOPPED), '_state attribute contains an invalid value: %s' % (str(self._state)[:40])
-
-        # Find out how long ago the play()/pause() functions were called.
-        if self._state == STOPPED:
-            # if stopped, then just return 0
-            return 0
-        elif self._state == PLAYING:
-            # if playing, then draw the current frame (based on when the animation
-            # started playing). If not looping and the animation has gone through
-            # all the frames already, then draw the last frame.
-            elapsed = (TIME_FUNC() - self._playingStartTime) * self.rate
-        elif self._state == PAUSED:
-            # if paused, then draw the frame that was playing at the time the
-            # PygAnimation object was paused
-            elapsed = (self._pausedStartTime - self._playingStartTime) * self.rate
-
-        elapsed = int(elapsed)
-
-        if self._loop:
-            elapsed = elapsed % self._startTimes[-1]
-        else:
-            elapsed = getBoundedValue(0, elapsed, self._startTimes[-1])
-        return int(elapsed)
-
-    elapsed = property(_propGetElapsed, _propSetElapsed)
-
-
-    def _propGetCurrentFrameNum(self):
-        # Return the frame number of the frame that will be currently
-        # displayed if the animation object were drawn right now.
-        return findStartTime(self._startTimes, self.elapsed)
-
-
-    def _propSetCurrentFrameNum(self, frameNum):
-        # Change the elapsed time to the beginning of a specific frame.
-        if self._state == STOPPED:
-            self._state = PAUSED # setting the frame num automatically puts it as paused.
-
-        if self.loop:
-            frameNum = frameNum % len(self._images)
-        else:
-            frameNum = getBoundedValue(0, frameNum, len(self._images)-1)
-        self.elapsed = self._startTimes[frameNum]
 
-    currentFrameNum = property(_propGetCurrentFrameNum, _propSetCurrentFrameNum)
+    # The frame data is kept on the clip (see PygClip).
+    _images = _clipAttribute('_images')
+    _durations = _clipAttribute('_durations')
+    _startTimes = _clipAttribute('_startTimes')
+    _decodeTimes = _clipAttribute('_decodeTimes')
+    _offsets = _clipAttribute('_offsets')
+    _sizes = _clipAttribute('_sizes')
+    _transformedImages = _clipAttribute('_transformedImages')
+    _transformedOffsets = _clipAttribute('_transformedOffsets')
+    _transformedSizes = _clipAttribute('_transformedSizes')
+    _colorkey = _clipAttribute('_colorkey')
 
 
 
 class PygConductor(object):
-    def __init__(self, *animations):
+    def __init__(self, *animations, **kwargs):
+        # @param animations PygAnimation objects, or a list or dict of them.
+        # @param shared
+        #     (A keyword argument.) If True, the animations share one timeline
+        #     instead of each keeping its own start and pause times. play()
+        #     and pause() then only change the timeline, however many
+        #     animations there are, and each animation only keeps its phase
+        #     (see setPhase()). The animations' own state stays PLAYING while
+        #     the conductor is playing or paused, so play and pause them with
+        #     the conductor. Animations that don't loop stay stopped once
+        #     they finish, until the conductor is stopped and played again,
+        #     or seeks (with rewind(), fastForward(), nextFrame(),
+        #     prevFrame(), or elapsed) to before their end.
         assert len(animations) > 0, 'at least one PygAnimation object is required'
+        shared = kwargs.pop('shared', False)
+        if kwargs:
+            raise TypeError('unexpected keyword argument %s' % (list(kwargs)[0]))
 
         self._animations = []
+        self._clock = None # the clock that play() and pause() use, and that the animations are set to (see PygPlayhead's clock)
+        self._timeline = _Timeline() if shared else None # the _Timeline the animations share, if shared is True
         self.add(*animations)
 
 
     def add(self, *animations):
+        numAnimations = len(self._animations)
         if type(animations[0]) == dict:
             for k in animations[0].keys():
                 self._animations.append(animations[0][k])
@@ -772,30 +1921,148 @@ class PygConductor(object):
         else:
             for i in range(len(animations)):
                 self._animations.append(animations[i])
+        for animObj in self._animations[numAnimations:]:
+            if self._timeline is not None:
+                self._joinTimeline(animObj)
+            elif self._clock is not None:
+                animObj.clock = self._clock
+
+    def _joinTimeline(self, animObj):
+        # Internal-method. Makes the animation play by the shared timeline,
+        # with a phase of 0.
+        animObj._clock = self._timeline
+        animObj._playingStartTime = 0 # (on the timeline, this is minus the phase)
+        animObj._state = STOPPED if self._timeline.state == STOPPED else PLAYING
+        animObj._timingChanged()
+
+    def _setTimelineState(self, state):
+        # Internal-method. Sets the shared timeline's state. The animations
+        # only change state when the timeline starts or stops.
+        rearm = (self._timeline.state == STOPPED) != (state == STOPPED)
+        self._timeline.state = state
+        self._timelineChanged(rearm)
+
+    def _seekTimeline(self, position):
+        # Internal-method. Moves the shared timeline to position nanoseconds.
+        # A stopped conductor is paused. Animations that finished are played
+        # again (and stop again if position is past their end).
+        if self._timeline.state == STOPPED:
+            self._timeline.state = PAUSED
+        self._timeline.seek(position)
+        self._timelineChanged(True)
+
+    def _timelineChanged(self, rearm=False):
+        # Internal-method. Called after the shared timeline plays, pauses,
+        # stops, or seeks. If rearm is True, sets every animation's state to
+        # match the timeline (PLAYING unless it's stopped). Otherwise, this
+        # only has to tell an EventScheduler watching the animations (see
+        # PygPlayhead's _timingChanged()), and does nothing if there isn't one.
+        if not rearm and not _scheduledPlayheads:
+            return
+        state = STOPPED if self._timeline.state == STOPPED else PLAYING
+        for animObj in self._animations:
+            if rearm:
+                animObj._state = state
+            animObj._timingChanged()
 
     def _propGetAnimations(self):
         return self._animations
 
     def _propSetAnimations(self, val):
+        if self._timeline is not None:
+            for animObj in val:
+                if animObj._clock is not self._timeline:
+                    self._joinTimeline(animObj)
         self._animations = val
 
     animations = property(_propGetAnimations, _propSetAnimations)
 
-    def play(self, startTime=None):
-        if startTime is None:
-            startTime = TIME_FUNC()
+    def _propGetClock(self):
+        return self._clock
+
+    def _propSetClock(self, clock):
+        if self._timeline is not None:
+            # the animations play by the timeline, which plays by the clock
+            position = self._timeline._getNs()
+            self._timeline.clock = clock
+            self._timeline._startNs = _clockNs(clock) - position
+            self._timelineChanged()
+        else:
+            for animObj in self._animations:
+                animObj.clock = clock
+        self._clock = clock
+
+    clock = property(_propGetClock, _propSetClock)
+
+    def _propGetElapsed(self):
+        # The first animation's elapsed. (With a shared timeline, that's the
+        # timeline's position plus the first animation's phase, wrapped
+        # around or bounded by its length like any animation's elapsed.)
+        return self._animations[0].elapsed
+
+    def _propSetElapsed(self, elapsed):
+        # Seeks to elapsed milliseconds. A stopped conductor is paused.
+        if self._timeline is not None:
+            # seek the timeline to where the first animation's elapsed is elapsed
+            animObj = self._animations[0]
+            if animObj._loop:
+                elapsed = elapsed % animObj.clip._startTimes[-1]
+            else:
+                elapsed = getBoundedValue(0, elapsed, animObj.clip._startTimes[-1])
+            rate = animObj._rate or 1.0
+            # (rounding up, so the first animation's elapsed doesn't come out a millisecond short)
+            self._seekTimeline(animObj._playingStartTime + int(math.ceil(elapsed * 1000000 / rate)))
+            return
+        for animObj in self._animations:
+            animObj.elapsed = elapsed
+
+    elapsed = property(_propGetElapsed, _propSetElapsed)
+
+    def _propGetState(self):
+        # With a shared timeline, its state. Otherwise, the first animation's state.
+        if self._timeline is not None:
+            return self._timeline.state
+        return self._animations[0].state
+
+    state = property(_propGetState)
+
+    def setPhase(self, animObj, phase):
+        # Sets how many milliseconds ahead of the shared timeline the
+        # animation plays. (For a conductor with shared=True.)
+        assert self._timeline is not None, 'setPhase() is for conductors with a shared timeline'
+        animObj._playingStartTime = -_msToNs(phase)
+        animObj._timingChanged()
+
+    def getPhase(self, animObj):
+        # Returns how many milliseconds ahead of the shared timeline the
+        # animation plays. (For a conductor with shared=True.)
+        assert self._timeline is not None, 'getPhase() is for conductors with a shared timeline'
+        return -animObj._playingStartTime / 1000000.0
 
+    def play(self, startTime=None):
+        # (If startTime is None, each animation reads its own clock, which
+        # may be a different one from the conductor's.)
+        if self._timeline is not None:
+            if self._timeline.state != PLAYING:
+                self._timeline.play(_clockNs(self._clock) if startTime is None else _msToNs(startTime))
+                self._setTimelineState(PLAYING)
+            return
         for animObj in self._animations:
             animObj.play(startTime)
 
     def pause(self, startTime=None):
-        if startTime is None:
-            startTime = TIME_FUNC()
-
+        if self._timeline is not None:
+            self._timeline.pause(_clockNs(self._clock) if startTime is None else _msToNs(startTime))
+            self._setTimelineState(PAUSED)
+            return
         for animObj in self._animations:
             animObj.pause(startTime)
 
     def stop(self):
+        if self._timeline is not None:
+            self._timeline._positionNs = 0
+            self._setTimelineState(STOPPED)
+            return
         for animObj in self._animations:
             animObj.stop()
 
@@ -812,22 +2079,66 @@ class PygConductor(object):
             animObj.makeTransformsPermanent()
 
     def togglePause(self):
+        if self._timeline is not None:
+            if self._timeline.state == PLAYING:
+                self.pause()
+            else:
+                self.play()
+            return
         for animObj in self._animations:
             animObj.togglePause()
 
     def nextFrame(self, jump=1):
+        if self._timeline is not None:
+            self._seekToFrame(int(jump))
+            return
         for animObj in self._animations:
             animObj.nextFrame(jump)
 
     def prevFrame(self, jump=1):
+        if self._timeline is not None:
+            self._seekToFrame(-int(jump))
+            return
         for animObj in self._animations:
             animObj.prevFrame(jump)
 
+    def _seekToFrame(self, jump):
+        # Internal-method. Seeks the shared timeline to the start of the
+        # first animation's frame that is jump frames from its current frame.
+        # (The other animations move by the same amount of time.)
+        animObj = self._animations[0]
+        self._seekTimeline(self._timeline._getNs()) # (pauses a stopped conductor, and plays a finished animation again so its current frame is known)
+        startTimes = animObj.clip._startTimes
+        if animObj._loop:
+            frameNum = (animObj.currentFrameNum + jump) % animObj.clip.numFrames
+        else:
+            frameNum = getBoundedValue(0, animObj.currentFrameNum + jump, animObj.clip.numFrames - 1)
+        position = self._timeline._getNs()
+        played = (position - animObj._playingStartTime) * animObj._rate / 1000000.0
+        if animObj._loop:
+            played = played % startTimes[-1]
+        else:
+            played = getBoundedValue(0, played, startTimes[-1])
+        # (rounding up, so the frame is found at its start time rather than a nanosecond before it)
+        self._seekTimeline(position + int(math.ceil((startTimes[frameNum] - played) * 1000000 / animObj._rate)))
+
     def rewind(self, seconds=None):
+        if self._timeline is not None:
+            if seconds is None:
+                self._seekTimeline(0)
+            else:
+                self._seekTimeline(self._timeline._getNs() - _msToNs(seconds))
+            return
         for animObj in self._animations:
             animObj.rewind(seconds)
 
     def fastForward(self, seconds):
+        if self._timeline is not None:
+            if seconds is None:
+                self._seekTimeline(_msToNs(max([animObj.clip._startTimes[-1] for animObj in self._animations])))
+            else:
+                self._seekTimeline(self._timeline._getNs() + _msToNs(seconds))
+            return
         for animObj in self._animations:
             animObj.fastForward(seconds)
 
@@ -888,6 +2199,45 @@ class PygConductor(object):
             animObj.unlock()
 
 
+class _Timeline(object):
+    # The timeline that the animations of a PygConductor made with
+    # shared=True play by. It's the animations' clock: its time is how far
+    # the timeline has played, in nanoseconds, which doesn't move while it's
+    # paused or stopped. So playing, pausing, and seeking the conductor only
+    # changes the timeline, and each animation's _playingStartTime is just
+    # minus its phase. (Each animation still works out its own elapsed time
+    # from the timeline's, but that's one subtraction, and with beginFrame()
+    # the clock is only read once per game loop iteration for all of them.)
+    def __init__(self):
+        self.clock = None # the clock the timeline plays by (see _clockNs())
+        self.state = STOPPED
+        self._startNs = 0 # while playing, the clock's time when the timeline was at 0
+        self._positionNs = 0 # while paused or stopped, where the timeline is
+
+    def _getNs(self):
+        # Returns how far the timeline has played, in nanoseconds.
+        if self.state == PLAYING:
+            return _clockNs(self.clock) - self._startNs
+        return self._positionNs
+
+    def play(self, now):
+        # Starts playing from the current position at the clock time now (in nanoseconds).
+        if self.state != PLAYING:
+            self._startNs = now - self._positionNs
+
+    def pause(self, now):
+        # Stops moving at the clock time now (in nanoseconds).
+        if self.state == PLAYING:
+            self._positionNs = now - self._startNs
+
+    def seek(self, position):
+        # Moves the timeline to position nanoseconds.
+        if self.state == PLAYING:
+            self._startNs = _clockNs(self.clock) - position
+        else:
+            self._positionNs = position
+
+
 def getBoundedValue(lowerBound, value, upperBound):
     # Returns the value within the bounds of the lower and upper bound parameters.
     # If value is less than lowerBound, then return lowerBound.
@@ -903,36 +2253,104 @@ def getBoundedValue(lowerBound, value, upperBound):
     return value
 
 
+def _getFrameKey(surf):
+    # Returns a hashable key of a Surface's size, pixel format, and a hash of
+    # its pixels, for looking it up in _frameRegistry.
+    pixelHash = hashlib.sha1(pygame.image.tostring(surf, 'RGBA')).digest()
+    return (surf.get_size(), surf.get_bitsize(), surf.get_masks(), surf.get_flags() & pygame.SRCALPHA, surf.get_colorkey(), surf.get_alpha(), pixelHash)
+
+
+def _getStartTimes(durations):
+    # Returns the list of start times for frames with these durations. The
+    # list has one more item than durations: the length of the whole animation.
+    # e.g. if durations is [1000, 1000, 2500], returns [0, 1000, 2000, 4500]
+    startTimes = [0]
+    for duration in durations:
+        startTimes.append(startTimes[-1] + duration)
+    return startTimes
+
+
 def findStartTime(startTimes, target):
     # With startTimes as a list of sequential numbers and target as a number,
     # returns the index of the number in startTimes that preceeds target.
     #
     # For example, if startTimes was [0, 2000, 4500, 7300, 10000] and target was 6000,
     # then findStartTime() would return 2. If target was 12000, returns 4.
-    assert startTimes[0] == 0, 'The first value in the start times list should always be 0.'
-    lb = 0 # "lb" is lower bound
-    ub = len(startTimes) - 1 # "ub" is upper bound
-
-    # handle special cases:
-    if len(startTimes) == 0:
-        return 0
+    #
+    # The first value in startTimes should always be 0.
     if target >= startTimes[-1]:
-        return ub - 1
+        return len(startTimes) - 2
+    if target < 0:
+        return 0
+    return bisect.bisect_right(startTimes, target) - 1
+
+
+class _FrameLookup(object):
+    # Finds the frame shown at an elapsed time, like findStartTime(), but
+    # with a structure precomputed from one animation's start times:
+    #   - If every frame has the same duration, the frame number is the elapsed
+    #     time divided by the duration.
+    #   - If the durations are whole milliseconds, the animation is split into
+    #     slices of their greatest common divisor, and a table holds the frame
+    #     shown during each slice (as long as there are at most
+    #     LOOKUP_TABLE_SIZE slices).
+    #   - Otherwise the frame found last time and the one after it are checked
+    #     first (since that's almost always the answer), and then the start
+    #     times (in an array) are binary searched.
+    def __init__(self, startTimes):
+        self.startTimes = startTimes # the list this lookup was made from
+        self._numFrames = len(startTimes) - 1
+        self._length = startTimes[-1]
+        self._step = None # the duration of every frame, or of every slice of the table
+        self._table = None # the frame number shown during each slice
+        self._array = None # the start times, for binary searching
+        self._cursor = 0 # the frame found by the last binary search
+
+        durations = [startTimes[i + 1] - startTimes[i] for i in range(self._numFrames)]
+        if self._numFrames == 0 or self._length <= 0:
+            return # find() returns the last frame for every elapsed time
+        if min(durations) == max(durations):
+            self._step = durations[0]
+            return
+        if all([duration == int(duration) for duration in durations]):
+            step = 0
+            for duration in durations:
+                step = _gcd(step, int(duration))
+            if self._length // step <= LOOKUP_TABLE_SIZE:
+                self._step = step
+                self._table = []
+                for frameNum, duration in enumerate(durations):
+                    self._table.extend([frameNum] * int(duration // step)) # zero length frames get no slices, so they're never shown
+                return
+        self._array = array.array('d', startTimes)
+
+
+    def find(self, elapsed):
+        if elapsed >= self._length:
+            return self._numFrames - 1
+        if elapsed < 0:
+            return 0
+        if self._table is not None:
+            return self._table[int(elapsed // self._step)]
+        if self._step is not None:
+            return int(elapsed // self._step)
 
-    # perform binary search:
-    while True:
-        i = int((ub - lb) / 2) + lb
+        startTimes = self._array
+        i = self._cursor
+        if startTimes[i] <= elapsed < startTimes[i + 1]:
+            return i
+        if startTimes[i + 1] <= elapsed < startTimes[i + 2]: # (elapsed < length, so i + 1 isn't the last index here)
+            self._cursor = i + 1
+            return i + 1
+        self._cursor = bisect.bisect_right(startTimes, elapsed) - 1
+        return self._cursor
 
-        if startTimes[i] == target or (startTimes[i] < target and startTimes[i+1] > target):
-            if i == len(startTimes):
-                return i - 1
-            else:
-                return i
 
-        if startTimes[i] < target:
-            lb = i
-        elif startTimes[i] > target:
-            ub = i
+def _gcd(a, b):
+    # Returns the greatest common divisor of the integers a and b.
+    while b:
+        a, b = b, a % b
+    return a
 
 
 def splitGif(filename):
@@ -940,25 +2358,515 @@ def splitGif(filename):
     # Requires PIL or Pillow to be installed
     from PIL import Image
 
-    def iterAnimatedGifFrames(im):
-        # Iterator for frames in an animated GIF.
-        try:
-            i= 0
-            while 1:
-                im.seek(i)
-                imframe = im.copy()
-                if i == 0:
-                    palette = imframe.getpalette()
-                else:
-                    imframe.putpalette(palette)
-                yield imframe
-                i += 1
-        except EOFError:
-            pass
-
     gifFile = open(str(filename), 'rb')
     im = Image.open(gifFile) # passing a file-like object so that we can close it and the unit tests won't complain.
-    retVal = list(iterAnimatedGifFrames(im))
+    retVal = [imframe.copy() for imframe, decodeTime in _iterAnimatedFrames(im)]
     gifFile.close()
     return retVal
 
+
+def _iterAnimatedFrames(im):
+    # Iterator for frames in an animated PIL Image. Yields (image, decodeTime)
+    # tuples, where decodeTime is in milliseconds. The yielded image may be
+    # im itself, so copy() it if it needs to be kept after the next frame.
+    palette = None
+    i = 0
+    while True:
+        decodeStartTime = _perfCounter()
+        try:
+            im.seek(i)
+            im.load()
+        except EOFError:
+            return
+        imframe = im
+        if i == 0:
+            palette = im.getpalette()
+        elif im.mode == 'P' and im.getpalette() is None and palette is not None:
+            # older versions of PIL drop the global palette after the first frame
+            imframe = im.copy()
+            imframe.putpalette(palette)
+        yield imframe, (_perfCounter() - decodeStartTime) * 1000.0
+        i += 1
+
+
+def _pilImageToSurface(im):
+    # Converts a PIL Image object to a pygame.Surface object in memory, without
+    # writing it out to a temporary file.
+    if im.mode != 'RGBA':
+        im = im.convert('RGBA') # also turns a palette's transparent color index into alpha
+    # (fromstring() copies the pixels. A Surface from frombuffer() would draw
+    # on the immutable bytes object that tobytes() returns.)
+    return pygame.image.fromstring(im.tobytes(), im.size, 'RGBA')
+
+
+def _isAnimationFilename(frames):
+    # Returns True if the frames argument of PygAnimation's constructor is the
+    # filename of an animated GIF, PNG, or WebP file.
+    return type(frames) == str and os.path.splitext(frames)[1].lower() in _ANIMATION_EXTENSIONS
+
+
+def _loadAnimatedFrames(filename, convert=False):
+    # Loads every frame of an animated GIF, PNG (APNG), or WebP file. Each
+    # frame is turned into a Surface as soon as Pillow decodes it, so only one
+    # of Pillow's frames is in memory at a time. Pillow applies the frames'
+    # disposal and blending, so each frame is the full composited image.
+    # Returns a list of (Surface, duration) tuples and a list of the
+    # milliseconds spent decoding each frame. If convert is True, the frames
+    # are converted with convertFrame(). (A PNG or WebP file that isn't
+    # animated has one frame.)
+    from PIL import Image
+
+    frames = []
+    decodeTimes = []
+    imageFile = open(str(filename), 'rb')
+    im = Image.open(imageFile)
+    for imframe, decodeTime in _iterAnimatedFrames(im):
+        convertStartTime = _perfCounter()
+        surf = _pilImageToSurface(imframe)
+        if convert:
+            surf = convertFrame(surf)
+        frames.append((surf, imframe.info.get('duration') or DEFAULT_DURATION)) # Pillow's durations are already in milliseconds
+        decodeTimes.append(decodeTime + (_perfCounter() - convertStartTime) * 1000.0)
+    imageFile.close()
+    return frames, decodeTimes
+
+
+def _makeLazyFrames(frames, convert=False, colorkey=None):
+    # Returns a _LazyFrames object and a list of durations for the frames
+    # argument of PygAnimation's constructor. frames can be an animated GIF,
+    # PNG, or WebP filename, a list of image filenames, or a list of
+    # (filename, duration) tuples.
+    if _isAnimationFilename(frames):
+        if frames.lower().endswith('.gif'):
+            source = _GifFrameSource(frames)
+        else:
+            source = _PillowFrameSource(frames)
+        source.convert = convert
+        source.colorkey = colorkey
+        return _LazyFrames(source), source.durations
+
+    if type(frames) == str or len(frames) == 0:
+        raise ValueError('lazy frames must be an animated GIF, PNG, or WebP filename or a list of image filenames')
+    if type(frames[0]) == str:
+        frames = list(zip(frames, [DEFAULT_DURATION] * len(frames))) # add default duration
+    for i, frame in enumerate(frames):
+        assert type(frame) in (list, tuple) and len(frame) == 2, 'Frame %s has incorrect format. It should be a tuple of length 2, first item an image filename, second item an int/float of duration.' % (i)
+        assert type(frame[0]) == str, 'Frame %s image must be a string filename when lazy is True' % (i)
+        assert frame[1] > 0, 'Frame %s duration must be greater than zero.' % (i)
+    source = _FileFrameSource([frame[0] for frame in frames])
+    source.convert = convert
+    source.colorkey = colorkey
+    return _LazyFrames(source), [int(frame[1]) for frame in frames]
+
+
+class _LazyFrames(object):
+    # A list-like sequence of frame Surfaces that are decoded by a frame source
+    # the first time they are needed. Slicing and reversing return views that
+    # share the same source (and so the same window of decoded frames), which
+    # is what getCopies() and reverse() rely on.
+    def __init__(self, source, indexes=None):
+        self._source = source
+        if indexes is None:
+            indexes = list(range(len(source)))
+        self._indexes = indexes # maps frame numbers of this view to frame numbers of the source
+
+    @property
+    def decodeTimes(self):
+        return self._source.decodeTimes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.__class__(self._source, self._indexes[i])
+        return self._source.getSurface(self._indexes[i])
+
+    def __iter__(self):
+        for i in self._indexes:
+            yield self._source.getSurface(i)
+
+    def reverse(self):
+        self._indexes.reverse()
+
+
+class _DeltaFrames(_LazyFrames):
+    # A _LazyFrames whose source is a _DeltaFrameSource. Indexing returns the
+    # source's one reusable Surface (so it's only good until the next frame
+    # is indexed), while iterating returns a separate copy of each frame, so
+    # list() of it is a list of ordinary frames.
+    def __iter__(self):
+        for i in self._indexes:
+            yield self._source.getSurface(i).copy()
+
+
+class _DeltaFrameSource(object):
+    # Frames stored as a keyframe (the first frame) plus, for each frame, a
+    # "patch" of the rect of pixels that differ from the keyframe. A frame is
+    # reconstructed by copying the keyframe's pixels back over the previously
+    # shown patch, then copying the frame's patch onto one reusable Surface.
+    def __init__(self, frames):
+        keyframe = frames[0]
+        self._canvas = keyframe.copy() # the Surface that frames are reconstructed on (keeps the keyframe's colorkey and alpha)
+        self._base = _getRawCopy(keyframe) # the keyframe's pixels, to copy back over patches
+        self._patches = [] # a (rect, Surface) tuple for each frame, or None if it's the same as the keyframe
+        for surf in frames:
+            rect = None
+            if surf is not keyframe:
+                surf = _getRawCopy(surf)
+                rect = _getChangedRect(self._base, surf)
+            if rect is None:
+                self._patches.append(None)
+            else:
+                self._patches.append((rect, surf.subsurface(rect).copy()))
+        self._shownFrameNum = None # the frame currently on the canvas
+        self._shownRect = None # the rect of the patch currently on the canvas
+        self.decodeTimes = [0.0] * len(frames)
+
+    def __len__(self):
+        return len(self._patches)
+
+    def getSurface(self, i):
+        if i == self._shownFrameNum:
+            return self._canvas
+        if self._shownRect is not None:
+            _copyPixels(self._canvas, self._base, self._shownRect.topleft, self._shownRect)
+        patch = self._patches[i]
+        if patch is None:
+            self._shownRect = None
+        else:
+            _copyPixels(self._canvas, patch[1], patch[0].topleft)
+            self._shownRect = patch[0]
+        self._shownFrameNum = i
+        return self._canvas
+
+    def getBytes(self):
+        # Returns the bytes of pixel data used by the keyframe, canvas, and patches.
+        surfaces = [self._canvas, self._base] + [patch[1] for patch in self._patches if patch is not None]
+        return sum([surf.get_pitch() * surf.get_height() for surf in surfaces])
+
+
+def _getRawCopy(surf):
+    # Returns a copy of the Surface without its colorkey or per-Surface
+    # alpha, so blitting it copies its pixels exactly (see _copyPixels()).
+    surf = surf.copy()
+    surf.set_colorkey(None)
+    if surf.get_flags() & pygame.SRCALPHA:
+        surf.set_alpha(255) # (set_alpha(None) would turn off the per-pixel alpha too)
+    else:
+        surf.set_alpha(None)
+    return surf
+
+
+def _copyPixels(destSurface, surf, dest, area=None):
+    # Copies surf's pixels (or the area rect of them) onto destSurface at dest,
+    # replacing the pixels there rather than alpha blending over them.
+    if destSurface.get_flags() & pygame.SRCALPHA:
+        size = area[2:] if area is not None else surf.get_size()
+        destSurface.fill((0, 0, 0, 0), (dest, size))
+        destSurface.blit(surf, dest, area, pygame.BLEND_RGBA_ADD) # adding onto all zeros is an exact copy
+    else:
+        destSurface.blit(surf, dest, area)
+
+
+def _getChangedRect(surf1, surf2):
+    # Returns the smallest pygame.Rect holding every pixel that is different
+    # between the two same-sized Surfaces, or None if they're identical.
+    # (The differences are found with blend blits and a mask, so it all
+    # happens in C without needing NumPy.)
+    width, height = surf1.get_size()
+    rgba1 = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    rgba2 = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    _copyPixels(rgba1, surf1, (0, 0))
+    _copyPixels(rgba2, surf2, (0, 0))
+    difference = rgba1.copy()
+    difference.blit(rgba2, (0, 0), None, pygame.BLEND_RGBA_SUB) # subtraction saturates at 0, so subtract both ways
+    rgba2.blit(rgba1, (0, 0), None, pygame.BLEND_RGBA_SUB)
+    difference.blit(rgba2, (0, 0), None, pygame.BLEND_RGBA_MAX)
+
+    mask = pygame.mask.from_threshold(difference, (0, 0, 0, 0), (1, 1, 1, 1)) # the pixels that are the same
+    mask.invert()
+    rects = mask.get_bounding_rects()
+    if not rects:
+        return None
+    return rects[0].unionall(rects[1:])
+
+
+class _WindowedFrameSource(object):
+    # Base class for the sources of _LazyFrames. Subclasses implement _decode(),
+    # and getSurface() keeps the most recently used decoded frames around.
+    # If convert is True, getSurface() returns the frames converted with
+    # convertFrame(). (The unconverted frames are kept as well, since a GIF's
+    # frames are composited from the frames before them.) If colorkey isn't
+    # None, it's set on the returned frames with RLE acceleration.
+    def __init__(self, numFrames):
+        self.window = LAZY_WINDOW
+        self.convert = False
+        self.colorkey = None
+        self.decodeTimes = [0.0] * numFrames
+        self._decoded = collections.OrderedDict() # maps frame number to Surface, least recently used first
+        self._converted = {} # maps frame number to the converted Surface, for the frames in _decoded
+        self._numFrames = numFrames
+
+    def __len__(self):
+        return self._numFrames
+
+    def getSurface(self, i):
+        surf = self._decoded.pop(i, None)
+        if surf is None:
+            decodeStartTime = _perfCounter()
+            surf = self._decode(i)
+            self.decodeTimes[i] = (_perfCounter() - decodeStartTime) * 1000.0
+        self._keep(i, surf)
+        if self.convert or self.colorkey is not None:
+            if i not in self._converted:
+                self._converted[i] = _setColorkeys([convertFrame(surf) if self.convert else surf.copy()], self.colorkey)[0]
+            return self._converted[i]
+        return surf
+
+    def _keep(self, i, surf):
+        self._decoded[i] = surf
+        while len(self._decoded) > max(1, self.window):
+            self._converted.pop(self._decoded.popitem(last=False)[0], None)
+
+
+class _FileFrameSource(_WindowedFrameSource):
+    # Frames that are each in their own image file.
+    def __init__(self, filenames):
+        _WindowedFrameSource.__init__(self, len(filenames))
+        self._filenames = filenames
+
+    def _decode(self, i):
+        return _loadImage(self._filenames[i])
+
+
+class _GifFrameSource(_WindowedFrameSource):
+    # Frames of an animated GIF. Creating this only reads the GIF's block
+    # structure (see _scanGif()) without decoding any pixels. Each frame is then
+    # decoded on its own from its offset in the file and composited onto the
+    # frames before it, starting from the closest frame that is already
+    # decoded or that doesn't depend on the frames before it. This way seeking
+    # never has to decode everything from the first frame.
+    def __init__(self, filename):
+        self._filename = str(filename)
+        self.canvasSize, self._header, self._frames = _scanGif(self._filename)
+        _WindowedFrameSource.__init__(self, len(self._frames))
+        if self._numFrames == 0:
+            raise ValueError('%s has no frames' % (self._filename))
+        self.durations = [frame['duration'] for frame in self._frames]
+
+    def _decode(self, i):
+        if self._frames[i]['isKey']:
+            return self._decodeFrameImage(i)
+
+        # Find the frame to start compositing from: the closest earlier frame
+        # whose composited image is known and whose disposal doesn't need the
+        # frames before it. (-1 means starting from an empty canvas.)
+        start = i - 1
+        while start >= 0:
+            frame = self._frames[start]
+            if frame['disposal'] != 3 and (start in self._decoded or frame['isKey']):
+                break
+            start -= 1
+
+        if start == -1:
+            canvas = pygame.Surface(self.canvasSize, pygame.SRCALPHA, 32)
+        else:
+            canvas = self._decoded.get(start)
+            if canvas is None:
+                canvas = self._decodeFrameImage(start)
+                self._keep(start, canvas)
+        base = self._dispose(canvas, start)
+
+        for j in range(start + 1, i + 1):
+            if self._frames[j]['isKey']:
+                canvas = self._decodeFrameImage(j)
+            else:
+                canvas = base.copy()
+                canvas.blit(self._decodeFrameImage(j), self._frames[j]['rect'][:2])
+            if j < i:
+                self._keep(j, canvas) # frames on the way are kept too, since they're right behind the playhead
+                if self._frames[j]['disposal'] != 3: # disposal 3 means "restore to previous", so the base stays the same
+                    base = self._dispose(canvas, j)
+        return canvas
+
+    def _dispose(self, canvas, i):
+        # Returns the canvas that frame i+1 is drawn on, given the canvas for frame i.
+        if i == -1 or self._frames[i]['disposal'] != 2:
+            return canvas
+        base = canvas.copy()
+        base.fill(self._frames[i]['background'], self._frames[i]['rect']) # disposal 2 means "restore to background"
+        return base
+
+    def _decodeFrameImage(self, i):
+        # Decodes only frame i's own pixels (not composited with the frames
+        # before it) by giving PIL a single-frame GIF made from the GIF's
+        # header and the frame's bytes.
+        from PIL import Image
+
+        frame = self._frames[i]
+        gifFile = open(self._filename, 'rb')
+        blocks = []
+        for start, end in (frame['control'], frame['image']):
+            gifFile.seek(start)
+            blocks.append(bytearray(gifFile.read(end - start)))
+        gifFile.close()
+
+        header = bytearray(self._header)
+        header[6:10] = struct.pack('<HH', frame['rect'][2], frame['rect'][3]) # the canvas is just the frame's rect...
+        blocks[1][1:5] = struct.pack('<HH', 0, 0) # ...and the frame is placed at its top left corner
+        im = Image.open(io.BytesIO(bytes(header + blocks[0] + blocks[1] + bytearray(b'\x3b'))))
+        return _pilImageToSurface(im)
+
+
+class _PillowFrameSource(_WindowedFrameSource):
+    # Frames of an animated PNG or WebP file. Creating this only reads the
+    # frame durations from the file's chunks (see _scanAnimationDurations())
+    # without decoding any pixels. The frames are decoded by Pillow, which
+    # composites each frame onto the frames before it (following the frames'
+    # blend and dispose ops). Pillow decodes forward from the last frame it
+    # decoded, so playing the animation forward decodes each frame once. To
+    # go backward, the file is opened again and decoded from the first frame
+    # (seeking an open APNG backward to a frame other than the first makes
+    # Pillow raise a SyntaxError about frame sequence errors).
+    def __init__(self, filename):
+        self._filename = str(filename)
+        self.durations = _scanAnimationDurations(self._filename)
+        _WindowedFrameSource.__init__(self, len(self.durations))
+        self._im = None # the open PIL Image, which remembers which frame it last decoded
+        self._lastDecoded = -1 # the index of the frame the PIL Image last decoded
+
+    def _decode(self, i):
+        if self._im is not None and i < self._lastDecoded:
+            self._im.close()
+            self._im = None
+        if self._im is None:
+            from PIL import Image
+            self._im = Image.open(self._filename)
+        self._im.seek(i)
+        self._lastDecoded = i
+        self._im.load()
+        return _pilImageToSurface(self._im)
+
+
+def _scanAnimationDurations(filename):
+    # Reads the durations (in milliseconds) of the frames of an animated PNG
+    # or WebP file from its fcTL or ANMF chunks, without reading or decoding
+    # any pixels. Returns the same durations that Pillow reports for each
+    # frame. A file that isn't animated has one frame of DEFAULT_DURATION.
+    imageFile = open(filename, 'rb')
+    try:
+        header = imageFile.read(12)
+        durations = []
+        if header[:8] == b'\x89PNG\r\n\x1a\n':
+            imageFile.seek(8)
+            defaultImageIsSeparate = False
+            while True:
+                chunkHeader = imageFile.read(8)
+                if len(chunkHeader) < 8:
+                    break
+                length, chunkType = struct.unpack('>I4s', chunkHeader)
+                if chunkType == b'fcTL':
+                    delayNum, delayDen = struct.unpack('>HH', imageFile.read(26)[20:24])
+                    duration = delayNum * 1000.0 / (delayDen or 100) # a denominator of 0 means 1/100 seconds
+                    durations.append(int(duration) or DEFAULT_DURATION)
+                    imageFile.seek(length - 26 + 4, 1) # skip the rest of the chunk and its CRC
+                else:
+                    if chunkType == b'IDAT' and not durations:
+                        defaultImageIsSeparate = True # the IDAT image comes before any fcTL, so it isn't part of the animation
+                    elif chunkType == b'IEND':
+                        break
+                    imageFile.seek(length + 4, 1)
+            if defaultImageIsSeparate and durations:
+                durations.insert(0, DEFAULT_DURATION) # Pillow returns the default image as the first frame
+        elif header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            while True:
+                chunkHeader = imageFile.read(8)
+                if len(chunkHeader) < 8:
+                    break
+                chunkType, length = struct.unpack('<4sI', chunkHeader)
+                if chunkType == b'ANMF':
+                    frameHeader = bytearray(imageFile.read(16))
+                    durations.append((frameHeader[12] | frameHeader[13] << 8 | frameHeader[14] << 16) or DEFAULT_DURATION)
+                    imageFile.seek(length + (length & 1) - 16, 1)
+                else:
+                    imageFile.seek(length + (length & 1), 1) # chunks are padded to an even length
+        else:
+            raise ValueError('%s is not a PNG or WebP file' % (filename))
+    finally:
+        imageFile.close()
+    return durations or [DEFAULT_DURATION]
+
+
+def _scanGif(filename):
+    # Reads the block structure of a GIF file without decoding any pixels.
+    # Returns the canvas size, the bytes of the GIF's header (including the
+    # global color table), and a list of dicts, one for each frame, that
+    # index where the frame's data is in the file and how it's displayed.
+    gifFile = open(filename, 'rb')
+    data = bytearray(gifFile.read())
+    gifFile.close()
+    if bytes(data[:6]) not in (b'GIF87a', b'GIF89a'):
+        raise ValueError('%s is not a GIF file' % (filename))
+
+    canvasSize = struct.unpack('<HH', bytes(data[6:10]))
+    headerEnd = 13
+    globalPalette = None
+    if data[10] & 0x80:
+        headerEnd += 3 * (2 << (data[10] & 0x07))
+        globalPalette = data[13:headerEnd]
+
+    frames = []
+    control = (0, 0) # the (start, end) offsets of the graphic control extension for the next frame
+    pos = headerEnd
+    while pos < len(data) and data[pos] != 0x3b:
+        if data[pos] == 0x21: # extension block
+            start = pos
+            pos = _skipGifSubBlocks(data, pos + 2)
+            if data[start + 1] == 0xf9:
+                control = (start, pos)
+        elif data[pos] == 0x2c: # image descriptor
+            start = pos
+            rect = struct.unpack('<HHHH', bytes(data[pos + 1:pos + 9]))
+            if data[pos + 9] & 0x80:
+                pos += 3 * (2 << (data[pos + 9] & 0x07)) # local color table
+            pos = _skipGifSubBlocks(data, pos + 11) # skip the descriptor and the LZW minimum code size byte
+
+            duration = DEFAULT_DURATION
+            disposal = 0
+            transparent = False
+            if control != (0, 0):
+                packed = data[control[0] + 3]
+                duration = struct.unpack('<H', bytes(data[control[0] + 4:control[0] + 6]))[0] * 10 or DEFAULT_DURATION # gif delays are in hundredths of a second
+                disposal = (packed >> 2) & 0x07
+                transparent = bool(packed & 0x01)
+
+            if disposal == 3 and len(frames) == 0:
+                # there is nothing before the first frame to "restore to previous", so
+                # like PIL, this clears a transparent frame and leaves an opaque one
+                disposal = 2 if transparent else 1
+
+            # Like PIL, "restore to background" clears to transparent for frames
+            # with a transparent color, and to the background color otherwise.
+            background = (0, 0, 0, 0)
+            if not transparent and globalPalette is not None and 3 * data[11] + 3 <= len(globalPalette):
+                background = tuple(globalPalette[3 * data[11]:3 * data[11] + 3]) + (255,)
+
+            frames.append({'rect': rect,
+                           'duration': duration,
+                           'disposal': disposal,
+                           'background': background,
+                           'isKey': rect == (0, 0) + canvasSize and not transparent, # covers the whole canvas, so doesn't depend on earlier frames
+                           'control': control,
+                           'image': (start, pos)})
+            control = (0, 0)
+        else:
+            break # corrupt or truncated file, so ignore the rest of it
+    return canvasSize, data[:headerEnd], frames
+
+
+def _skipGifSubBlocks(data, pos):
+    # Returns the position just past the chain of data sub-blocks at pos.
+    while pos < len(data) and data[pos] != 0:
+        pos += data[pos] + 1
+    return pos + 1
@@ -0,0 +1,186 @@
+# Pyganim Atlas
+# Packs the frames of PygAnimation objects into a few large "texture atlas"
+# Surfaces.
+#
+# Hundreds of small frame Surfaces spread across many animations fragment
+# memory and blit with poor cache locality. packAnimations() copies every
+# unique frame into one or a few atlas Surfaces, and replaces each frame
+# with a subsurface of its atlas. The animations work exactly as before.
+#
+# Example:
+#
+#     walkRight = walkLeft.getCopy()
+#     walkRight.flip(True, False) # transformed frames get packed too
+#     info = pyganim.atlas.packAnimations([walkLeft, walkRight, idle, jump])
+#     print('%s atlases, %.0f%% full' % (len(info['atlases']), info['efficiency'] * 100))
+
+import pygame
+import pyganim
+
+
+def packAnimations(animations, maxSize=(2048, 2048), padding=1):
+    # Packs all of the unique frames (including transformed frames) of the
+    # animations into atlas Surfaces no larger than maxSize, and rewrites the
+    # animations' frames to be subsurfaces of the atlases. Frames that are the
+    # same Surface object (such as those shared by getCopies()) are packed once.
+    #
+    # @param animations A PygConductor object, or a list or dict of PygAnimation objects.
+    # @param maxSize The (width, height) that each atlas Surface can be at most.
+    # @param padding The number of transparent pixels between frames.
+    #
+    # Returns a dict with these keys:
+    #     'atlases': the list of atlas Surfaces
+    #     'numFrames': the number of unique frames packed
+    #     'efficiency': the fraction of the atlases' area covered by frames
+    #     'bytesBefore': the bytes of pixel data the frames used before packing
+    #     'bytesAfter': the bytes of pixel data the atlases use
+    #     'bytesSaved': bytesBefore minus bytesAfter (negative if packing cost memory)
+    if isinstance(animations, pyganim.PygConductor):
+        animations = animations.animations
+    elif isinstance(animations, pyganim.PygAnimation):
+        animations = [animations]
+    elif type(animations) == dict:
+        animations = list(animations.values())
+
+    # find the unique frames, in the order they're first seen
+    frames = []
+    seenIds = set()
+    for animObj in animations:
+        animObj._images = list(animObj._images) # lazily-loaded frames have to be fully loaded to be packed
+        for surf in list(animObj._images) + list(animObj._transformedImages):
+            if id(surf) not in seenIds:
+                seenIds.add(id(surf))
+                frames.append(surf)
+
+    for surf in frames:
+        if surf.get_width() + padding > maxSize[0] or surf.get_height() + padding > maxSize[1]:
+            raise ValueError('A %s x %s frame does not fit in a %s x %s atlas' % (surf.get_width(), surf.get_height(), maxSize[0], maxSize[1]))
+
+    # pack the tallest frames first, since that leaves the fewest gaps
+    bins = []
+    placements = {} # maps id of frame to (bin index, x, y)
+    for surf in sorted(frames, key=lambda surf: (-surf.get_height(), -surf.get_width())):
+        width, height = surf.get_width() + padding, surf.get_height() + padding
+        for binIndex, skyline in enumerate(bins):
+            position = skyline.place(width, height)
+            if position is not None:
+                break
+        else:
+            binIndex = len(bins)
+            bins.append(_Skyline(maxSize[0], maxSize[1]))
+            position = bins[binIndex].place(width, height)
+        placements[id(surf)] = (binIndex,) + position
+
+    # copy the frames into the atlases, each cropped to the area its frames cover
+    atlases = []
+    for skyline in bins:
+        atlases.append(pygame.Surface(skyline.usedSize(), pygame.SRCALPHA, 32))
+    atlasFrames = {} # maps id of frame to its subsurface of an atlas
+    for surf in frames:
+        binIndex, x, y = placements[id(surf)]
+        alpha = surf.get_alpha()
+        if alpha is not None and alpha != 255:
+            surf.set_alpha(255) # copy the pixels as they are, and keep the per-Surface alpha on the subsurface instead
+        atlases[binIndex].blit(surf, (x, y))
+        atlasFrame = atlases[binIndex].subsurface((x, y) + surf.get_size())
+        if alpha is not None and alpha != 255:
+            surf.set_alpha(alpha)
+            atlasFrame.set_alpha(alpha)
+        atlasFrames[id(surf)] = atlasFrame
+
+    bytesBefore = _getPixelBytes(frames)
+    for animObj in animations:
+        animObj._images = [atlasFrames[id(surf)] for surf in animObj._images]
+        animObj._transformedImages = [atlasFrames[id(surf)] for surf in animObj._transformedImages]
+
+    bytesAfter = _getPixelBytes(atlases)
+    usedArea = sum([surf.get_width() * surf.get_height() for surf in frames])
+    totalArea = sum([atlas.get_width() * atlas.get_height() for atlas in atlases])
+    return {'atlases': atlases,
+            'numFrames': len(frames),
+            'efficiency': float(usedArea) / totalArea if totalArea else 1.0,
+            'bytesBefore': bytesBefore,
+            'bytesAfter': bytesAfter,
+            'bytesSaved': bytesBefore - bytesAfter}
+
+
+class _Skyline(object):
+    # A bin for the skyline bottom-left packing algorithm. The skyline is a
+    # list of [x, y, width] segments across the top of the packed rectangles
+    # (y grows downward, so "bottom-left" here means "top-left").
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.segments = [[0, 0, width]]
+        self.right = 0 # the rightmost edge of the packed rectangles
+        self.bottom = 0 # the lowest edge of the packed rectangles
+
+
+    def place(self, width, height):
+        # Finds the lowest (then leftmost) position for a width x height
+        # rectangle, adds it to the skyline, and returns the (x, y) position.
+        # Returns None if the rectangle doesn't fit.
+        best = None # (y, x, segment index)
+        for i in range(len(self.segments)):
+            x = self.segments[i][0]
+            if x + width > self.width:
+                break
+            # the rectangle rests on the highest segment underneath it
+            y = 0
+            spanned = 0
+            j = i
+            while spanned < width:
+                y = max(y, self.segments[j][1])
+                spanned += self.segments[j][2]
+                j += 1
+            if y + height <= self.height and (best is None or (y, x) < best[:2]):
+                best = (y, x, i)
+        if best is None:
+            return None
+
+        y, x, i = best
+        self._addSegment(i, x, y + height, width)
+        self.right = max(self.right, x + width)
+        self.bottom = max(self.bottom, y + height)
+        return x, y
+
+
+    def usedSize(self):
+        # Returns the (width, height) of the area that rectangles were placed in.
+        return max(1, self.right), max(1, self.bottom)
+
+
+    def _addSegment(self, i, x, y, width):
+        # Internal-method. Puts a new segment at index i, shrinking or removing
+        # the segments it covers.
+        self.segments.insert(i, [x, y, width])
+        j = i + 1
+        while j < len(self.segments):
+            segment = self.segments[j]
+            overlap = x + width - segment[0]
+            if overlap <= 0:
+                break
+            if overlap < segment[2]:
+                segment[0] += overlap
+                segment[2] -= overlap
+                break
+            del self.segments[j]
+
+        # merge neighbouring segments at the same height
+        j = 0
+        while j < len(self.segments) - 1:
+            if self.segments[j][1] == self.segments[j + 1][1]:
+                self.segments[j][2] += self.segments[j + 1][2]
+                del self.segments[j + 1]
+            else:
+                j += 1
+
+
+def _getPixelBytes(surfaces):
+    # Returns the bytes of pixel data used by the surfaces. Subsurfaces count
+    # their top-level parent Surface, once.
+    parents = {}
+    for surf in surfaces:
+        parent = surf.get_abs_parent()
+        parents[id(parent)] = parent
+    return sum([parent.get_pitch() * parent.get_height() for parent in parents.values()])
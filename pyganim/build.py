@@ -0,0 +1,266 @@
+# Pyganim Build
+# Preprocesses a whole directory tree of animation assets at build time,
+# spread across all of the CPU cores.
+#
+# Every GIF, PNG, APNG, and WebP file under the source directory is decoded, sliced
+# (for sprite sheets), trimmed to the visible pixels of each frame, and
+# written back out as one optimized PNG per frame. A manifest.json file in
+# the output directory records each animation's frame files, durations, trim
+# offsets, and frame count. Sources whose contents haven't changed since the
+# last build (checked by hash, not by modification time) are skipped.
+#
+# A PNG is treated as a sprite sheet if there is a JSON file next to it with
+# the same name plus ".json" (such as hero.png.json) holding the arguments
+# for getImagesFromSpriteSheet(), and optionally a "durations" key with a
+# single duration or a list of durations:
+#
+#     {"width": 32, "height": 48, "durations": 80}
+#
+# Other files are loaded as animations the same way as passing their filename
+# to PygAnimation's constructor. (PNG and WebP files that aren't animated are
+# single-frame animations.)
+#
+# Example (from the command line):
+#
+#     python -m pyganim.build assets/ build/assets/ --workers 8
+#
+# Example (from Python):
+#
+#     report = pyganim.build.buildAssets('assets', 'build/assets')
+#     print('%s built, %s skipped' % (len(report['built']), len(report['skipped'])))
+
+import os
+import sys
+import json
+import time
+import hashlib
+import pygame
+import pyganim
+
+BUILD_VERSION = 1 # changing this makes every source get built again
+MANIFEST_FILENAME = 'manifest.json'
+SHEET_ARGS = ('width', 'height', 'rows', 'cols', 'rects', 'skipBlank')
+
+
+def buildAssets(sourceDir, outputDir, workers=None, trim=True):
+    # Builds every GIF, PNG, APNG, and WebP file under sourceDir into
+    # outputDir, and writes the manifest. The frames of sourceDir/chars/hero.gif are written to
+    # outputDir/chars/hero.gif/000.png, 001.png, and so on.
+    #
+    # @param workers
+    #     The number of worker processes. None uses one per CPU core, and 1
+    #     builds everything in this process.
+    # @param trim
+    #     If True, each frame is cropped to its non-transparent pixels, and its
+    #     (x, y) position on the original frame is saved in the manifest.
+    #
+    # Returns a dict with these keys:
+    #     'built': list of the source paths that were built
+    #     'skipped': list of the source paths that were unchanged
+    #     'failed': dict mapping source paths that couldn't be built to the error message
+    #         (the manifest keeps what the last successful build of each one made)
+    #     'numFrames': the number of frames in the manifest
+    #     'seconds': how long the build took
+    startTime = time.time()
+    manifestFilename = os.path.join(outputDir, MANIFEST_FILENAME)
+    oldManifest = {}
+    if os.path.exists(manifestFilename):
+        manifestFile = open(manifestFilename)
+        try:
+            oldManifest = json.load(manifestFile)
+        except ValueError:
+            oldManifest = {} # a damaged manifest just means everything gets built again
+        manifestFile.close()
+        if oldManifest.get('version') != BUILD_VERSION or oldManifest.get('trim') != trim:
+            oldManifest = {}
+    oldAnimations = oldManifest.get('animations', {})
+
+    manifest = {'version': BUILD_VERSION, 'trim': trim, 'animations': {}}
+    report = {'built': [], 'skipped': [], 'failed': {}, 'numFrames': 0, 'seconds': 0.0}
+    jobs = [] # (source path, content hash) of the sources that need building
+    for sourcePath in findSources(sourceDir):
+        contentHash = _hashSource(os.path.join(sourceDir, sourcePath))
+        oldEntry = oldAnimations.get(sourcePath)
+        if oldEntry is not None and oldEntry['hash'] == contentHash and _outputsExist(outputDir, oldEntry):
+            manifest['animations'][sourcePath] = oldEntry
+            report['skipped'].append(sourcePath)
+        else:
+            jobs.append((sourcePath, contentHash))
+
+    for (sourcePath, contentHash), result in zip(jobs, _runJobs(jobs, sourceDir, outputDir, trim, workers)):
+        if isinstance(result, dict):
+            result['hash'] = contentHash
+            manifest['animations'][sourcePath] = result
+            report['built'].append(sourcePath)
+        else:
+            report['failed'][sourcePath] = result
+            if sourcePath in oldAnimations:
+                # keep what the last successful build made (its hash no longer
+                # matches, so the source is built again next time)
+                manifest['animations'][sourcePath] = oldAnimations[sourcePath]
+
+    # delete the frames of sources that were removed or now have fewer frames
+    for sourcePath, oldEntry in oldAnimations.items():
+        newFiles = set([frame['file'] for frame in manifest['animations'].get(sourcePath, {'frames': []})['frames']])
+        for frame in oldEntry['frames']:
+            frameFilename = os.path.join(outputDir, frame['file'])
+            if frame['file'] not in newFiles and os.path.exists(frameFilename):
+                os.remove(frameFilename)
+
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+    manifestFile = open(manifestFilename, 'w')
+    json.dump(manifest, manifestFile, indent=1, sort_keys=True)
+    manifestFile.close()
+
+    report['numFrames'] = sum([entry['numFrames'] for entry in manifest['animations'].values()])
+    report['seconds'] = time.time() - startTime
+    return report
+
+
+def findSources(sourceDir):
+    # Returns a sorted list of the paths (relative to sourceDir, with "/"
+    # separators) of the GIF, PNG, APNG, and WebP files under sourceDir.
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(sourceDir):
+        dirnames.sort()
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() in pyganim._ANIMATION_EXTENSIONS:
+                relpath = os.path.relpath(os.path.join(dirpath, filename), sourceDir)
+                sources.append(relpath.replace(os.sep, '/'))
+    return sorted(sources)
+
+
+def buildAsset(sourceDir, sourcePath, outputDir, trim=True):
+    # Builds one source file, and returns its manifest entry (without the
+    # 'hash' key, which buildAssets() adds). This is what each worker process runs.
+    filename = os.path.join(sourceDir, sourcePath)
+    sheetArgs = _readSheetArgs(filename)
+    if sheetArgs is not None:
+        durations = sheetArgs.pop('durations', pyganim.DEFAULT_DURATION)
+        cacheSpriteSheets = pyganim.CACHE_SPRITE_SHEETS
+        pyganim.CACHE_SPRITE_SHEETS = False # each sheet is only sliced once per build
+        try:
+            images = pyganim.getImagesFromSpriteSheet(filename, **sheetArgs)
+        finally:
+            pyganim.CACHE_SPRITE_SHEETS = cacheSpriteSheets
+        frames = list(zip(images, pyganim._getDurationList(durations, len(images))))
+    else:
+        frames = pyganim._loadAnimatedFrames(filename)[0]
+
+    frameDir = os.path.join(outputDir, sourcePath)
+    if not os.path.exists(frameDir):
+        os.makedirs(frameDir)
+    entry = {'frames': [], 'numFrames': len(frames), 'size': [0, 0]}
+    for i, (surf, duration) in enumerate(frames):
+        entry['size'] = [max(entry['size'][0], surf.get_width()), max(entry['size'][1], surf.get_height())]
+        offset = [0, 0]
+        if trim:
+            rect = surf.get_bounding_rect()
+            if rect.width == 0 or rect.height == 0:
+                rect = pygame.Rect(0, 0, 1, 1) # a PNG can't be empty, so keep one transparent pixel
+            offset = [rect.left, rect.top]
+            surf = surf.subsurface(rect)
+        frameFile = '%s/%03d.png' % (sourcePath, i)
+        _savePng(surf, os.path.join(outputDir, frameFile))
+        entry['frames'].append({'file': frameFile, 'duration': duration, 'offset': offset})
+    entry['durations'] = [frame['duration'] for frame in entry['frames']]
+    return entry
+
+
+def main(argv=None):
+    # The command line interface: python -m pyganim.build SOURCEDIR OUTPUTDIR
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m pyganim.build', description='Preprocess a directory of Pyganim animation assets.')
+    parser.add_argument('sourceDir', help='the directory of GIF, PNG, APNG, and WebP files to build')
+    parser.add_argument('outputDir', help='the directory to write the frames and %s to' % (MANIFEST_FILENAME))
+    parser.add_argument('--workers', type=int, default=None, help='the number of worker processes (default: one per CPU core)')
+    parser.add_argument('--no-trim', dest='trim', action='store_false', help="don't crop frames to their visible pixels")
+    args = parser.parse_args(argv)
+
+    report = buildAssets(args.sourceDir, args.outputDir, args.workers, args.trim)
+    for sourcePath in sorted(report['failed']):
+        sys.stderr.write('%s: %s\n' % (sourcePath, report['failed'][sourcePath]))
+    print('Built %s, skipped %s unchanged, %s failed, %s frames in %.1f seconds' % (len(report['built']), len(report['skipped']), len(report['failed']), report['numFrames'], report['seconds']))
+    return 1 if report['failed'] else 0
+
+
+def _runJobs(jobs, sourceDir, outputDir, trim, workers):
+    # Internal-function. Builds each (source path, content hash) in jobs and
+    # yields, in the same order, its manifest entry or an error message string
+    # if the build failed. Uses a process pool unless workers is 1 or
+    # concurrent.futures isn't available (Python 2 without the futures backport).
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+    except ImportError:
+        workers = 1
+    if workers == 1 or len(jobs) <= 1:
+        for sourcePath, contentHash in jobs:
+            try:
+                yield buildAsset(sourceDir, sourcePath, outputDir, trim)
+            except Exception as e:
+                yield '%s: %s' % (type(e).__name__, e)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(buildAsset, sourceDir, sourcePath, outputDir, trim) for sourcePath, contentHash in jobs]
+        for future in futures:
+            try:
+                yield future.result()
+            except Exception as e:
+                yield '%s: %s' % (type(e).__name__, e)
+    finally:
+        executor.shutdown()
+
+
+def _readSheetArgs(filename):
+    # Internal-function. Returns the dict of sprite sheet arguments from the
+    # filename's ".json" sidecar file, or None if it doesn't have one.
+    sidecarFilename = filename + '.json'
+    if not os.path.exists(sidecarFilename):
+        return None
+    sidecarFile = open(sidecarFilename)
+    sheetArgs = json.load(sidecarFile)
+    sidecarFile.close()
+    for key in sheetArgs:
+        if key not in SHEET_ARGS and key != 'durations':
+            raise ValueError('%s has an unknown key %r' % (sidecarFilename, key))
+    return dict([(str(key), value) for key, value in sheetArgs.items()])
+
+
+def _hashSource(filename):
+    # Internal-function. Returns a hash of the source file's contents and its
+    # sidecar file's contents (if it has one).
+    sha = hashlib.sha1()
+    for name in (filename, filename + '.json'):
+        if os.path.exists(name):
+            sourceFile = open(name, 'rb')
+            sha.update(sourceFile.read())
+            sourceFile.close()
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def _outputsExist(outputDir, entry):
+    # Internal-function. Returns True if all of the manifest entry's frame files exist.
+    for frame in entry['frames']:
+        if not os.path.exists(os.path.join(outputDir, frame['file'])):
+            return False
+    return True
+
+
+def _savePng(surf, filename):
+    # Internal-function. Saves the Surface as a PNG, optimized with Pillow if
+    # it is installed.
+    try:
+        from PIL import Image
+    except ImportError:
+        pygame.image.save(surf, filename)
+        return
+    im = Image.frombytes('RGBA', surf.get_size(), pygame.image.tostring(surf, 'RGBA'))
+    im.save(filename, optimize=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
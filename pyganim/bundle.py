@@ -0,0 +1,213 @@
+# Pyganim Bundle
+# Compiles PygAnimation objects into a single "bundle" file of raw pixels that
+# loads without decoding any PNG or GIF data.
+#
+# A bundle holds each unique frame's pixels uncompressed in the display's
+# pixel format, along with each animation's durations, start times, frame
+# offsets and sizes (for trimmed or anchored frames), loop setting, and rate. loadBundle() memory-maps the file and makes each frame a
+# Surface directly on top of the mapped pixels, so loading costs about as much
+# as reading the file.
+#
+# Example (run once, at build time):
+#
+#     pyganim.bundle.compileBundle('hero.pygb', {'walk': walkAnim, 'jump': jumpAnim},
+#                                  sources=['hero_walk.gif', 'hero_jump.gif'])
+#
+# Example (in the game):
+#
+#     if pyganim.bundle.isBundleStale('hero.pygb'):
+#         ... recompile it ...
+#     animObjs = pyganim.bundle.loadBundle('hero.pygb')
+#     animObjs['walk'].play()
+#
+# File layout (all integers little-endian):
+#     8 bytes   magic, b'PYGANIMB'
+#     uint32    format version (BUNDLE_VERSION)
+#     uint32    length of the JSON header in bytes
+#     uint32    CRC-32 of the JSON header and the pixel data
+#     ...       the JSON header, padded with spaces so the pixel data starts on a multiple of 16 bytes
+#     ...       the pixel data, each frame starting on a multiple of 16 bytes
+
+import os
+import sys
+import json
+import mmap
+import struct
+import zlib
+import pygame
+import pyganim
+
+BUNDLE_MAGIC = b'PYGANIMB'
+BUNDLE_VERSION = 2
+_PREFIX = struct.Struct('<8sIII')
+_ALIGNMENT = 16
+
+
+def compileBundle(filename, animations, sources=None):
+    # Writes the animations to a bundle file.
+    #
+    # @param filename The bundle file to write.
+    # @param animations
+    #     A dict mapping names to PygAnimation objects. Transformed frames are
+    #     written if the animation has them. Frames shared between animations
+    #     (such as from getCopies()) are written once.
+    # @param sources
+    #     An optional list of the files the animations were made from. Their
+    #     modification times and sizes are recorded, so isBundleStale() can tell
+    #     when the bundle needs to be compiled again.
+    pixelFormat = _getDisplayPixelFormat()
+    tobytes = getattr(pygame.image, 'tobytes', None) or pygame.image.tostring
+
+    frames = [] # the header info of each unique frame
+    frameData = [] # the pixel data of each unique frame
+    frameIndexes = {} # maps id of a frame Surface to its index in frames
+    offset = 0
+    animationsInfo = []
+    for name in sorted(animations.keys()):
+        animObj = animations[name]
+        sizes = animObj._transformedSizes if animObj._transformedImages else animObj._sizes
+        # lazily-loaded and delta encoded frames can reuse Surface objects, so they aren't shared by id
+        shareById = animObj._transformedImages or not isinstance(animObj._images, pyganim._LazyFrames)
+        indexes = []
+        for i in range(animObj.numFrames):
+            surf = animObj.getFrame(i)
+            if not shareById or id(surf) not in frameIndexes:
+                data = tobytes(surf, pixelFormat)
+                if shareById:
+                    frameIndexes[id(surf)] = len(frames)
+                indexes.append(len(frames))
+                frames.append({'offset': offset, 'size': list(surf.get_size())})
+                frameData.append(data)
+                offset += _alignedLength(len(data))
+            else:
+                indexes.append(frameIndexes[id(surf)])
+        animationsInfo.append({'name': name,
+                               'frames': indexes,
+                               'durations': list(animObj._durations),
+                               'startTimes': list(animObj._startTimes),
+                               'offsets': [list(animObj.getFrameOffset(i)) for i in range(animObj.numFrames)],
+                               'sizes': [size and list(size) for size in sizes],
+                               'loop': animObj.loop,
+                               'rate': animObj.rate})
+
+    header = {'pixelFormat': pixelFormat,
+              'frames': frames,
+              'animations': animationsInfo,
+              'sources': _getSourcesInfo(sources or [])}
+    headerBytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    headerBytes += b' ' * (_alignedLength(_PREFIX.size + len(headerBytes)) - _PREFIX.size - len(headerBytes))
+
+    crc = zlib.crc32(headerBytes)
+    for data in frameData:
+        crc = zlib.crc32(data, crc)
+        crc = zlib.crc32(_padding(len(data)), crc)
+
+    bundleFile = open(filename, 'wb')
+    bundleFile.write(_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(headerBytes), crc & 0xffffffff))
+    bundleFile.write(headerBytes)
+    for data in frameData:
+        bundleFile.write(data)
+        bundleFile.write(_padding(len(data)))
+    bundleFile.close()
+
+
+def loadBundle(filename, verify=True):
+    # Loads a bundle file written by compileBundle(). Returns a dict mapping
+    # the names of the animations to new PygAnimation objects.
+    #
+    # The frames are Surfaces on top of a private memory map of the file, so
+    # drawing on them doesn't change the file. Raises ValueError if the file
+    # isn't a bundle, was written by a different version of the bundle format,
+    # or (if verify is True) has a checksum that doesn't match its contents.
+    bundleFile = open(filename, 'rb')
+    try:
+        bundleMap = mmap.mmap(bundleFile.fileno(), 0, access=mmap.ACCESS_COPY)
+    finally:
+        bundleFile.close() # the map stays valid after the file is closed
+
+    header, payloadStart = _readHeader(bundleMap, filename, verify)
+    view = memoryview(bundleMap)
+    frames = []
+    for frame in header['frames']:
+        width, height = frame['size']
+        start = payloadStart + frame['offset']
+        # each Surface keeps a reference to its slice of the map, which keeps the map open
+        frames.append(pygame.image.frombuffer(view[start:start + width * height * 4], (width, height), header['pixelFormat']))
+
+    animations = {}
+    for info in header['animations']:
+        # (the frames were already trimmed and deduplicated when the bundle was compiled, if they were going to be)
+        animObj = pyganim.PygAnimation([(frames[i], duration) for i, duration in zip(info['frames'], info['durations'])], loop=info['loop'], trim=False, dedupe=False)
+        animObj._startTimes = info['startTimes']
+        animObj._offsets = [tuple(offset) for offset in info['offsets']]
+        animObj._sizes = [size and tuple(size) for size in info['sizes']]
+        animObj.rate = info['rate']
+        animations[info['name']] = animObj
+    return animations
+
+
+def isBundleStale(filename):
+    # Returns True if the bundle file doesn't exist, was written by a different
+    # version of the bundle format, or any of the source files it was compiled
+    # from have changed since.
+    if not os.path.exists(filename):
+        return True
+    bundleFile = open(filename, 'rb')
+    try:
+        prefix = bundleFile.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            return True
+        magic, version, headerLength, crc = _PREFIX.unpack(prefix)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            return True
+        header = json.loads(bundleFile.read(headerLength).decode('utf-8'))
+    finally:
+        bundleFile.close()
+    return header['sources'] != _getSourcesInfo(sorted(header['sources'].keys()))
+
+
+def _readHeader(bundleMap, filename, verify):
+    # Internal-function. Checks the bundle's prefix (and checksum, if verify is
+    # True) and returns the parsed JSON header and the offset of the pixel data.
+    if len(bundleMap) < _PREFIX.size:
+        raise ValueError('%s is not a Pyganim bundle file' % (filename))
+    magic, version, headerLength, crc = _PREFIX.unpack(bundleMap[:_PREFIX.size])
+    if magic != BUNDLE_MAGIC:
+        raise ValueError('%s is not a Pyganim bundle file' % (filename))
+    if version != BUNDLE_VERSION:
+        raise ValueError('%s is bundle format version %s, but this version of Pyganim reads version %s. Compile the bundle again.' % (filename, version, BUNDLE_VERSION))
+    payloadStart = _PREFIX.size + headerLength
+    if verify and zlib.crc32(memoryview(bundleMap)[_PREFIX.size:]) & 0xffffffff != crc:
+        raise ValueError('%s is corrupt: its checksum does not match its contents' % (filename))
+    return json.loads(bundleMap[_PREFIX.size:payloadStart].decode('utf-8')), payloadStart
+
+
+def _getDisplayPixelFormat():
+    # Internal-function. Returns the pygame.image.frombuffer() format string
+    # that matches the display's pixel layout, so blitting the loaded frames
+    # needs no conversion. Falls back to 'RGBA' if there's no display or no
+    # matching format.
+    display = pygame.display.get_surface()
+    if display is not None and display.get_bitsize() == 32 and display.get_masks()[:3] == (0xff0000, 0xff00, 0xff) and sys.byteorder == 'little':
+        if hasattr(pygame.image, 'tobytes'): # 'BGRA' was added in the same Pygame version as tobytes()
+            return 'BGRA'
+    return 'RGBA'
+
+
+def _getSourcesInfo(sources):
+    # Internal-function. Returns a dict mapping each source filename to its [mtime, size].
+    info = {}
+    for source in sources:
+        if os.path.exists(source):
+            info[source] = [os.path.getmtime(source), os.path.getsize(source)]
+        else:
+            info[source] = None
+    return info
+
+
+def _alignedLength(length):
+    return (length + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _padding(length):
+    return b'\0' * (_alignedLength(length) - length)
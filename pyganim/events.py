@@ -0,0 +1,228 @@
+# Pyganim Events
+# Calls functions when animations reach a frame, loop, finish, or pass a
+# marker time.
+#
+# An EventScheduler keeps a heap of the time (on the pyganim clock) of each
+# watched animation's next event, so update() only looks at the animations
+# that have an event due, no matter how many animations are watched. The
+# times are recomputed whenever an animation is played, paused, stopped,
+# sought (with the elapsed or currentFrameNum properties), or has its rate or
+# loop setting changed, and whenever the PygConductor of an animation on a
+# shared timeline plays, pauses, stops, or seeks.
+#
+# Example:
+#
+#     scheduler = pyganim.events.EventScheduler()
+#     scheduler.onFrame(swordAnim, 3, playClangSound) # playClangSound(swordAnim, 3)
+#     scheduler.onFinish(swordAnim, endAttack) # endAttack(swordAnim)
+#     scheduler.addMarker(walkAnim, 250, footstep, 'left foot') # footstep(walkAnim, 'left foot')
+#     while True:
+#         pyganim.beginFrame()
+#         scheduler.update() # calls the functions of all the events that are due, in order
+#         ...
+
+import bisect
+import heapq
+import itertools
+import math
+import pyganim
+
+
+class EventScheduler(object):
+    def __init__(self, clock=None):
+        # @param clock
+        #     The clock that update() uses (see pyganim.VirtualClock), which
+        #     should be the clock of the animations. None means the pyganim clock.
+        self.clock = clock
+        self._records = {} # maps id of an animation to its _EventRecord
+        self._heap = [] # (deadline in nanoseconds, sequence number, _EventRecord, version) tuples
+        self._sequence = itertools.count() # breaks ties between events due at the same time, in the order they were scheduled
+
+
+    def onFrame(self, animObj, frameNum, callback):
+        # Calls callback(animObj, frameNum) each time the animation reaches
+        # the frameNum-th frame while playing (including frame 0 when it
+        # starts playing from the beginning or loops).
+        if not 0 <= frameNum < animObj.numFrames:
+            raise ValueError('frameNum must be between 0 and %s' % (animObj.numFrames - 1))
+        record = self._getRecord(animObj)
+        record.frameCallbacks.setdefault(frameNum, []).append(callback)
+        self._reschedule(animObj)
+
+
+    def onLoop(self, animObj, callback):
+        # Calls callback(animObj) each time a looping animation goes from its
+        # last frame back to its first.
+        self._getRecord(animObj).loopCallbacks.append(callback)
+        self._reschedule(animObj)
+
+
+    def onFinish(self, animObj, callback):
+        # Calls callback(animObj) when an animation that doesn't loop plays
+        # its last frame to the end.
+        self._getRecord(animObj).finishCallbacks.append(callback)
+        self._reschedule(animObj)
+
+
+    def addMarker(self, animObj, elapsed, callback, name=None):
+        # Calls callback(animObj, name) each time the animation plays past
+        # the time elapsed (in milliseconds from the start of the animation).
+        if not 0 <= elapsed < animObj.clip._startTimes[-1]:
+            raise ValueError('elapsed must be at least 0 and less than the length of the animation (%s ms)' % (animObj.clip._startTimes[-1]))
+        record = self._getRecord(animObj)
+        record.markers.append((elapsed, name, callback))
+        record.markers.sort(key=lambda marker: marker[0])
+        self._reschedule(animObj)
+
+
+    def remove(self, animObj):
+        # Removes all the events of the animation.
+        record = self._records.pop(id(animObj), None)
+        if record is not None:
+            record.version += 1 # its entries in the heap are now stale
+            del pyganim._scheduledPlayheads[id(animObj)]
+
+
+    def update(self, now=None):
+        # Calls the functions of every event that is due, in the order they
+        # happened. Call this once per game loop iteration, after
+        # pyganim.beginFrame() or ticking the clock (or pass now, in
+        # milliseconds). Returns the number of events that happened.
+        if now is None:
+            now = pyganim._clockNs(self.clock)
+        else:
+            now = pyganim._msToNs(now)
+
+        numEvents = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, sequence, record, version = heapq.heappop(heap)
+            if version != record.version:
+                continue # the animation's timing changed after this entry was pushed
+            animObj = record.animObj
+            if animObj.clip._startTimes is not record.startTimes:
+                # the frames changed without play(), pause(), etc. being
+                # called, so find the next event with the new start times
+                self._reschedule(animObj)
+                continue
+
+            record.entry = None
+            loopNum, position = record.nextEvent
+            self._fire(record, loopNum, position)
+            numEvents += 1
+            if version == record.version and id(animObj) in self._records:
+                # the callbacks didn't change the animation's timing, so the
+                # next event comes right after this one
+                self._push(record, self._findNextEvent(record, loopNum, position))
+
+        if len(heap) > 64 and len(heap) > 4 * len(self._records):
+            # rebuild the heap without the stale entries
+            self._heap = [record.entry for record in self._records.values() if record.entry is not None]
+            heapq.heapify(self._heap)
+        return numEvents
+
+
+    def _getRecord(self, animObj):
+        # Internal-method. Returns the animation's _EventRecord, creating it
+        # if this is the first event for the animation.
+        record = self._records.get(id(animObj))
+        if record is None:
+            if id(animObj) in pyganim._scheduledPlayheads:
+                raise ValueError('This animation already has events in another EventScheduler.')
+            record = _EventRecord(animObj)
+            self._records[id(animObj)] = record
+            pyganim._scheduledPlayheads[id(animObj)] = self
+        return record
+
+
+    def _reschedule(self, animObj):
+        # Internal-method. Called by the animation (through _timingChanged())
+        # when its timing changes. Finds the animation's next event after
+        # where it is right now and pushes it on the heap. Events between the
+        # old and new positions of a seek don't happen.
+        record = self._records[id(animObj)]
+        record.version += 1
+        record.entry = None
+        record.startTimes = animObj.clip._startTimes
+        record.eventTimes = sorted(set([record.startTimes[frameNum] for frameNum in record.frameCallbacks if frameNum < len(record.startTimes) - 1] +
+                                       [marker[0] for marker in record.markers]))
+        if animObj._state != pyganim.PLAYING or animObj._rate == 0:
+            return # paused and stopped animations have no events coming
+        if isinstance(animObj._clock, pyganim._Timeline) and animObj._clock.state != pyganim.PLAYING:
+            return # neither do animations on a shared timeline that isn't playing
+
+        length = record.startTimes[-1]
+        played = (animObj._now() - animObj._playingStartTime) * animObj._rate / 1000000.0 # milliseconds, not wrapped around
+        if played <= 0:
+            # just started playing from the beginning, so the events at 0 happen
+            self._push(record, self._findNextEvent(record, 0, -1))
+            return
+        loopNum = int(played // length)
+        if not animObj._loop and loopNum > 0:
+            return # already finished
+        self._push(record, self._findNextEvent(record, loopNum, played - loopNum * length))
+
+
+    def _findNextEvent(self, record, loopNum, position):
+        # Internal-method. Returns the (loopNum, position) of the first event
+        # after position milliseconds into the loopNum-th loop, or None if
+        # there are no more events. An event at position 0 of a loop after the
+        # first is also the loop (or finish) event.
+        if loopNum > 0 and not record.animObj._loop:
+            return None # nothing happens after an animation finishes
+        i = bisect.bisect_right(record.eventTimes, position)
+        if i < len(record.eventTimes):
+            return loopNum, record.eventTimes[i]
+        return loopNum + 1, 0
+
+
+    def _push(self, record, nextEvent):
+        # Internal-method. Pushes the heap entry for the record's next event.
+        if nextEvent is None:
+            return
+        animObj = record.animObj
+        loopNum, position = nextEvent
+        played = loopNum * record.startTimes[-1] + position
+        # the frame changes at the first nanosecond the elapsed property reaches it
+        deadline = animObj._playingStartTime + int(math.ceil(played * 1000000 / animObj._rate))
+        if isinstance(animObj._clock, pyganim._Timeline):
+            deadline += animObj._clock._startNs # from the shared timeline's time to its clock's time
+        record.nextEvent = nextEvent
+        record.entry = (deadline, next(self._sequence), record, record.version)
+        heapq.heappush(self._heap, record.entry)
+
+
+    def _fire(self, record, loopNum, position):
+        # Internal-method. Calls the functions of the events at position
+        # milliseconds into the loopNum-th loop.
+        animObj = record.animObj
+        if loopNum > 0 and position == 0:
+            if not animObj._loop:
+                for callback in list(record.finishCallbacks):
+                    callback(animObj)
+                return
+            for callback in list(record.loopCallbacks):
+                callback(animObj)
+        for frameNum in sorted(record.frameCallbacks):
+            if frameNum < len(record.startTimes) - 1 and record.startTimes[frameNum] == position:
+                for callback in list(record.frameCallbacks[frameNum]):
+                    callback(animObj, frameNum)
+        for markerTime, name, callback in list(record.markers):
+            if markerTime == position:
+                callback(animObj, name)
+
+
+class _EventRecord(object):
+    # The callbacks of one animation watched by an EventScheduler, and where
+    # its next event is.
+    def __init__(self, animObj):
+        self.animObj = animObj
+        self.frameCallbacks = {} # maps frame number to a list of callbacks
+        self.loopCallbacks = []
+        self.finishCallbacks = []
+        self.markers = [] # (elapsed, name, callback) tuples, sorted by elapsed
+        self.version = 0 # incremented whenever the timing changes, so older heap entries are ignored
+        self.startTimes = animObj.clip._startTimes
+        self.eventTimes = [] # the sorted positions (in milliseconds) of the frame and marker events in one loop
+        self.nextEvent = None # the (loopNum, position) of the event in the heap entry
+        self.entry = None # the current heap entry, or None
@@ -0,0 +1,227 @@
+# Pyganim Loader
+# Loads PygAnimation objects on background threads.
+#
+# Decoding image files (PNG decoding in SDL_image and GIF decoding in Pillow)
+# releases the GIL, so it can happen on worker threads while the game keeps
+# running. Everything that has to happen on the main thread (converting the
+# frames to the display's pixel format and building the PygAnimation object)
+# is done in small steps by calling pump() once per game loop iteration.
+#
+# Example:
+#
+#     loader = pyganim.loader.AnimationLoader()
+#     boltAnim = loader.load([('bolt%s.png' % i, 100) for i in range(1, 11)])
+#     boltAnim.play()
+#     while True:
+#         loader.pump(2) # spend at most 2 milliseconds finishing loaded animations
+#         boltAnim.blit(windowSurface, (100, 100)) # draws the placeholder until the frames arrive
+
+import threading
+import itertools
+import pygame
+import pyganim
+
+
+class AnimationLoader(object):
+    def __init__(self, numThreads=2, convert=True):
+        # @param numThreads The number of worker threads that decode image files.
+        # @param convert
+        #     If True, pump() converts each frame to the display's pixel format
+        #     with pyganim.convertFrame() once a display mode has been set, so
+        #     blitting the frames is fast.
+        self.convert = convert
+        self._lock = threading.Condition()
+        self._queued = [] # requests waiting for a worker thread
+        self._decoding = [] # requests being decoded by a worker thread
+        self._decoded = [] # requests decoded by a worker thread, waiting for pump()
+        self._failed = [] # requests whose decoding raised an exception, which pump() has raised
+        self._counter = itertools.count() # breaks ties between equal priorities, so requests made first load first
+        self._closed = False
+        self._threads = []
+        for i in range(numThreads):
+            thread = threading.Thread(target=self._work, name='pyganim-loader-%s' % (i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+
+    def load(self, frames, loop=True, priority=0, placeholder=None):
+        # Starts loading an animation in the background and returns a
+        # PygAnimation object right away. Until pump() finishes loading it, the
+        # returned object shows the placeholder. It can be played, paused, and
+        # blitted as normal in the meantime, and the real frames take over
+        # without changing its state.
+        #
+        # @param frames Anything that can be passed as the frames argument of PygAnimation's constructor.
+        # @param loop Passed to the PygAnimation constructor.
+        # @param priority
+        #     Requests with higher priorities are decoded and finished first.
+        #     Among equal priorities, animations whose visibility is True go first.
+        # @param placeholder
+        #     A pygame.Surface or PygAnimation object to show until the frames are
+        #     loaded. The default is a blank 1 x 1 Surface.
+        return self._request(lambda: _decodedFrames(frames), loop, priority, placeholder)
+
+
+    def loadSpriteSheet(self, filename, durations=pyganim.DEFAULT_DURATION, loop=True, priority=0, placeholder=None, **sliceArgs):
+        # Like load(), but for the images returned by
+        # getImagesFromSpriteSheet(filename, **sliceArgs). durations is either a
+        # single duration for every frame or a list of durations, one for each
+        # frame (pump() raises ValueError if the numbers don't match).
+        def decode():
+            images = pyganim.getImagesFromSpriteSheet(filename, **sliceArgs)
+            return list(zip(images, pyganim._getDurationList(durations, len(images))))
+        return self._request(decode, loop, priority, placeholder)
+
+
+    def setPriority(self, animObj, priority):
+        # Changes the priority of an animation returned by load() that hasn't
+        # finished loading yet.
+        with self._lock:
+            for request in self._queued + self._decoding + self._decoded:
+                if request.animObj is animObj:
+                    request.priority = priority
+
+
+    def isLoaded(self, animObj):
+        # Returns True if animObj (returned by load()) has its real frames.
+        # (This is False for good if loading it failed.)
+        with self._lock:
+            for request in self._queued + self._decoding + self._decoded + self._failed:
+                if request.animObj is animObj:
+                    return False
+        return True
+
+
+    def _propGetPending(self):
+        with self._lock:
+            return len(self._queued) + len(self._decoding) + len(self._decoded)
+
+    pending = property(_propGetPending) # the number of animations that haven't finished loading
+
+
+    def pump(self, budget=2.0):
+        # Finishes loading decoded animations on the calling (main) thread,
+        # spending about budget milliseconds. At least one frame is finished
+        # per call, so loading always makes progress. Returns the number of
+        # animations that finished loading.
+        #
+        # If decoding an animation raised an exception (or found no frames),
+        # pump() raises it. The animation keeps its placeholder, and
+        # isLoaded() keeps returning False for it.
+        deadline = pyganim._perfCounter() + budget / 1000.0
+        numFinished = 0
+        convert = self.convert and pygame.display.get_surface() is not None
+        while True:
+            with self._lock:
+                if not self._decoded:
+                    break
+                request = min(self._decoded, key=_requestOrder)
+                if request.error is not None or request.nextFrame == len(request.frames):
+                    self._decoded.remove(request)
+                    if request.error is not None:
+                        self._failed.append(request)
+
+            if request.error is not None:
+                raise request.error
+
+            if request.nextFrame < len(request.frames):
+                # convert one frame at a time, so a long animation is spread over several calls
+                surf, duration = request.frames[request.nextFrame]
+                if convert:
+                    surf = pyganim.convertFrame(surf)
+                request.frames[request.nextFrame] = (surf, duration)
+                request.nextFrame += 1
+            else:
+                request.animObj._takeFramesFrom(pyganim.PygAnimation(request.frames, loop=request.animObj.loop))
+                request.frames = None
+                numFinished += 1
+
+            if pyganim._perfCounter() >= deadline:
+                break
+        return numFinished
+
+
+    def close(self):
+        # Stops the worker threads. Requests that haven't been decoded yet are dropped.
+        with self._lock:
+            self._closed = True
+            self._queued = []
+            self._lock.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+    def _request(self, decode, loop, priority, placeholder):
+        # Internal-method. Queues decode() to be called by a worker thread and
+        # returns the placeholder animation.
+        if isinstance(placeholder, pyganim.PygAnimation):
+            animObj = placeholder.getCopy()
+            animObj.loop = loop
+        else:
+            if placeholder is None:
+                placeholder = pygame.Surface((1, 1), pygame.SRCALPHA, 32)
+            animObj = pyganim.PygAnimation([(placeholder, pyganim.DEFAULT_DURATION)], loop=loop)
+
+        with self._lock:
+            if self._closed:
+                raise ValueError('cannot load with a closed AnimationLoader')
+            self._queued.append(_LoadRequest(animObj, decode, priority, next(self._counter)))
+            self._lock.notify()
+        return animObj
+
+
+    def _work(self):
+        # Internal-method. The loop run by each worker thread.
+        while True:
+            with self._lock:
+                while not self._queued and not self._closed:
+                    self._lock.wait()
+                if self._closed:
+                    return
+                request = min(self._queued, key=_requestOrder)
+                self._queued.remove(request)
+                self._decoding.append(request)
+
+            try:
+                request.frames = request.decode()
+                if not request.frames:
+                    raise ValueError('no frames were loaded for the animation (an empty frames list, or a sprite sheet whose cells are all blank)')
+            except Exception as e:
+                request.error = e
+
+            with self._lock:
+                self._decoding.remove(request)
+                self._decoded.append(request)
+
+
+class _LoadRequest(object):
+    def __init__(self, animObj, decode, priority, order):
+        self.animObj = animObj # the placeholder animation handed back by load()
+        self.decode = decode # called on a worker thread, returns a list of (Surface, duration) tuples
+        self.priority = priority
+        self.order = order
+        self.frames = None # set by the worker thread
+        self.error = None # set by the worker thread if decode() raises an exception
+        self.nextFrame = 0 # the index of the next frame for pump() to convert
+
+
+def _requestOrder(request):
+    # The sort key for requests: highest priority, then visible, then oldest first.
+    return (-request.priority, not request.animObj.visibility, request.order)
+
+
+def _decodedFrames(frames):
+    # Decodes the frames argument of PygAnimation's constructor into a list of
+    # (Surface, duration) tuples. This is called on a worker thread.
+    if pyganim._isAnimationFilename(frames):
+        return pyganim._loadAnimatedFrames(frames)[0]
+
+    if len(frames) > 0 and type(frames[0]) == str:
+        frames = list(zip(frames, [pyganim.DEFAULT_DURATION] * len(frames))) # add default duration
+    decodedFrames = []
+    for image, duration in frames:
+        if type(image) == str:
+            image = pyganim._loadImage(image)
+        decodedFrames.append((image, duration))
+    return decodedFrames
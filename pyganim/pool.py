@@ -0,0 +1,357 @@
+# Pyganim Pool
+# Plays thousands of instances of a few animations (crowds, particles, tiles)
+# with NumPy arrays instead of one PygAnimation object per instance.
+#
+# An AnimationPool holds "clips" (PygAnimation objects whose frames and
+# durations are shared) and "instances" of them. Each instance's clip, start
+# time, pause time, rate, loop setting, state, position, and visibility are
+# items in NumPy arrays, so finding the current frame of every instance is one
+# vectorized pass per tick (numpy.searchsorted() over the start times of all
+# the clips) rather than thousands of Python method calls. play(), pause(),
+# stop(), and seek() work on many instances at once, selected by an array of
+# instance indexes or a boolean mask.
+#
+# The positions and visible properties return views of the pool's arrays, so
+# assigning to them changes the instances. Read the property each time rather
+# than keeping the array: add() replaces the arrays when the pool grows past
+# its capacity, and a kept array would then no longer belong to the pool.
+#
+# NumPy is required to use this module.
+#
+# Example:
+#
+#     pool = pyganim.pool.AnimationPool()
+#     walkClip = pool.addClip(walkAnim)
+#     walkers = pool.add(walkClip, count=5000)
+#     pool.positions[walkers] = numpy.random.randint(0, 640, (5000, 2))
+#     pool.play(walkers)
+#     while True:
+#         pool.blit(windowSurface) # draws every playing or paused instance at its position
+
+import numpy
+import pygame
+import pyganim
+
+# The values of the state array.
+_STOPPED, _PLAYING, _PAUSED = 0, 1, 2
+_STATE_NAMES = numpy.array([pyganim.STOPPED, pyganim.PLAYING, pyganim.PAUSED], dtype=object)
+
+
+class AnimationPool(object):
+    def __init__(self, clips=(), capacity=64, clock=None):
+        # @param clips PygAnimation objects to add with addClip(). Their clip ids are their indexes.
+        # @param capacity The number of instances to make room for at first. (The arrays grow as needed.)
+        # @param clock The clock that the instances play by (see pyganim.VirtualClock). None means the pyganim clock.
+        self.clock = clock
+        self._clips = [] # the PygAnimation object of each clip id
+        self._capacity = 0
+        self._count = 0 # instances at this index and above have never been used
+        self._free = [] # indexes below _count of removed instances, to be reused
+        self._clipIds = numpy.zeros(0, numpy.intp)
+        self._startTimes = numpy.zeros(0, numpy.int64) # when play() was last called (like PygAnimation's _playingStartTime), in nanoseconds
+        self._pauseTimes = numpy.zeros(0, numpy.int64) # when pause() was last called (like PygAnimation's _pausedStartTime), in nanoseconds
+        self._rates = numpy.zeros(0, numpy.float64)
+        self._loops = numpy.zeros(0, bool)
+        self._states = numpy.zeros(0, numpy.int8)
+        self._alive = numpy.zeros(0, bool) # False for removed instances
+        self._positions = numpy.zeros((0, 2), numpy.int64)
+        self._visible = numpy.zeros(0, bool)
+        self._grow(capacity)
+        for animObj in clips:
+            self.addClip(animObj)
+
+
+    def addClip(self, animObj):
+        # Adds a PygAnimation object as a clip, and returns its clip id. The
+        # pool reads the clip's frames (transformed frames, if it has them),
+        # offsets, durations, and loop setting, but not its state.
+        self._clips.append(animObj)
+        self.refresh()
+        return len(self._clips) - 1
+
+
+    def refresh(self):
+        # Reads the frames and durations of the clips again. Call this after
+        # transforming or otherwise changing a clip that was already added.
+        surfaces = []
+        offsets = []
+        startTimes = [] # the start times of every clip's frames, each clip's shifted to start after the clip before it ends
+        clipStarts = []
+        clipFrames = []
+        clipLengths = []
+        clipStart = 0
+        for animObj in self._clips:
+            clipStarts.append(clipStart)
+            clipFrames.append(len(surfaces))
+            clipLengths.append(animObj._startTimes[-1])
+            # (iterating a delta-encoded clip's frames gives a copy of each
+            # frame, while getFrame() would return its one reusable Surface)
+            surfaces.extend(list(animObj._transformedImages) or list(animObj._images))
+            for i in range(animObj.numFrames):
+                offsets.append(animObj.getFrameOffset(i))
+                startTimes.append(clipStart + animObj._startTimes[i])
+            clipStart += animObj._startTimes[-1]
+        self._surfaces = surfaces
+        self._offsets = numpy.array(offsets, numpy.int64).reshape((-1, 2))
+        self._flatStartTimes = numpy.array(startTimes, numpy.float64)
+        self._clipStarts = numpy.array(clipStarts, numpy.float64)
+        self._clipFrames = numpy.array(clipFrames, numpy.intp)
+        self._clipNumFrames = numpy.array([animObj.numFrames for animObj in self._clips], numpy.intp)
+        self._clipLengths = numpy.array(clipLengths, numpy.float64)
+
+
+    def add(self, clipId, count=1, loop=None, rate=1.0, position=(0, 0)):
+        # Adds count stopped instances of the clip, and returns a NumPy array of
+        # their indexes. loop defaults to the clip's loop setting.
+        if not 0 <= clipId < len(self._clips):
+            raise ValueError('%r is not a clip id of this pool' % (clipId,))
+        if rate < 0:
+            raise ValueError('rate must be greater than 0.')
+        if loop is None:
+            loop = self._clips[clipId].loop
+
+        indexes = self._free[:count]
+        del self._free[:count]
+        numNew = count - len(indexes)
+        if self._count + numNew > self._capacity:
+            self._grow(max(self._capacity * 2, self._count + numNew))
+        indexes = numpy.array(indexes + list(range(self._count, self._count + numNew)), numpy.intp)
+        self._count += numNew
+
+        self._clipIds[indexes] = clipId
+        self._startTimes[indexes] = 0
+        self._pauseTimes[indexes] = 0
+        self._rates[indexes] = rate
+        self._loops[indexes] = loop
+        self._states[indexes] = _STOPPED
+        self._alive[indexes] = True
+        self._positions[indexes] = position
+        self._visible[indexes] = True
+        return indexes
+
+
+    def remove(self, which):
+        # Removes the selected instances. Their indexes are reused by add().
+        indexes = self._select(which)
+        self._alive[indexes] = False
+        self._states[indexes] = _STOPPED
+        self._free.extend(indexes.tolist())
+
+
+    def __len__(self):
+        # The number of instances, not counting removed ones.
+        return self._count - len(self._free)
+
+
+    def _propGetPositions(self):
+        # (A new view each time. Don't keep it, see the top of this file.)
+        return self._positions[:self._count]
+
+    positions = property(_propGetPositions) # an array of the (x, y) position of each instance, which can be assigned to
+
+
+    def _propGetVisible(self):
+        # (A new view each time. Don't keep it, see the top of this file.)
+        return self._visible[:self._count]
+
+    visible = property(_propGetVisible) # an array of each instance's visibility, which can be assigned to
+
+
+    def _propGetClipIds(self):
+        return self._clipIds[:self._count]
+
+    clipIds = property(_propGetClipIds) # an array of the clip id of each instance (read only, use setClip() to change)
+
+
+    def play(self, which=None, startTime=None):
+        # Plays the selected instances, the same way as PygAnimation's play():
+        # stopped instances start from the beginning, paused ones continue,
+        # and finished ones that don't loop start over.
+        indexes = self._select(which)
+        now = self._getTime(startTime)
+        states = self._states[indexes]
+        finished = self._getFinished(indexes, now)
+        restart = (states == _STOPPED) | ((states == _PLAYING) & finished)
+        resume = states == _PAUSED
+        self._startTimes[indexes[restart]] = now
+        self._startTimes[indexes[resume]] = now - (self._pauseTimes[indexes[resume]] - self._startTimes[indexes[resume]])
+        self._states[indexes] = _PLAYING
+
+
+    def pause(self, which=None, startTime=None):
+        # Pauses the selected instances, the same way as PygAnimation's pause().
+        indexes = self._select(which)
+        now = self._getTime(startTime)
+        states = self._states[indexes]
+        self._pauseTimes[indexes[states == _PLAYING]] = now
+        stopped = indexes[states == _STOPPED]
+        self._startTimes[stopped] = now
+        self._pauseTimes[stopped] = now
+        self._states[indexes] = _PAUSED
+
+
+    def stop(self, which=None):
+        # Stops the selected instances, which resets them to their first frame.
+        self._states[self._select(which)] = _STOPPED
+
+
+    def seek(self, which, elapsed):
+        # Sets the elapsed time (in milliseconds) of the selected instances,
+        # the same way as setting PygAnimation's elapsed property. elapsed is a
+        # number or an array with one number per selected instance. Stopped
+        # instances become paused.
+        indexes = self._select(which)
+        now = pyganim._clockNs(self.clock)
+        lengths = self._clipLengths[self._clipIds[indexes]]
+        elapsed = numpy.broadcast_to(numpy.asarray(elapsed, numpy.float64), indexes.shape)
+        elapsed = numpy.where(self._loops[indexes], numpy.mod(elapsed, numpy.where(lengths > 0, lengths, 1)), numpy.clip(elapsed, 0, lengths))
+
+        rates = self._rates[indexes]
+        elapsedNs = numpy.where(rates > 0, elapsed * 1000000 / numpy.where(rates > 0, rates, 1), 0) # the real time it takes to play that far
+        self._startTimes[indexes] = now - numpy.round(elapsedNs).astype(numpy.int64)
+        self._pauseTimes[indexes] = now
+        states = self._states[indexes]
+        self._states[indexes[states == _STOPPED]] = _PAUSED
+
+
+    def setRate(self, which, rate):
+        # Changes the rate of the selected instances, keeping their current
+        # elapsed time. rate is a number or an array with one number per selected instance.
+        indexes = self._select(which)
+        rate = numpy.broadcast_to(numpy.asarray(rate, numpy.float64), indexes.shape)
+        if (rate < 0).any():
+            raise ValueError('rate must be greater than 0.')
+        notStopped = indexes[self._states[indexes] != _STOPPED]
+        elapsed = self._getElapsed(notStopped, pyganim._clockNs(self.clock))
+        self._rates[indexes] = rate
+        states = self._states[notStopped]
+        self.seek(notStopped, elapsed)
+        self._states[notStopped] = states # seek() doesn't change playing instances to paused, but keep them exactly as they were
+
+
+    def setClip(self, which, clipId):
+        # Changes the clip of the selected instances, and stops them.
+        if not 0 <= clipId < len(self._clips):
+            raise ValueError('%r is not a clip id of this pool' % (clipId,))
+        indexes = self._select(which)
+        self._clipIds[indexes] = clipId
+        self._states[indexes] = _STOPPED
+
+
+    def getStates(self, which=None):
+        # Returns an array of the selected instances' states (pyganim.PLAYING,
+        # pyganim.PAUSED, or pyganim.STOPPED). Instances that don't loop and
+        # have finished playing are stopped.
+        indexes = self._select(which)
+        self._stopFinished(indexes, pyganim._clockNs(self.clock))
+        return _STATE_NAMES[self._states[indexes]]
+
+
+    def getElapsed(self, which=None):
+        # Returns an array of the selected instances' elapsed times, in
+        # milliseconds. (Like PygAnimation's elapsed property, finished
+        # instances that haven't been stopped yet are at the end of their clip.)
+        indexes = self._select(which)
+        return self._getElapsed(indexes, pyganim._clockNs(self.clock)).astype(numpy.int64)
+
+
+    def getFrameNums(self, which=None):
+        # Returns an array of the frame number (of its clip) that each of the
+        # selected instances is on, like PygAnimation's currentFrameNum.
+        indexes = self._select(which)
+        return self._getFrameNums(indexes, self._getElapsed(indexes, pyganim._clockNs(self.clock)))
+
+
+    def blit(self, destSurface, which=None):
+        # Draws the current frame of each selected instance (all of them by
+        # default) that is visible and isn't stopped, at its position plus the
+        # frame's offset. Instances are drawn in index order.
+        indexes = self._select(which)
+        now = pyganim._clockNs(self.clock)
+        self._stopFinished(indexes, now)
+        indexes = indexes[self._visible[indexes] & (self._states[indexes] != _STOPPED)]
+        if len(indexes) == 0:
+            return
+        frames = self._clipFrames[self._clipIds[indexes]] + self._getFrameNums(indexes, self._getElapsed(indexes, now))
+        dests = (self._positions[indexes] + self._offsets[frames]).tolist()
+        surfaces = self._surfaces
+        blitSequence = [(surfaces[frame], dest) for frame, dest in zip(frames.tolist(), dests)]
+        if hasattr(destSurface, 'blits'):
+            destSurface.blits(blitSequence, False)
+        else:
+            for surf, dest in blitSequence: # (Pygame versions before 1.9.4 don't have blits())
+                destSurface.blit(surf, dest)
+
+
+    def _select(self, which):
+        # Internal-method. Returns an array of the instance indexes selected by
+        # which: None for every instance, a boolean mask, or indexes.
+        if which is None:
+            return numpy.flatnonzero(self._alive[:self._count])
+        which = numpy.asarray(which)
+        if which.dtype == bool:
+            if len(which) != self._count:
+                raise ValueError('the mask has %s items, but the pool has %s instance indexes' % (len(which), self._count))
+            return numpy.flatnonzero(which & self._alive[:self._count])
+        return which.astype(numpy.intp).ravel()
+
+
+    def _getTime(self, startTime):
+        # Internal-method. Converts a startTime argument (in milliseconds, or
+        # None for the current time) to nanoseconds.
+        if startTime is None:
+            return pyganim._clockNs(self.clock)
+        return pyganim._msToNs(startTime)
+
+
+    def _getElapsed(self, indexes, now):
+        # Internal-method. Returns a float array of the elapsed times (in whole
+        # milliseconds) of the instances, calculated the same way as
+        # PygAnimation's elapsed property.
+        states = self._states[indexes]
+        times = numpy.where(states == _PLAYING, now, self._pauseTimes[indexes]) - self._startTimes[indexes]
+        elapsed = numpy.floor(times * self._rates[indexes] / 1000000)
+        lengths = self._clipLengths[self._clipIds[indexes]]
+        elapsed = numpy.where(self._loops[indexes], numpy.mod(elapsed, numpy.where(lengths > 0, lengths, 1)), numpy.clip(elapsed, 0, lengths))
+        return numpy.where(states == _STOPPED, 0, elapsed)
+
+
+    def _getFinished(self, indexes, now):
+        # Internal-method. Returns a boolean array of which instances don't loop
+        # and have played to the end.
+        elapsed = self._getElapsed(indexes, now)
+        return ~self._loops[indexes] & (elapsed >= self._clipLengths[self._clipIds[indexes]]) & (self._states[indexes] != _STOPPED)
+
+
+    def _stopFinished(self, indexes, now):
+        # Internal-method. Stops the instances that have finished, like
+        # PygAnimation's blit() does.
+        self._states[indexes[self._getFinished(indexes, now)]] = _STOPPED
+
+
+    def _getFrameNums(self, indexes, elapsed):
+        # Internal-method. Returns the frame numbers shown at the elapsed times.
+        # The start times of all the clips are in one sorted array, so one
+        # searchsorted() call finds the frames of every instance.
+        clipIds = self._clipIds[indexes]
+        flatFrames = numpy.searchsorted(self._flatStartTimes, self._clipStarts[clipIds] + elapsed, 'right') - 1
+        frameNums = flatFrames - self._clipFrames[clipIds]
+        return numpy.clip(frameNums, 0, self._clipNumFrames[clipIds] - 1) # elapsed times at the end of the clip are its last frame
+
+
+    def _grow(self, capacity):
+        # Internal-method. Makes the arrays hold capacity instances.
+        def grown(arr):
+            newArr = numpy.zeros((capacity,) + arr.shape[1:], arr.dtype)
+            newArr[:len(arr)] = arr
+            return newArr
+        self._clipIds = grown(self._clipIds)
+        self._startTimes = grown(self._startTimes)
+        self._pauseTimes = grown(self._pauseTimes)
+        self._rates = grown(self._rates)
+        self._loops = grown(self._loops)
+        self._states = grown(self._states)
+        self._alive = grown(self._alive)
+        self._positions = grown(self._positions)
+        self._visible = grown(self._visible)
+        self._capacity = capacity
@@ -0,0 +1,102 @@
+# Pyganim Sprite
+# pygame.sprite.Sprite classes that show a PygAnimation (or PygPlayhead) object.
+#
+# The sprite's image and rect are only updated when the animation's frame
+# changes (the same way as PygAnimation's frameChanged()), and
+# AnimatedDirtySprite only sets its dirty flag then. So with
+# pygame.sprite.LayeredDirty, an animation with 100 ms frames is only
+# redrawn ten times a second, however fast the game loop runs. The rect
+# includes the frame's offset, so trimmed and anchored frames are drawn in
+# the same place that blit() draws them.
+#
+# Example:
+#
+#     allSprites = pygame.sprite.LayeredDirty()
+#     bolt = pyganim.sprite.AnimatedDirtySprite(boltAnim, (100, 100), allSprites)
+#     boltAnim.play()
+#     while True:
+#         allSprites.update() # only the sprites whose frame changed are marked dirty
+#         dirtyRects = allSprites.draw(windowSurface)
+#         pygame.display.update(dirtyRects)
+
+import pygame
+import pyganim
+
+
+class AnimatedSprite(pygame.sprite.Sprite):
+    def __init__(self, animObj, position=(0, 0), *groups):
+        # @param animObj The PygAnimation or PygPlayhead object to show.
+        # @param position
+        #     The (x, y) position to show the animation at. This is the same as
+        #     the dest passed to PygAnimation's blit(). Change the position
+        #     attribute to move the sprite.
+        # @param groups The pygame.sprite.Group objects to add the sprite to.
+        super(AnimatedSprite, self).__init__(*groups)
+        self.animObj = animObj
+        self.position = position
+        self.image = _getEmptySurface()
+        self.rect = pygame.Rect(position[0], position[1], 0, 0)
+        self._shownPosition = None # the position the image and rect were last updated for
+        self._frameKey = None # the animation's frame key (see PygAnimation's _getFrameKey()) the image was last updated for
+        self.update()
+
+
+    def update(self, *args, **kwargs):
+        # Updates the image and rect if the animation's frame changed or the
+        # sprite moved. Returns True if they were updated.
+        # (This compares frame keys itself rather than calling frameChanged(),
+        # so several sprites can show the same animation.)
+        position = tuple(self.position)
+        frameKey = self.animObj._getFrameKey()
+        if frameKey == self._frameKey and position == self._shownPosition:
+            return False
+        self._frameKey = frameKey
+        self._shownPosition = position
+
+        frameNum = frameKey[0]
+        if frameNum is None:
+            # stopped or not visible, so there's nothing to show
+            self._showFrame(None)
+        else:
+            dx, dy = self.animObj.getFrameOffset(frameNum)
+            self.image = self.animObj.getFrame(frameNum)
+            if isinstance(self.animObj._images, pyganim._DeltaFrames) and not self.animObj._transformedImages:
+                # a delta-encoded animation reconstructs every frame on the
+                # same Surface, so the sprite needs its own copy
+                self.image = self.image.copy()
+            self.rect = self.image.get_rect(topleft=(position[0] + dx, position[1] + dy))
+            self._showFrame(frameNum)
+        return True
+
+
+    def _showFrame(self, frameNum):
+        # Internal-method. Called by update() after the image and rect are
+        # updated for frameNum (None if nothing is shown).
+        if frameNum is None:
+            self.image = _getEmptySurface()
+            self.rect = pygame.Rect(self._shownPosition[0], self._shownPosition[1], 0, 0)
+
+
+class AnimatedDirtySprite(AnimatedSprite, pygame.sprite.DirtySprite):
+    # An AnimatedSprite for pygame.sprite.LayeredDirty groups. The dirty flag
+    # is set when the frame changes, and the sprite is hidden (its visible
+    # attribute is 0) while the animation is stopped or not visible.
+    def _showFrame(self, frameNum):
+        # Internal-method. Keeps the last frame's image while hidden, so
+        # LayeredDirty erases the area that it was drawn on.
+        if frameNum is None:
+            self.visible = 0 # (which sets dirty if it was visible)
+        else:
+            self.visible = 1
+            if self.dirty == 0:
+                self.dirty = 1
+
+
+_emptySurface = None
+
+def _getEmptySurface():
+    # Returns the 0 x 0 Surface that sprites show when nothing is drawn.
+    global _emptySurface
+    if _emptySurface is None:
+        _emptySurface = pygame.Surface((0, 0))
+    return _emptySurface
@@ -3,10 +3,26 @@ import sys
 import os
 import hashlib
 import time
+import tempfile
+import struct
 import pygame
 
 sys.path.insert(0, os.path.abspath('..'))
 import pyganim
+import pyganim.loader
+import pyganim.atlas
+import pyganim.bundle
+import pyganim.build
+import pyganim.events
+import pyganim.sprite
+import shutil
+import json
+
+try:
+    import numpy
+    import pyganim.pool
+except ImportError:
+    numpy = None # the AnimationPool tests are skipped
 
 
 runningOnPython2 = sys.version_info[0] == 2
@@ -15,10 +31,67 @@ BOLT_DURATIONS = 100
 BOLT_WIDTH, BOLT_HEIGHT = pygame.image.load('bolt1.png').get_size()
 
 
-def getTestAnimObj():
-    # Returns a standard PygAnimation object.
+def getTestAnimObj(clock=None):
+    # Returns a standard PygAnimation object. Pass a pyganim.VirtualClock to
+    # step its time with tick() instead of sleeping.
     frames = [('bolt%s.png' % (i), BOLT_DURATIONS) for i in range(1, NUM_BOLT_IMAGES + 1)]
-    return pyganim.PygAnimation(frames)
+    animObj = pyganim.PygAnimation(frames)
+    animObj.clock = clock
+    return animObj
+
+
+def writeTestGif(filename, canvasSize, globalPalette, background, frames):
+    # Writes a GIF file byte by byte, so that it has exactly the frames given:
+    # dicts with the frame's rect, its palette indexes, and optionally its own
+    # palette, transparent index, disposal method, and duration.
+    def getColorTable(palette):
+        bits = 1
+        while (1 << bits) < len(palette):
+            bits += 1
+        return bits, b''.join(bytes(bytearray(color)) for color in palette) + b'\x00\x00\x00' * ((1 << bits) - len(palette))
+
+    def getImageData(indexes, bits):
+        # every index is written as its own code, with a clear code before
+        # the code table would grow to the next code size
+        minCodeSize = max(2, bits)
+        clearCode = 1 << minCodeSize
+        codes = []
+        for i in range(0, len(indexes), clearCode - 2):
+            codes.append(clearCode)
+            codes.extend(indexes[i:i + clearCode - 2])
+        codes.append(clearCode + 1) # end of information
+        data = bytearray()
+        buffer = numBits = 0
+        for code in codes:
+            buffer |= code << numBits
+            numBits += minCodeSize + 1
+            while numBits >= 8:
+                data.append(buffer & 0xff)
+                buffer >>= 8
+                numBits -= 8
+        if numBits:
+            data.append(buffer)
+        blocks = bytearray([minCodeSize])
+        for i in range(0, len(data), 255):
+            blocks += bytearray([len(data[i:i + 255])]) + data[i:i + 255]
+        return bytes(blocks + b'\x00')
+
+    bits, colorTable = getColorTable(globalPalette)
+    data = b'GIF89a' + struct.pack('<HHBBB', canvasSize[0], canvasSize[1], 0x80 | (bits - 1), background, 0) + colorTable
+    for frame in frames:
+        transparent = frame.get('transparent')
+        packed = frame.get('disposal', 0) << 2 | (transparent is not None)
+        data += struct.pack('<BBBBHBB', 0x21, 0xf9, 4, packed, frame.get('duration', 10), transparent or 0, 0)
+        if 'palette' in frame:
+            bits, colorTable = getColorTable(frame['palette'])
+            data += struct.pack('<BHHHHB', 0x2c, *(tuple(frame['rect']) + (0x80 | (bits - 1),))) + colorTable
+        else:
+            bits = getColorTable(globalPalette)[0]
+            data += struct.pack('<BHHHHB', 0x2c, *(tuple(frame['rect']) + (0,)))
+        data += getImageData(frame['indexes'], bits)
+    gifFile = open(filename, 'wb')
+    gifFile.write(data + b'\x3b')
+    gifFile.close()
 
 
 def compareSurfaces(surf1, surf2):
@@ -215,20 +288,21 @@ class TestGeneral(unittest.TestCase):
 
 
     def test_isFinished(self):
+        clock = pyganim.VirtualClock()
         # test on animation that doesn't loop
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         animObj.loop = False
         animObj.play()
         self.assertEqual(animObj.isFinished(), False)
-        time.sleep((BOLT_DURATIONS * (NUM_BOLT_IMAGES + 1)) / 1000.0) # should be enough time to finish a single run through of the animation
+        clock.tick(BOLT_DURATIONS * (NUM_BOLT_IMAGES + 1)) # enough time to finish a single run through of the animation
         self.assertEqual(animObj.isFinished(), True)
 
         # test on animation that loops
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         animObj.loop = True
         animObj.play()
         self.assertEqual(animObj.isFinished(), False)
-        time.sleep((BOLT_DURATIONS * (NUM_BOLT_IMAGES + 1)) / 1000.0) # should be enough time to finish a single run through of the animation
+        clock.tick(BOLT_DURATIONS * (NUM_BOLT_IMAGES + 1)) # enough time to finish a single run through of the animation
         self.assertEqual(animObj.isFinished(), False) # looping animations are never finished
 
 
@@ -290,21 +364,22 @@ class TestGeneral(unittest.TestCase):
             self.assertEqual(expectedFrameNum, animObj.currentFrameNum)
 
     def test_play_pause(self):
+        clock = pyganim.VirtualClock()
         # with looping
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         self.assertTrue(animObj.loop)
         for i in range(1, NUM_BOLT_IMAGES + 3): # go a bit past the last frame
             animObj.play()
-            time.sleep(BOLT_DURATIONS / 1000.0)
+            clock.tick(BOLT_DURATIONS)
             animObj.pause()
             self.assertEqual(i % NUM_BOLT_IMAGES, animObj.currentFrameNum)
 
         # without looping
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         animObj.loop = False
         for i in range(1, NUM_BOLT_IMAGES + 3): # go a bit past the last frame
             animObj.play()
-            time.sleep(BOLT_DURATIONS / 1000.0)
+            clock.tick(BOLT_DURATIONS)
             animObj.pause()
             if i >= NUM_BOLT_IMAGES:
                 self.assertEqual(NUM_BOLT_IMAGES - 1, animObj.currentFrameNum) # with looping off, the currentFrameNum does not advance after the last frame
@@ -312,21 +387,22 @@ class TestGeneral(unittest.TestCase):
                 self.assertEqual(i, animObj.currentFrameNum)
 
     def test_togglePause(self):
+        clock = pyganim.VirtualClock()
         # with looping
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         self.assertTrue(animObj.loop)
         for i in range(1, NUM_BOLT_IMAGES + 3): # go a bit past the last frame
             animObj.togglePause()
-            time.sleep(BOLT_DURATIONS / 1000.0)
+            clock.tick(BOLT_DURATIONS)
             animObj.togglePause()
             self.assertEqual(i % NUM_BOLT_IMAGES, animObj.currentFrameNum)
 
         # without looping
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         animObj.loop = False
         for i in range(1, NUM_BOLT_IMAGES + 3): # go a bit past the last frame
             animObj.togglePause()
-            time.sleep(BOLT_DURATIONS / 1000.0)
+            clock.tick(BOLT_DURATIONS)
             animObj.togglePause()
             if i >= NUM_BOLT_IMAGES:
                 self.assertEqual(NUM_BOLT_IMAGES - 1, animObj.currentFrameNum) # with looping off, the currentFrameNum does not advance after the last frame
@@ -353,16 +429,17 @@ class TestGeneral(unittest.TestCase):
 
 
     def test_rewind(self):
-        animObj = getTestAnimObj()
+        clock = pyganim.VirtualClock()
+        animObj = getTestAnimObj(clock)
 
         animObj.play()
-        time.sleep(0.2)
+        clock.tick(200)
         animObj.pause()
         animObj.rewind()
         self.assertEqual(animObj.elapsed, 0)
 
         animObj.play()
-        time.sleep(0.2)
+        clock.tick(200)
         animObj.pause()
         origElapsed = animObj.elapsed
         animObj.rewind(100)
@@ -370,15 +447,16 @@ class TestGeneral(unittest.TestCase):
 
 
     def test_fastForward(self):
-        animObj = getTestAnimObj()
+        clock = pyganim.VirtualClock()
+        animObj = getTestAnimObj(clock)
         self.assertEqual(animObj.state, pyganim.STOPPED)
         animObj.fastForward(375)
         self.assertEqual(animObj.elapsed, 375)
         self.assertEqual(animObj.state, pyganim.PAUSED)
 
-        animObj = getTestAnimObj()
+        animObj = getTestAnimObj(clock)
         animObj.play()
-        time.sleep(0.2)
+        clock.tick(200)
         animObj.pause()
         origElapsed = animObj.elapsed
         animObj.rewind(100)
@@ -389,6 +467,773 @@ class TestGeneral(unittest.TestCase):
         self.assertEqual(len(animObj._images), 8)
         for i in range(8):
             self.assertEqual(animObj._durations[i], 100)
+        self.assertEqual(len(animObj.getDecodeTimes()), 8)
+        self.assertFalse(os.path.exists('.temp_pyganim.gif'))
+
+        # the first frame should have the same opaque pixels as Pygame's own GIF loader
+        firstFrameMask = pygame.mask.from_surface(animObj._images[0])
+        pygameMask = pygame.mask.from_surface(pygame.image.load('banana.gif'))
+        self.assertEqual(animObj._images[0].get_size(), pygameMask.get_size())
+        self.assertEqual(firstFrameMask.count(), pygameMask.count())
+        self.assertEqual(firstFrameMask.overlap_area(pygameMask, (0, 0)), pygameMask.count())
+
+
+class TestAnimatedPngAndWebp(unittest.TestCase):
+    def setUp(self):
+        from PIL import Image
+        self.tempDir = tempfile.mkdtemp()
+        self.images = []
+        for i in range(6):
+            im = Image.new('RGBA', (20, 10), (0, 0, 0, 0))
+            im.paste((255, i * 40, 0, 100 + i * 30), (i * 3, i, i * 3 + 5, 10))
+            self.images.append(im)
+        self.durations = [50, 60, 70, 80, 90, 100]
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def saveAnimation(self, filename, **kwargs):
+        filename = os.path.join(self.tempDir, filename)
+        self.images[0].save(filename, save_all=True, append_images=self.images[1:], duration=self.durations, loop=0, **kwargs)
+        return filename
+
+    def checkAnimation(self, filename):
+        from PIL import Image
+        im = Image.open(filename)
+        pillowFrames = []
+        for i in range(im.n_frames):
+            im.seek(i)
+            pillowFrames.append(im.convert('RGBA').tobytes())
+        im.close()
+
+        animObj = pyganim.PygAnimation(filename)
+        self.assertEqual(animObj.numFrames, len(pillowFrames))
+        for i in range(animObj.numFrames):
+            self.assertEqual(pygame.image.tostring(animObj.getFrame(i), 'RGBA'), pillowFrames[i])
+
+        lazyObj = pyganim.PygAnimation(filename, lazy=True)
+        self.assertEqual(lazyObj._durations, animObj._durations) # read from the chunks without decoding
+        self.assertEqual(len(lazyObj._images._source._decoded), 0)
+        for i in (0, 1, 2, 5, 3, 4, 0):
+            self.assertEqual(pygame.image.tostring(lazyObj.getFrame(i), 'RGBA'), pillowFrames[i], 'frame %s' % (i))
+
+        # step backward one frame at a time, without going back to frame 0
+        lazyObj = pyganim.PygAnimation(filename, lazy=True)
+        for i in (4, 3, 1):
+            self.assertEqual(pygame.image.tostring(lazyObj.getFrame(i), 'RGBA'), pillowFrames[i], 'frame %s' % (i))
+        return animObj
+
+    def test_apng(self):
+        animObj = self.checkAnimation(self.saveAnimation('blend.png', disposal=[0, 1, 2, 0, 1, 2], blend=[0, 1, 1, 0, 1, 1]))
+        self.assertEqual(animObj._durations, self.durations)
+        self.checkAnimation(self.saveAnimation('default.apng', default_image=True))
+
+    def test_webp(self):
+        animObj = self.checkAnimation(self.saveAnimation('anim.webp', lossless=True))
+        self.assertEqual(animObj._durations, self.durations)
+
+    def test_stillImage(self):
+        animObj = pyganim.PygAnimation('bolt1.png')
+        self.assertEqual(animObj.numFrames, 1)
+        self.assertEqual(animObj._durations, [pyganim.DEFAULT_DURATION])
+        self.assertEqual(pyganim.PygAnimation('bolt1.png', lazy=True)._durations, [pyganim.DEFAULT_DURATION])
+
+
+class TestConvertFrames(unittest.TestCase):
+    def setUp(self):
+        pygame.display.init()
+        self.displaySurf = pygame.display.set_mode((10, 10))
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_convertFrame(self):
+        opaqueSurf = pygame.Surface((4, 4), pygame.SRCALPHA, 32)
+        opaqueSurf.fill((255, 0, 0, 255))
+        convertedSurf = pyganim.convertFrame(opaqueSurf)
+        self.assertFalse(convertedSurf.get_flags() & pygame.SRCALPHA) # the alpha channel wasn't used
+        self.assertEqual(convertedSurf.get_masks()[:3], self.displaySurf.get_masks()[:3])
+
+        translucentSurf = opaqueSurf.copy()
+        translucentSurf.set_at((0, 0), (255, 0, 0, 128))
+        convertedSurf = pyganim.convertFrame(translucentSurf)
+        self.assertTrue(convertedSurf.get_flags() & pygame.SRCALPHA)
+        self.assertEqual(convertedSurf.get_at((0, 0)), pygame.Color(255, 0, 0, 128))
+
+        colorkeySurf = pygame.Surface((4, 4))
+        colorkeySurf.set_colorkey((0, 0, 0))
+        convertedSurf = pyganim.convertFrame(colorkeySurf)
+        self.assertEqual(convertedSurf.get_colorkey(), pygame.Color(0, 0, 0, 255))
+        self.assertTrue(convertedSurf.get_flags() & (pygame.RLEACCEL | pygame.RLEACCELOK)) # RLEACCELOK until it's first blitted
+
+    def test_convertOnLoad(self):
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('smoke0.png', 100)], convert=True)
+        self.assertTrue(animObj.getFrame(0).get_flags() & pygame.SRCALPHA) # bolt1.png has transparent pixels
+        self.assertFalse(animObj.getFrame(1).get_flags() & pygame.SRCALPHA) # smoke0.png is opaque
+        self.assertEqual(pygame.image.tostring(animObj.getFrame(0), 'RGBA'), pygame.image.tostring(pygame.image.load('bolt1.png'), 'RGBA'))
+
+        pyganim.CONVERT_FRAMES = True
+        try:
+            eagerObj = pyganim.PygAnimation('banana.gif')
+            lazyObj = pyganim.PygAnimation('banana.gif', lazy=True)
+        finally:
+            pyganim.CONVERT_FRAMES = False
+        for i in range(eagerObj.numFrames):
+            self.assertEqual(eagerObj.getFrame(i).get_bitsize(), self.displaySurf.get_bitsize())
+            self.assertEqual(pygame.image.tostring(lazyObj.getFrame(i), 'RGBA'), pygame.image.tostring(eagerObj.getFrame(i), 'RGBA'))
+
+        surf = pygame.image.load('bolt1.png')
+        animObj = pyganim.PygAnimation([(surf, 100)], convert=True)
+        self.assertTrue(animObj.getFrame(0) is surf) # Surfaces that are passed in are left alone
+
+
+class TestClipsAndPlayheads(unittest.TestCase):
+    def test_copiesShareClip(self):
+        animObj = getTestAnimObj()
+        animCopies = animObj.getCopies(3)
+        for animCopy in animCopies:
+            self.assertTrue(animCopy.clip is animObj.clip)
+            self.assertEqual(animCopy.numFrames, NUM_BOLT_IMAGES)
+
+        # changing a copy's frames gives it its own clip (copy-on-write)
+        origFrames = list(animObj._images)
+        animCopies[0].flip(True, False)
+        animCopies[1].reverse()
+        self.assertFalse(animCopies[0].clip is animObj.clip)
+        self.assertEqual(animObj._transformedImages, [])
+        self.assertEqual(animObj._images, origFrames)
+        self.assertEqual(animCopies[1]._images, origFrames[::-1])
+        self.assertTrue(animCopies[2].clip is animObj.clip)
+
+        # setting a frame attribute does too
+        animCopies[2]._offsets = [(1, 1)] * NUM_BOLT_IMAGES
+        self.assertEqual(animObj._offsets, [(0, 0)] * NUM_BOLT_IMAGES)
+
+    def test_playheads(self):
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt2.png', 300)])
+        playheads = animObj.getPlayheads(2)
+        self.assertTrue(sys.getsizeof(playheads[0]) < 100)
+        self.assertFalse(hasattr(playheads[0], '__dict__'))
+
+        now = pyganim.beginFrame(1000000)
+        try:
+            playheads[0].play()
+            pyganim.beginFrame(now + 150)
+            self.assertEqual(playheads[0].currentFrameNum, 1)
+            self.assertEqual(playheads[1].state, pyganim.STOPPED)
+            destSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+            playheads[0].blit(destSurf, (0, 0))
+            expectedSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+            expectedSurf.blit(pygame.image.load('bolt2.png'), (0, 0))
+            self.assertEqual(pygame.image.tostring(destSurf, 'RGB'), pygame.image.tostring(expectedSurf, 'RGB'))
+        finally:
+            pyganim.endFrame()
+
+        animObj.scale((10, 10)) # doesn't change the playheads' frames
+        self.assertEqual(playheads[0].getFrame(0).get_size(), (BOLT_WIDTH, BOLT_HEIGHT))
+
+    def test_reverseStartTimes(self):
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt2.png', 300)])
+        animObj.reverse()
+        self.assertEqual(animObj._startTimes, [0, 300, 400])
+        animObj.elapsed = 350
+        self.assertEqual(animObj.currentFrameNum, 1)
+
+
+class TestColorkey(unittest.TestCase):
+    def assertRle(self, surf):
+        self.assertEqual(surf.get_colorkey(), pygame.Color(0, 0, 0, 255))
+        self.assertTrue(surf.get_flags() & (pygame.RLEACCEL | pygame.RLEACCELOK)) # RLEACCELOK until it's first blitted
+
+    def test_colorkeyOnLoad(self):
+        animObj = pyganim.PygAnimation([('smoke0.png', 100), ('smoke1.png', 100)], colorkey=(0, 0, 0))
+        for surf in animObj._images:
+            self.assertRle(surf)
+        lazyObj = pyganim.PygAnimation([('smoke0.png', 100), ('smoke1.png', 100)], lazy=True, colorkey=(0, 0, 0))
+        self.assertRle(lazyObj.getFrame(1))
+
+        for copyObj in animObj.getCopies(2):
+            self.assertRle(copyObj.getFrame(0))
+
+    def test_colorkeySurvivesTransforms(self):
+        animObj = pyganim.PygAnimation([('smoke0.png', 100), ('smoke1.png', 100)], colorkey=(0, 0, 0))
+        animObj.flip(True, False)
+        animObj.rotate(45)
+        for surf in animObj._transformedImages:
+            self.assertRle(surf)
+
+        transformedFrame = animObj._transformedImages[0]
+        animObj.makeTransformsPermanent()
+        self.assertTrue(animObj._images[0] is transformedFrame) # not copied again
+        self.assertEqual(animObj._transformedImages, [])
+        for surf in animObj._images:
+            self.assertRle(surf)
+
+        animObj.makeTransformsPermanent() # does nothing without transforms
+        self.assertTrue(animObj._images[0] is transformedFrame)
+
+    def test_spriteSheetColorkey(self):
+        images = pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=3, colorkey=(0, 0, 0))
+        for surf in images:
+            self.assertRle(surf)
+        plainImages = pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=3)
+        self.assertEqual(plainImages[0].get_colorkey(), None) # cached separately from the colorkey'd copies
+        pyganim.clearSpriteSheetCache()
+
+    def test_sharedSurfacesKeepTheirColorkey(self):
+        # the colorkey is set on copies of Surfaces that other code may share
+        surf = pygame.image.load('smoke0.png')
+        animObj = pyganim.PygAnimation([(surf, 100)], colorkey=(0, 0, 0))
+        self.assertRle(animObj._images[0])
+        self.assertEqual(surf.get_colorkey(), None)
+
+        cacheSpriteSheets = pyganim.CACHE_SPRITE_SHEETS
+        pyganim.CACHE_SPRITE_SHEETS = True
+        try:
+            images = pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=3)
+            animObj = pyganim.PygAnimation([(surf, 100) for surf in images], colorkey=(0, 0, 0))
+            self.assertRle(animObj._images[0])
+            self.assertEqual(pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=3)[0].get_colorkey(), None)
+
+            keyedImages = pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=3, colorkey=(0, 0, 0))
+            animObj = pyganim.PygAnimation([(surf, 100) for surf in keyedImages], colorkey=(0, 0, 0))
+            self.assertTrue(animObj._images[0] is keyedImages[0]) # already has the colorkey, so it isn't copied
+        finally:
+            pyganim.CACHE_SPRITE_SHEETS = cacheSpriteSheets
+            pyganim.clearSpriteSheetCache()
+
+        pyganim.IMAGE_CACHE = pyganim.ImageCache()
+        try:
+            pyganim.PygAnimation([('smoke0.png', 100)], colorkey=(0, 0, 0))
+            self.assertEqual(pyganim.PygAnimation([('smoke0.png', 100)])._images[0].get_colorkey(), None)
+        finally:
+            pyganim.IMAGE_CACHE = None
+
+
+class TestDedupe(unittest.TestCase):
+    def test_dedupe(self):
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt1.png', 50), ('bolt2.png', 100), ('bolt1.png', 200)])
+        frameBytes = animObj._images[0].get_pitch() * BOLT_HEIGHT
+        origFrame = animObj._images[0]
+        info = animObj.dedupe()
+        self.assertEqual(info, {'framesSaved': 2, 'framesMerged': 1, 'bytesSaved': frameBytes * 2})
+        self.assertEqual(animObj.numFrames, 3)
+        self.assertEqual(animObj._durations, [150, 100, 200])
+        self.assertEqual(animObj._startTimes, [0, 150, 250, 450])
+        self.assertTrue(animObj._images[0] is origFrame)
+        self.assertTrue(animObj._images[2] is origFrame)
+
+        # identical frames of other animations share the same Surface
+        otherObj = pyganim.PygAnimation([('bolt2.png', 100), ('bolt3.png', 100)], dedupe=True)
+        self.assertTrue(otherObj._images[0] is animObj._images[1])
+        self.assertEqual(otherObj.dedupe(), {'framesSaved': 0, 'framesMerged': 0, 'bytesSaved': 0})
+
+        # without merging, the frames are kept but share Surfaces
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt1.png', 50)])
+        info = animObj.dedupe(merge=False)
+        self.assertEqual(info['framesMerged'], 0)
+        self.assertEqual(animObj.numFrames, 2)
+        self.assertTrue(animObj._images[0] is animObj._images[1] is origFrame)
+
+
+class TestTrim(unittest.TestCase):
+    def drawFrame(self, animObj, frameNum):
+        # returns the pixels of the frame drawn at (10, 10), as the canvas is drawn by blitFrameNum()
+        surf = pygame.Surface((BOLT_WIDTH * 2 + 20, BOLT_HEIGHT * 2 + 20))
+        surf.fill((0, 0, 128))
+        animObj.play()
+        animObj.blitFrameNum(frameNum, surf, (10, 10))
+        return pygame.image.tostring(surf, 'RGB')
+
+    def test_trim(self):
+        animObj = getTestAnimObj()
+        trimmedObj = getTestAnimObj()
+        trimmedObj.trim()
+        for i in range(NUM_BOLT_IMAGES):
+            rect = animObj.getFrame(i).get_bounding_rect()
+            self.assertEqual(trimmedObj.getFrame(i).get_size(), rect.size)
+            self.assertEqual(trimmedObj.getFrameOffset(i), rect.topleft)
+            self.assertEqual(self.drawFrame(trimmedObj, i), self.drawFrame(animObj, i))
+        self.assertEqual(trimmedObj.getRect(), animObj.getRect())
+
+        # frames that are subsurfaces are trimmed to subsurfaces of the same parent
+        sheetObj = pyganim.getAnimationsFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=10)[0]
+        sheetObj.trim()
+        self.assertTrue(sheetObj.getFrame(0).get_abs_parent() is sheetObj.getFrame(1).get_abs_parent())
+
+    def test_transformTrimmed(self):
+        for transform, args in (('flip', (True, False)), ('flip', (False, True)), ('rotate', (90,)), ('rotate', (-90,)),
+                                ('scale', ((BOLT_WIDTH * 2, BOLT_HEIGHT * 2),))):
+            animObj = getTestAnimObj()
+            trimmedObj = pyganim.PygAnimation([('bolt%s.png' % num, 100) for num in range(1, NUM_BOLT_IMAGES + 1)], trim=True)
+            getattr(animObj, transform)(*args)
+            getattr(trimmedObj, transform)(*args)
+            self.assertEqual(trimmedObj.getRect(), animObj.getRect())
+            for i in range(NUM_BOLT_IMAGES):
+                self.assertEqual(self.drawFrame(trimmedObj, i), self.drawFrame(animObj, i), '%s%s frame %s' % (transform, args, i))
+
+        # scale2x() looks at neighboring pixels, so the trimmed edges can differ slightly
+        trimmedObj = pyganim.PygAnimation([('bolt%s.png' % num, 100) for num in range(1, NUM_BOLT_IMAGES + 1)], trim=True)
+        trimmedObj.scale2x()
+        for i in range(NUM_BOLT_IMAGES):
+            self.assertEqual(trimmedObj.getFrameOffset(i), (trimmedObj._offsets[i][0] * 2, trimmedObj._offsets[i][1] * 2))
+        self.assertEqual(trimmedObj._getCanvasSize(0), (BOLT_WIDTH * 2, BOLT_HEIGHT * 2))
+
+    def test_anchorWithOffsets(self):
+        smallSurf = pygame.Surface((10, 20))
+        bigSurf = pygame.Surface((30, 40))
+        animObj = pyganim.PygAnimation([(smallSurf, 100), (bigSurf, 100)])
+        animObj.anchor(pyganim.SOUTHEAST)
+        self.assertTrue(animObj.getFrame(0) is smallSurf) # no padded Surfaces are made
+        self.assertEqual(animObj.getFrameOffset(0), (20, 20))
+        self.assertEqual(animObj.getFrameOffset(1), (0, 0))
+        self.assertTrue(animObj.framesAreSameSize())
+
+        animObj = pyganim.PygAnimation([(smallSurf, 100), (bigSurf, 100)])
+        animObj.anchor(pyganim.CENTER)
+        self.assertEqual(animObj.getFrameOffset(0), (10, 10))
+        destSurf = pygame.Surface((50, 50))
+        animObj.play()
+        self.assertEqual(animObj.blitFrameNum(0, destSurf, (5, 5)), None)
+        smallSurf.fill((255, 0, 0))
+        animObj.blitFrameNum(0, destSurf, (5, 5))
+        self.assertEqual(destSurf.get_at((15, 15)), pygame.Color(255, 0, 0))
+        self.assertEqual(destSurf.get_at((14, 15)), pygame.Color(0, 0, 0))
+
+
+class TestDeltaEncoding(unittest.TestCase):
+    def makeFrames(self, baseSurf):
+        # the base image with a small square that changes color, and sometimes isn't there
+        frames = []
+        for i in range(8):
+            surf = baseSurf.copy()
+            if i % 3 != 0:
+                surf.fill((i * 30, 255 - i * 30, 0, 128 + i * 10), (10 + i, 20, 6, 6))
+            frames.append((surf, 100))
+        return frames
+
+    def checkFrames(self, animObj, frames):
+        for i in (0, 1, 2, 3, 7, 5, 4, 6, 0, 6):
+            self.assertEqual(pygame.image.tostring(animObj.getFrame(i), 'RGBA'), pygame.image.tostring(frames[i][0], 'RGBA'), 'frame %s' % (i))
+
+    def test_deltaEncode(self):
+        for baseSurf in (pygame.image.load('bolt1.png'), pygame.image.load('smoke0.png')):
+            frames = self.makeFrames(baseSurf)
+            animObj = pyganim.PygAnimation(frames)
+            info = animObj.deltaEncode()
+            frameBytes = baseSurf.get_pitch() * baseSurf.get_height()
+            self.assertEqual(info['bytesBefore'], frameBytes * 8)
+            self.assertTrue(info['bytesAfter'] < frameBytes * 3)
+            self.assertEqual(info['bytesSaved'], info['bytesBefore'] - info['bytesAfter'])
+            self.assertTrue(info['reconstructTime'] >= 0)
+            self.assertEqual(animObj.numFrames, 8)
+            self.checkFrames(animObj, frames)
+
+            # copies and reversed animations share the encoded frames
+            animCopy = animObj.getCopy()
+            animCopy.reverse()
+            self.assertEqual(pygame.image.tostring(animCopy.getFrame(0), 'RGBA'), pygame.image.tostring(frames[7][0], 'RGBA'))
+            self.checkFrames(animObj, frames)
+
+            # iterating gives separate, fully reconstructed frames
+            decodedFrames = list(animObj._images)
+            self.assertEqual(len(set([id(surf) for surf in decodedFrames])), 8)
+            for i in range(8):
+                self.assertEqual(pygame.image.tostring(decodedFrames[i], 'RGBA'), pygame.image.tostring(frames[i][0], 'RGBA'))
+
+    def test_blitDeltaEncoded(self):
+        frames = self.makeFrames(pygame.image.load('bolt1.png'))
+        animObj = pyganim.PygAnimation(frames)
+        animObj.deltaEncode()
+        animObj.play()
+        for i in range(8):
+            destSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+            expectedSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+            animObj.blitFrameNum(i, destSurf, (0, 0))
+            expectedSurf.blit(frames[i][0], (0, 0))
+            self.assertEqual(pygame.image.tostring(destSurf, 'RGB'), pygame.image.tostring(expectedSurf, 'RGB'))
+
+    def test_differentSizes(self):
+        animObj = pyganim.PygAnimation([(pygame.Surface((10, 10)), 100), (pygame.Surface((10, 20)), 100)])
+        self.assertRaises(ValueError, animObj.deltaEncode)
+
+
+class TestLazyLoading(unittest.TestCase):
+    def test_lazyGif(self):
+        eagerObj = pyganim.PygAnimation('banana.gif')
+        lazyObj = pyganim.PygAnimation('banana.gif', lazy=True)
+        self.assertEqual(lazyObj.numFrames, 8)
+        self.assertEqual(lazyObj._durations, eagerObj._durations)
+        self.assertEqual(lazyObj.getDecodeTimes(), [0.0] * 8) # nothing has been decoded yet
+
+        for i in (5, 2, 7, 0, 3): # seeking in any order gives the same frames
+            self.assertEqual(pygame.image.tostring(lazyObj.getFrame(i), 'RGBA'), pygame.image.tostring(eagerObj.getFrame(i), 'RGBA'), 'frame %s' % (i))
+        self.assertTrue(lazyObj.getDecodeTimes()[5] > 0)
+
+    def test_lazyGifCompositing(self):
+        # frames smaller than the canvas, with local palettes, transparency, and every disposal method
+        globalPalette = [(0, 0, 0), (255, 0, 0), (0, 255, 0), (0, 0, 255)]
+        background = 2
+        frames = [dict(rect=(0, 0, 6, 5), indexes=[i * 7 % 4 for i in range(30)], disposal=1),
+                  dict(rect=(1, 1, 3, 3), palette=[(10, 20, 30), (200, 100, 50), (5, 250, 5), (90, 90, 90)], transparent=0, indexes=[0, 1, 2, 3, 0, 1, 2, 3, 0], disposal=2),
+                  dict(rect=(2, 0, 3, 4), palette=[(1, 2, 3), (40, 50, 60), (70, 80, 90), (100, 110, 120), (130, 140, 150)], indexes=[i % 5 for i in range(12)], disposal=3),
+                  dict(rect=(0, 2, 4, 3), indexes=[i % 4 for i in range(12)], disposal=2),
+                  dict(rect=(3, 1, 3, 3), palette=[(9, 9, 9), (250, 250, 0)], transparent=1, indexes=[0, 1, 1, 0, 1, 0, 1, 1, 0], disposal=0),
+                  dict(rect=(0, 0, 2, 2), transparent=0, indexes=[0, 3, 2, 0], disposal=1)]
+        tempDir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempDir, 'composite.gif')
+            writeTestGif(filename, (6, 5), globalPalette, background, frames)
+
+            # what each frame should look like, composited the simple way: every frame in order
+            canvas = [(0, 0, 0, 0)] * 30
+            expected = []
+            for frame in frames:
+                x, y, width, height = frame['rect']
+                palette = frame.get('palette', globalPalette)
+                previous = list(canvas)
+                for i, index in enumerate(frame['indexes']):
+                    if index != frame.get('transparent'):
+                        canvas[(y + i // width) * 6 + x + i % width] = palette[index] + (255,)
+                expected.append(b''.join(bytes(bytearray(color)) for color in canvas))
+                if frame['disposal'] == 2:
+                    color = (0, 0, 0, 0) if 'transparent' in frame else globalPalette[background] + (255,)
+                    for i in range(width * height):
+                        canvas[(y + i // width) * 6 + x + i % width] = color
+                elif frame['disposal'] == 3:
+                    canvas = previous
+
+            for order in (range(6), (5, 2, 4, 1, 3, 0)):
+                lazyObj = pyganim.PygAnimation(filename, lazy=True)
+                lazyObj._images._source.window = 1 # so seeking has to composite from earlier frames again
+                for i in order:
+                    self.assertEqual(pygame.image.tostring(lazyObj.getFrame(i), 'RGBA'), expected[i], 'frame %s' % (i))
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_window(self):
+        frames = [('bolt%s.png' % (i), BOLT_DURATIONS) for i in range(1, NUM_BOLT_IMAGES + 1)]
+        animObj = pyganim.PygAnimation(frames, lazy=True)
+        animCopy = animObj.getCopy()
+        animCopy.reverse()
+
+        for i in range(NUM_BOLT_IMAGES):
+            frame = animObj.getFrame(i)
+            self.assertEqual(None, compareSurfaces(frame, pygame.image.load('bolt%s.png' % (i + 1))))
+            self.assertTrue(animCopy.getFrame(NUM_BOLT_IMAGES - 1 - i) is frame) # copies share decoded frames
+        self.assertEqual(len(animObj._images._source._decoded), pyganim.LAZY_WINDOW)
+
+
+class TestAnimationLoader(unittest.TestCase):
+    def setUp(self):
+        self.loader = pyganim.loader.AnimationLoader(numThreads=2)
+
+    def tearDown(self):
+        self.loader.close()
+
+    def pumpUntilLoaded(self):
+        numFinished = 0
+        startTime = time.time()
+        while self.loader.pending and time.time() - startTime < 10:
+            numFinished += self.loader.pump(1)
+        return numFinished
+
+    def test_load(self):
+        frames = [('bolt%s.png' % (i), BOLT_DURATIONS) for i in range(1, NUM_BOLT_IMAGES + 1)]
+        animObj = self.loader.load(frames, loop=False)
+        gifObj = self.loader.load('banana.gif')
+
+        # the placeholder can be used while the frames load
+        animObj.play()
+        animObj.blit(pygame.Surface((10, 10)), (0, 0))
+        self.assertEqual(self.pumpUntilLoaded(), 2)
+
+        self.assertTrue(self.loader.isLoaded(animObj))
+        self.assertEqual(animObj.numFrames, NUM_BOLT_IMAGES)
+        self.assertEqual(animObj.state, pyganim.PLAYING)
+        self.assertFalse(animObj.loop)
+        self.assertEqual(animObj.getFrame(0).get_size(), (BOLT_WIDTH, BOLT_HEIGHT))
+        self.assertEqual(gifObj.numFrames, 8)
+
+    def test_priorities(self):
+        # with no threads, the queue order can be checked before anything is decoded
+        self.loader.close()
+        self.loader = pyganim.loader.AnimationLoader(numThreads=0)
+        lowObj = self.loader.load(['bolt1.png'])
+        hiddenObj = self.loader.load(['bolt2.png'], priority=5)
+        hiddenObj.visibility = False
+        visibleObj = self.loader.load(['bolt3.png'], priority=5)
+        order = sorted(self.loader._queued, key=pyganim.loader._requestOrder)
+        self.assertEqual([request.animObj for request in order], [visibleObj, hiddenObj, lowObj])
+
+        self.loader.setPriority(lowObj, 10)
+        self.assertTrue(min(self.loader._queued, key=pyganim.loader._requestOrder).animObj is lowObj)
+
+    def test_errors(self):
+        animObj = self.loader.load(['doesNotExist.png'])
+        startTime = time.time()
+        while not self.loader._decoded and time.time() - startTime < 10:
+            time.sleep(0.01)
+        self.assertRaises(Exception, self.loader.pump)
+        self.assertFalse(self.loader.isLoaded(animObj)) # it never will be
+        self.assertEqual(self.loader.pending, 0)
+        self.assertEqual(animObj.numFrames, 1)
+
+        blankSheet = pygame.Surface((20, 10), pygame.SRCALPHA, 32)
+        fd, filename = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        try:
+            pygame.image.save(blankSheet, filename)
+            for animObj in (self.loader.load([]), self.loader.loadSpriteSheet(filename, rows=1, cols=2, skipBlank=True),
+                            self.loader.loadSpriteSheet(filename, rows=1, cols=2, durations=[100])): # too few durations
+                startTime = time.time()
+                while not self.loader._decoded and time.time() - startTime < 10:
+                    time.sleep(0.01)
+                self.assertRaises(ValueError, self.loader.pump)
+                self.assertFalse(self.loader.isLoaded(animObj))
+        finally:
+            os.unlink(filename)
+
+
+class TestAtlas(unittest.TestCase):
+    def test_packAnimations(self):
+        animObj = getTestAnimObj()
+        flippedObj = animObj.getCopy()
+        flippedObj.flip(True, False)
+        smokeObj = pyganim.PygAnimation([('smoke%s.png' % (i), 100) for i in range(10)])
+        allObjs = [animObj, flippedObj, smokeObj]
+
+        framePixels = [[pygame.image.tostring(a.getFrame(i), 'RGBA') for i in range(a.numFrames)] for a in allObjs]
+        origPixels = [pygame.image.tostring(surf, 'RGBA') for surf in animObj._images]
+
+        info = pyganim.atlas.packAnimations(pyganim.PygConductor(allObjs), maxSize=(512, 512))
+        self.assertEqual(info['numFrames'], NUM_BOLT_IMAGES * 2 + 10) # the copy's _images are shared with the original
+        self.assertTrue(0 < info['efficiency'] <= 1)
+        self.assertEqual(info['bytesSaved'], info['bytesBefore'] - info['bytesAfter'])
+
+        atlasIds = set([id(atlas) for atlas in info['atlases']])
+        for a, pixels in zip(allObjs, framePixels):
+            for i in range(a.numFrames):
+                self.assertTrue(id(a.getFrame(i).get_abs_parent()) in atlasIds)
+                self.assertEqual(pygame.image.tostring(a.getFrame(i), 'RGBA'), pixels[i])
+
+        # the untransformed originals are packed too
+        flippedObj.clearTransforms()
+        for i in range(NUM_BOLT_IMAGES):
+            self.assertEqual(pygame.image.tostring(flippedObj.getFrame(i), 'RGBA'), origPixels[i])
+
+    def test_skyline(self):
+        skyline = pyganim.atlas._Skyline(100, 100)
+        rects = []
+        for size in [(30, 40), (50, 20), (20, 20), (70, 10), (10, 70), (40, 40), (30, 5)]:
+            x, y = skyline.place(*size)
+            rect = pygame.Rect((x, y), size)
+            self.assertTrue(pygame.Rect(0, 0, 100, 100).contains(rect))
+            self.assertEqual(rect.collidelist(rects), -1)
+            rects.append(rect)
+        self.assertEqual(skyline.place(101, 1), None)
+
+
+class TestBundle(unittest.TestCase):
+    def setUp(self):
+        fd, self.bundleFilename = tempfile.mkstemp(suffix='.pygb')
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.bundleFilename)
+
+    def test_compileAndLoad(self):
+        animObj = getTestAnimObj()
+        animObj.loop = False
+        gifObj = pyganim.PygAnimation('banana.gif', trim=True)
+        gifObj.rate = 2.0
+        deltaObj = pyganim.PygAnimation('banana.gif')
+        deltaObj.deltaEncode()
+        pyganim.bundle.compileBundle(self.bundleFilename, {'bolt': animObj, 'bolt copy': animObj.getCopy(), 'banana': gifObj, 'delta': deltaObj})
+
+        loaded = pyganim.bundle.loadBundle(self.bundleFilename)
+        self.assertEqual(sorted(loaded.keys()), ['banana', 'bolt', 'bolt copy', 'delta'])
+        for name, origObj in (('bolt', animObj), ('banana', gifObj), ('delta', deltaObj)):
+            self.assertEqual(loaded[name].loop, origObj.loop)
+            self.assertEqual(loaded[name].rate, origObj.rate)
+            self.assertEqual(loaded[name]._durations, origObj._durations)
+            self.assertEqual(loaded[name]._startTimes, origObj._startTimes)
+            self.assertEqual(loaded[name]._offsets, origObj._offsets)
+            self.assertEqual(loaded[name]._sizes, origObj._sizes)
+            for i in range(origObj.numFrames):
+                self.assertEqual(pygame.image.tostring(loaded[name].getFrame(i), 'RGBA'), pygame.image.tostring(origObj.getFrame(i), 'RGBA'))
+        for i in range(NUM_BOLT_IMAGES):
+            self.assertTrue(loaded['bolt'].getFrame(i) is loaded['bolt copy'].getFrame(i)) # shared frames are stored once
+
+    def test_loadWithTrimAndDedupeOn(self):
+        # the stored start times and offsets must still match the frames
+        bolt1, bolt2 = pygame.image.load('bolt1.png'), pygame.image.load('bolt2.png')
+        animObj = pyganim.PygAnimation([(bolt1, 100), (bolt1, 100), (bolt1, 100), (bolt2, 50)], trim=False, dedupe=False)
+        pyganim.bundle.compileBundle(self.bundleFilename, {'bolt': animObj})
+        trimFrames, dedupeFrames = pyganim.TRIM_FRAMES, pyganim.DEDUPE_FRAMES
+        pyganim.TRIM_FRAMES = pyganim.DEDUPE_FRAMES = True
+        try:
+            loaded = pyganim.bundle.loadBundle(self.bundleFilename)['bolt']
+        finally:
+            pyganim.TRIM_FRAMES, pyganim.DEDUPE_FRAMES = trimFrames, dedupeFrames
+        self.assertEqual(loaded.numFrames, 4)
+        self.assertEqual(loaded._startTimes, [0, 100, 200, 300, 350])
+        self.assertEqual(loaded._offsets, [(0, 0)] * 4)
+        for i in range(4):
+            self.assertEqual(loaded.getFrame(i).get_size(), (BOLT_WIDTH, BOLT_HEIGHT))
+        self.assertEqual(loaded.getFrame(3).get_at((20, 20)), bolt2.get_at((20, 20)))
+        loaded.currentFrameNum = 3
+        loaded.blit(pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT)))
+
+    def test_detectStaleAndCorrupt(self):
+        fd, sourceFilename = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        try:
+            pygame.image.save(pygame.image.load('bolt1.png'), sourceFilename)
+            animObj = pyganim.PygAnimation([(sourceFilename, 100)])
+            pyganim.bundle.compileBundle(self.bundleFilename, {'bolt': animObj}, sources=[sourceFilename])
+            self.assertFalse(pyganim.bundle.isBundleStale(self.bundleFilename))
+            os.utime(sourceFilename, (0, 0))
+            self.assertTrue(pyganim.bundle.isBundleStale(self.bundleFilename))
+        finally:
+            os.unlink(sourceFilename)
+
+        bundleFile = open(self.bundleFilename, 'rb')
+        data = bytearray(bundleFile.read())
+        bundleFile.close()
+
+        data[-1] ^= 0xff # corrupt the pixel data
+        bundleFile = open(self.bundleFilename, 'wb')
+        bundleFile.write(data)
+        bundleFile.close()
+        self.assertRaises(ValueError, pyganim.bundle.loadBundle, self.bundleFilename)
+        pyganim.bundle.loadBundle(self.bundleFilename, verify=False)
+
+        data[8] += 1 # change the version number
+        bundleFile = open(self.bundleFilename, 'wb')
+        bundleFile.write(data)
+        bundleFile.close()
+        self.assertRaises(ValueError, pyganim.bundle.loadBundle, self.bundleFilename, verify=False)
+        self.assertTrue(pyganim.bundle.isBundleStale(self.bundleFilename))
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.sourceDir = tempfile.mkdtemp()
+        self.outputDir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.sourceDir, 'effects'))
+        shutil.copy('banana.gif', self.sourceDir)
+        shutil.copy('bolt1.png', os.path.join(self.sourceDir, 'effects'))
+        shutil.copy('smokeSpritesheet.png', os.path.join(self.sourceDir, 'effects'))
+        self.writeSidecar({'cols': 10, 'rows': 1, 'durations': 50})
+
+    def tearDown(self):
+        shutil.rmtree(self.sourceDir)
+        shutil.rmtree(self.outputDir)
+
+    def writeSidecar(self, sheetArgs):
+        sidecarFile = open(os.path.join(self.sourceDir, 'effects', 'smokeSpritesheet.png.json'), 'w')
+        json.dump(sheetArgs, sidecarFile)
+        sidecarFile.close()
+
+    def test_buildAssets(self):
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=2)
+        self.assertEqual(report['built'], ['banana.gif', 'effects/bolt1.png', 'effects/smokeSpritesheet.png'])
+        self.assertEqual(report['failed'], {})
+
+        manifestFile = open(os.path.join(self.outputDir, 'manifest.json'))
+        manifest = json.load(manifestFile)['animations']
+        manifestFile.close()
+        gifObj = pyganim.PygAnimation('banana.gif')
+        self.assertEqual(manifest['banana.gif']['numFrames'], gifObj.numFrames)
+        self.assertEqual(manifest['banana.gif']['durations'], gifObj._durations)
+        self.assertEqual(manifest['effects/smokeSpritesheet.png']['durations'], [50] * 10)
+        self.assertEqual(report['numFrames'], gifObj.numFrames + 11)
+
+        # a trimmed frame drawn at its offset matches the original frame
+        for i in range(gifObj.numFrames):
+            frame = manifest['banana.gif']['frames'][i]
+            builtSurf = pygame.Surface(gifObj.getFrame(i).get_size())
+            builtSurf.blit(pygame.image.load(os.path.join(self.outputDir, frame['file'])), frame['offset'])
+            origSurf = pygame.Surface(gifObj.getFrame(i).get_size())
+            origSurf.blit(gifObj.getFrame(i), (0, 0))
+            self.assertEqual(pygame.image.tostring(builtSurf, 'RGB'), pygame.image.tostring(origSurf, 'RGB'))
+
+    def test_skipUnchanged(self):
+        pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.assertEqual(report['built'], [])
+        self.assertEqual(len(report['skipped']), 3)
+
+        self.writeSidecar({'cols': 5, 'rows': 1}) # changing the sidecar file rebuilds the sheet
+        os.remove(os.path.join(self.sourceDir, 'effects', 'bolt1.png'))
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.assertEqual(report['built'], ['effects/smokeSpritesheet.png'])
+        self.assertEqual(report['skipped'], ['banana.gif'])
+        self.assertFalse(os.path.exists(os.path.join(self.outputDir, 'effects', 'bolt1.png', '000.png')))
+        self.assertFalse(os.path.exists(os.path.join(self.outputDir, 'effects', 'smokeSpritesheet.png', '005.png')))
+
+    def test_wrongNumberOfDurations(self):
+        self.writeSidecar({'cols': 10, 'rows': 1, 'durations': [50] * 9})
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.assertEqual(list(report['failed']), ['effects/smokeSpritesheet.png'])
+        self.assertTrue('9 durations' in report['failed']['effects/smokeSpritesheet.png'])
+
+    def test_keepOldOutputOnFailure(self):
+        pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.writeSidecar({'cols': 10, 'rows': 1, 'durations': [50] * 9}) # now fails to build
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.assertEqual(list(report['failed']), ['effects/smokeSpritesheet.png'])
+        manifestFile = open(os.path.join(self.outputDir, 'manifest.json'))
+        manifest = json.load(manifestFile)['animations']
+        manifestFile.close()
+        self.assertEqual(manifest['effects/smokeSpritesheet.png']['durations'], [50] * 10) # the last good build
+        for frame in manifest['effects/smokeSpritesheet.png']['frames']:
+            self.assertTrue(os.path.exists(os.path.join(self.outputDir, frame['file'])))
+
+        self.writeSidecar({'cols': 10, 'rows': 1, 'durations': 60})
+        report = pyganim.build.buildAssets(self.sourceDir, self.outputDir, workers=1)
+        self.assertEqual(report['built'], ['effects/smokeSpritesheet.png']) # built again once it's fixed
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        pyganim.IMAGE_CACHE = pyganim.ImageCache()
+
+    def tearDown(self):
+        pyganim.IMAGE_CACHE = None
+
+    def test_sharedSurfaces(self):
+        animObj1 = getTestAnimObj()
+        animObj2 = getTestAnimObj()
+        for i in range(NUM_BOLT_IMAGES):
+            self.assertEqual(id(animObj1._images[i]), id(animObj2._images[i]))
+
+        info = pyganim.IMAGE_CACHE.getInfo()
+        self.assertEqual(info['misses'], NUM_BOLT_IMAGES)
+        self.assertEqual(info['hits'], NUM_BOLT_IMAGES)
+        self.assertEqual(info['referencedEntries'], NUM_BOLT_IMAGES)
+
+    def test_releaseAndEviction(self):
+        animObj = getTestAnimObj()
+        animCopy = animObj.getCopy()
+        frameBytes = animObj._images[0].get_pitch() * BOLT_HEIGHT
+        pyganim.IMAGE_CACHE.maxBytes = frameBytes * 2
+
+        # referenced entries are never evicted, even when over budget
+        self.assertEqual(pyganim.IMAGE_CACHE.getInfo()['entries'], NUM_BOLT_IMAGES)
+
+        pyganim.IMAGE_CACHE.release(animObj)
+        self.assertEqual(pyganim.IMAGE_CACHE.getInfo()['entries'], NUM_BOLT_IMAGES) # the copy still holds references
+
+        del animCopy # releasing happens when the animation is garbage collected
+        info = pyganim.IMAGE_CACHE.getInfo()
+        self.assertEqual(info['referencedEntries'], 0)
+        self.assertTrue(info['bytes'] <= frameBytes * 2)
+
+        # the most recently used images are the ones kept
+        self.assertTrue(pyganim.IMAGE_CACHE.load('bolt10.png') is not None)
+        self.assertEqual(pyganim.IMAGE_CACHE.getInfo()['misses'], NUM_BOLT_IMAGES)
 
 
 class TestSpritesheet(unittest.TestCase):
@@ -486,6 +1331,709 @@ class TestSpritesheet(unittest.TestCase):
 
 
 
+class TestSpritesheetSlicing(unittest.TestCase):
+    NUM_SPRITES = 10
+    SMOKE_WIDTH = 96
+    SMOKE_HEIGHT = 94
+
+    def assertSmokeImages(self, images):
+        sheet = pygame.image.load('smokeSpritesheet.png')
+        self.assertEqual(len(images), self.NUM_SPRITES)
+        for i in range(self.NUM_SPRITES):
+            cell = sheet.subsurface((i * self.SMOKE_WIDTH, 0, self.SMOKE_WIDTH, self.SMOKE_HEIGHT))
+            self.assertEqual(images[i].get_size(), (self.SMOKE_WIDTH, self.SMOKE_HEIGHT))
+            self.assertEqual(pygame.image.tostring(images[i], 'RGBA'), pygame.image.tostring(cell, 'RGBA'))
+
+    def test_gridArgs(self):
+        self.assertSmokeImages(pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', width=self.SMOKE_WIDTH, height=self.SMOKE_HEIGHT))
+        self.assertSmokeImages(pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=self.NUM_SPRITES))
+
+    def test_subsurfaces(self):
+        images = pyganim.getImagesFromSpriteSheet('smokeSpritesheet.png', rows=1, cols=self.NUM_SPRITES, subsurfaces=True)
+        self.assertSmokeImages(images)
+        sheet = images[0].get_parent()
+        for i in range(self.NUM_SPRITES):
+            self.assertTrue(images[i].get_parent() is sheet)
+            self.assertEqual(images[i].get_offset(), (i * self.SMOKE_WIDTH, 0))
+
+    def test_getAnimationsFromSpriteSheet(self):
+        # treat the one-row sheet as two rows of half-height cells
+        animObjs = pyganim.getAnimationsFromSpriteSheet('smokeSpritesheet.png', rows=2, cols=self.NUM_SPRITES, durations=50)
+        self.assertEqual(len(animObjs), 2)
+        sheet = animObjs[0].getFrame(0).get_parent()
+        for animObj in animObjs:
+            self.assertEqual(animObj.numFrames, self.NUM_SPRITES)
+            self.assertEqual(animObj._durations, [50] * self.NUM_SPRITES)
+            for i in range(self.NUM_SPRITES):
+                self.assertTrue(animObj.getFrame(i).get_parent() is sheet)
+        self.assertEqual(animObjs[1].getFrame(3).get_offset(), (3 * self.SMOKE_WIDTH, self.SMOKE_HEIGHT // 2))
+
+        durations = list(range(10, 10 * (self.NUM_SPRITES + 1), 10))
+        animObjs = pyganim.getAnimationsFromSpriteSheet('smokeSpritesheet.png', rows=2, cols=self.NUM_SPRITES, durations=durations)
+        self.assertEqual(animObjs[1]._durations, durations)
+        for badDurations in (durations[:-1], durations + [10]):
+            self.assertRaises(ValueError, pyganim.getAnimationsFromSpriteSheet, 'smokeSpritesheet.png', rows=2, cols=self.NUM_SPRITES, durations=badDurations)
+
+
+class TestSpritesheetCache(unittest.TestCase):
+    def setUp(self):
+        # a 4x1 sheet of 10x10 cells: a sprite, a transparent cell, a solid color cell, and another sprite
+        sheet = pygame.Surface((40, 10), pygame.SRCALPHA, 32)
+        sheet.fill((255, 0, 0, 255), (0, 0, 5, 10))
+        sheet.fill((0, 0, 255, 255), (20, 0, 10, 10))
+        sheet.fill((0, 255, 0, 128), (30, 0, 3, 3))
+        self.cacheSpriteSheets = pyganim.CACHE_SPRITE_SHEETS
+        fd, self.sheetFilename = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        pygame.image.save(sheet, self.sheetFilename)
+        self.sheet = pygame.image.load(self.sheetFilename)
+
+    def tearDown(self):
+        pyganim.CACHE_SPRITE_SHEETS = self.cacheSpriteSheets
+        pyganim.clearSpriteSheetCache()
+        os.unlink(self.sheetFilename)
+
+    def test_skipBlank(self):
+        images = pyganim.getImagesFromSpriteSheet(self.sheetFilename, width=10, height=10, subsurfaces=True, skipBlank=True)
+        self.assertEqual([image.get_offset() for image in images], [(0, 0), (30, 0)])
+
+        images = pyganim.getImagesFromSpriteSheet(self.sheetFilename, width=10, height=10)
+        self.assertEqual(len(images), 4) # blank cells are kept by default
+
+        # rects are not skipped unless asked to
+        rects = [(0, 0, 10, 10), (10, 0, 10, 10)]
+        self.assertEqual(len(pyganim.getImagesFromSpriteSheet(self.sheetFilename, rects=rects)), 2)
+        self.assertEqual(len(pyganim.getImagesFromSpriteSheet(self.sheetFilename, rects=rects, skipBlank=True)), 1)
+
+    def test_isBlankCell(self):
+        # the fallback for when NumPy isn't installed should agree with the NumPy check
+        cells = [self.sheet.subsurface((x, 0, 10, 10)) for x in range(0, 40, 10)]
+        self.assertEqual([pyganim._isBlankCell(cell) for cell in cells], [False, True, True, False])
+
+        colorkeyed = pygame.Surface((10, 10))
+        colorkeyed.set_colorkey((0, 0, 0))
+        self.assertTrue(pyganim._isBlankCell(colorkeyed))
+        colorkeyed.set_at((5, 5), (1, 2, 3))
+        self.assertFalse(pyganim._isBlankCell(colorkeyed))
+
+    def test_cache(self):
+        images1 = pyganim.getImagesFromSpriteSheet(self.sheetFilename, cols=4, rows=1)
+        images2 = pyganim.getImagesFromSpriteSheet(self.sheetFilename, cols=4, rows=1)
+        self.assertFalse(images1[0] is images2[0]) # not cached by default
+
+        pyganim.CACHE_SPRITE_SHEETS = True
+        images1 = pyganim.getImagesFromSpriteSheet(self.sheetFilename, cols=4, rows=1)
+        images2 = pyganim.getImagesFromSpriteSheet(self.sheetFilename, cols=4, rows=1)
+        self.assertFalse(images1 is images2)
+        for i in range(len(images1)):
+            self.assertTrue(images1[i] is images2[i])
+
+        pyganim.clearSpriteSheetCache()
+        images3 = pyganim.getImagesFromSpriteSheet(self.sheetFilename, cols=4, rows=1)
+        self.assertFalse(images1[0] is images3[0])
+
+
+class TestSpritesheetData(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def writeData(self, data):
+        filename = os.path.join(self.tempDir, 'sheet.json')
+        dataFile = open(filename, 'w')
+        json.dump(data, dataFile)
+        dataFile.close()
+        return filename
+
+    def test_asepriteHash(self):
+        frames = {}
+        for i in range(10):
+            frames['smoke %s.aseprite' % i] = {'frame': {'x': i * 96, 'y': 0, 'w': 96, 'h': 94}, 'rotated': False, 'trimmed': False,
+                                               'spriteSourceSize': {'x': 0, 'y': 0, 'w': 96, 'h': 94}, 'sourceSize': {'w': 96, 'h': 94},
+                                               'duration': 50 + i}
+        tags = [{'name': 'puff', 'from': 0, 'to': 3, 'direction': 'forward'},
+                {'name': 'unpuff', 'from': 0, 'to': 3, 'direction': 'reverse'},
+                {'name': 'bounce', 'from': 0, 'to': 3, 'direction': 'pingpong'},
+                {'name': 'bounceBack', 'from': 0, 'to': 3, 'direction': 'pingpong_reverse'}]
+        filename = self.writeData({'frames': frames, 'meta': {'image': os.path.abspath('smokeSpritesheet.png'), 'frameTags': tags}})
+
+        animations = pyganim.getAnimationsFromSpriteSheetData(filename)
+        self.assertEqual(sorted(animations.keys(), key=str), [None, 'bounce', 'bounceBack', 'puff', 'unpuff'])
+        self.assertEqual(animations[None].numFrames, 10)
+        self.assertEqual(animations['puff']._durations, [50, 51, 52, 53])
+        self.assertEqual(animations['unpuff']._durations, [53, 52, 51, 50])
+        self.assertEqual(animations['bounce']._durations, [50, 51, 52, 53, 52, 51])
+        self.assertEqual(animations['bounceBack']._durations, [53, 52, 51, 50, 51, 52])
+
+        # every animation shares the one sheet Surface
+        sheet = animations[None].getFrame(0).get_parent()
+        for animObj in animations.values():
+            for i in range(animObj.numFrames):
+                self.assertTrue(animObj.getFrame(i).get_parent() is sheet)
+        self.assertTrue(animations['puff'].getFrame(2) is animations['unpuff'].getFrame(1))
+        self.assertEqual(pygame.image.tostring(animations[None].getFrame(3), 'RGBA'), pygame.image.tostring(sheet.subsurface((288, 0, 96, 94)), 'RGBA'))
+
+    def test_texturePackerArray(self):
+        # a 20 x 10 frame with a 4 x 6 opaque area at (5, 3), trimmed, once as is and once rotated
+        frameSurf = pygame.Surface((20, 10), pygame.SRCALPHA, 32)
+        frameSurf.fill((255, 0, 0, 255), (5, 3, 4, 6))
+        frameSurf.fill((0, 255, 0, 255), (5, 3, 4, 1))
+        trimmedSurf = frameSurf.subsurface((5, 3, 4, 6))
+        sheet = pygame.Surface((16, 16), pygame.SRCALPHA, 32)
+        sheet.blit(trimmedSurf, (0, 0))
+        sheet.blit(pygame.transform.rotate(trimmedSurf, -90), (8, 0)) # rotated clockwise, as TexturePacker does
+        pygame.image.save(sheet, os.path.join(self.tempDir, 'sheet.png'))
+
+        frames = []
+        for name, x, rotated in (('upright.png', 0, False), ('rotated.png', 8, True)):
+            frames.append({'filename': name, 'frame': {'x': x, 'y': 0, 'w': 4, 'h': 6}, 'rotated': rotated, 'trimmed': True,
+                           'spriteSourceSize': {'x': 5, 'y': 3, 'w': 4, 'h': 6}, 'sourceSize': {'w': 20, 'h': 10}})
+        filename = self.writeData({'frames': frames, 'meta': {'image': 'sheet.png'}})
+
+        animObj = pyganim.getAnimationsFromSpriteSheetData(filename, loop=False)[None]
+        self.assertFalse(animObj.loop)
+        self.assertEqual(animObj._durations, [pyganim.DEFAULT_DURATION] * 2)
+        for i in range(2):
+            self.assertEqual(pygame.image.tostring(animObj.getFrame(i), 'RGBA'), pygame.image.tostring(trimmedSurf, 'RGBA'))
+            self.assertEqual(animObj.getFrameOffset(i), (5, 3))
+        self.assertEqual(animObj.getRect(), pygame.Rect(0, 0, 20, 10))
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestAnimationPool(unittest.TestCase):
+    def tearDown(self):
+        pyganim.endFrame()
+
+    def test_frameNums(self):
+        boltObj = getTestAnimObj()
+        mixedObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt2.png', 50), ('bolt3.png', 30), ('bolt4.png', 250)], loop=False)
+        pool = pyganim.pool.AnimationPool([boltObj, mixedObj])
+        bolts = pool.add(0, count=3)
+        mixed = pool.add(1, count=2, position=(10, 20))
+        self.assertEqual(len(pool), 5)
+        self.assertEqual(list(pool.getStates()), [pyganim.STOPPED] * 5)
+
+        now = pyganim.beginFrame(1000000)
+        pool.play()
+        for dt in (0, 99, 100, 150, 179, 180, 429, 1050):
+            pyganim.beginFrame(now + dt)
+            boltObj.play(now)
+            mixedObj.play(now)
+            frameNums = pool.getFrameNums()
+            self.assertEqual(list(frameNums[:3]), [boltObj.currentFrameNum] * 3, dt)
+            self.assertEqual(list(frameNums[3:]), [mixedObj.currentFrameNum] * 2, dt)
+            boltObj.stop()
+            mixedObj.stop()
+        self.assertEqual(list(pool.getStates(mixed)), [pyganim.STOPPED] * 2) # finished playing
+
+    def test_playPauseSeek(self):
+        pool = pyganim.pool.AnimationPool([getTestAnimObj()])
+        instances = pool.add(0, count=4)
+        now = pyganim.beginFrame(1000000)
+        pool.play()
+        pyganim.beginFrame(now + 250)
+        pool.pause(instances[:2])
+        pyganim.beginFrame(now + 500)
+        self.assertEqual(list(pool.getElapsed()), [250, 250, 500, 500])
+        pool.play(instances[:2])
+        pool.stop(numpy.array([False, False, False, True]))
+        pyganim.beginFrame(now + 600)
+        self.assertEqual(list(pool.getElapsed()), [350, 350, 600, 0])
+        self.assertEqual(list(pool.getStates()), [pyganim.PLAYING] * 3 + [pyganim.STOPPED])
+
+        pool.seek(instances[2:], [120, 1230])
+        self.assertEqual(list(pool.getElapsed(instances[2:])), [120, 230])
+        self.assertEqual(list(pool.getStates(instances[2:])), [pyganim.PLAYING, pyganim.PAUSED])
+
+        pool.setRate(instances[0], 2.0)
+        pyganim.beginFrame(now + 650)
+        self.assertEqual(list(pool.getElapsed(instances[:2])), [450, 400])
+
+        pool.remove(instances[1])
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(list(pool.add(0)), [instances[1]]) # removed indexes are reused
+
+    def test_blit(self):
+        animObj = pyganim.PygAnimation([('bolt1.png', 100), ('bolt2.png', 100)])
+        animObj.anchor(pyganim.CENTER)
+        pool = pyganim.pool.AnimationPool([animObj], capacity=1)
+        instances = pool.add(0, count=3) # the arrays grow past the capacity
+        pool.positions[:] = [(0, 0), (BOLT_WIDTH, 0), (BOLT_WIDTH * 2, 0)]
+        pool.visible[2] = False
+        now = pyganim.beginFrame(1000000)
+        pool.play(instances[:1])
+        pool.seek(instances[1], 100) # paused on the second frame
+
+        destSurf = pygame.Surface((BOLT_WIDTH * 3, BOLT_HEIGHT))
+        pool.blit(destSurf)
+        expectedSurf = pygame.Surface((BOLT_WIDTH * 3, BOLT_HEIGHT))
+        animObj.pause() # (blitFrameNum() doesn't draw stopped animations)
+        animObj.blitFrameNum(0, expectedSurf, (0, 0))
+        animObj.blitFrameNum(1, expectedSurf, (BOLT_WIDTH, 0))
+        self.assertEqual(pygame.image.tostring(destSurf, 'RGB'), pygame.image.tostring(expectedSurf, 'RGB'))
+
+    def test_deltaEncodedClip(self):
+        frames = [(pygame.image.load('bolt%s.png' % num), 100) for num in range(1, NUM_BOLT_IMAGES + 1)]
+        animObj = pyganim.PygAnimation(frames)
+        animObj.deltaEncode()
+        pool = pyganim.pool.AnimationPool([animObj])
+        instances = pool.add(0, count=2)
+        pool.seek(instances, [0, 300]) # paused on the first and fourth frames
+        for i, instance in enumerate(instances):
+            pool.positions[instance] = (i * BOLT_WIDTH, 0)
+
+        destSurf = pygame.Surface((BOLT_WIDTH * 2, BOLT_HEIGHT))
+        pool.blit(destSurf)
+        expectedSurf = pygame.Surface((BOLT_WIDTH * 2, BOLT_HEIGHT))
+        expectedSurf.blit(frames[0][0], (0, 0))
+        expectedSurf.blit(frames[3][0], (BOLT_WIDTH, 0))
+        self.assertEqual(pygame.image.tostring(destSurf, 'RGB'), pygame.image.tostring(expectedSurf, 'RGB'))
+
+
+class TestFrameClock(unittest.TestCase):
+    def setUp(self):
+        self.timeFunc = pyganim.TIME_FUNC
+        self.numClockReads = 0
+        def countingTimeFunc():
+            self.numClockReads += 1
+            return self.timeFunc()
+        pyganim.TIME_FUNC = countingTimeFunc
+
+    def tearDown(self):
+        pyganim.endFrame()
+        pyganim.TIME_FUNC = self.timeFunc
+
+    def test_beginFrame(self):
+        animObj = getTestAnimObj()
+        otherObj = getTestAnimObj()
+        destSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+        now = pyganim.beginFrame(1000000)
+        self.assertEqual(now, 1000000)
+        animObj.play()
+        otherObj.play(now - 250)
+
+        pyganim.beginFrame(now + 150)
+        self.numClockReads = 0
+        animObj.blit(destSurf)
+        otherObj.blit(destSurf)
+        self.assertEqual(self.numClockReads, 0) # every animation used the sampled time
+        self.assertEqual(animObj.currentFrameNum, 1)
+        self.assertEqual(otherObj.currentFrameNum, 4)
+
+        pyganim.endFrame()
+        self.numClockReads = 0
+        animObj.blit(destSurf)
+        self.assertEqual(self.numClockReads, 1) # blit() reads the clock once
+
+        self.numClockReads = 0
+        now = pyganim.beginFrame() # samples TIME_FUNC()
+        self.assertEqual(self.numClockReads, 1)
+        self.assertEqual(pyganim._nowNs(), now * 1000000)
+
+    def test_subMillisecondTimes(self):
+        # start times keep their fraction of a millisecond, so each frame is shown for exactly its duration
+        animObj = getTestAnimObj()
+        now = pyganim.beginFrame(1000.4)
+        animObj.play()
+        pyganim.beginFrame(now + BOLT_DURATIONS - 0.1)
+        self.assertEqual(animObj.currentFrameNum, 0)
+        pyganim.beginFrame(now + BOLT_DURATIONS)
+        self.assertEqual(animObj.currentFrameNum, 1)
+
+    def test_monotonicClock(self):
+        pyganim.TIME_FUNC = self.timeFunc
+        self.assertTrue(pyganim.TIME_FUNC is pyganim._defaultTimeFunc)
+        before = pyganim._nowNs()
+        self.assertTrue(isinstance(before, int) or runningOnPython2)
+        self.assertTrue(pyganim._nowNs() >= before)
+        self.assertTrue(abs(pyganim.TIME_FUNC() - before // 1000000) < 1000)
+
+    def test_finishedAtSampledTime(self):
+        animObj = getTestAnimObj()
+        animObj.loop = False
+        destSurf = pygame.Surface((BOLT_WIDTH, BOLT_HEIGHT))
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS - 1)
+        animObj.blit(destSurf)
+        self.assertEqual(animObj.state, pyganim.PLAYING)
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS)
+        animObj.blit(destSurf)
+        self.assertEqual(animObj.state, pyganim.STOPPED)
+
+
+class TestEventScheduler(unittest.TestCase):
+    def tearDown(self):
+        pyganim.endFrame()
+
+    def test_frameAndLoopEvents(self):
+        animObj = getTestAnimObj()
+        scheduler = pyganim.events.EventScheduler()
+        events = []
+        scheduler.onFrame(animObj, 3, lambda anim, frameNum: events.append(('frame', frameNum, anim.currentFrameNum)))
+        scheduler.onFrame(animObj, 0, lambda anim, frameNum: events.append(('frame', frameNum, anim.currentFrameNum)))
+        scheduler.onLoop(animObj, lambda anim: events.append(('loop',)))
+        scheduler.addMarker(animObj, 250, lambda anim, name: events.append(('marker', name)), 'halfway')
+
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        self.assertEqual(scheduler.update(), 1)
+        self.assertEqual(events, [('frame', 0, 0)])
+        pyganim.beginFrame(now + 299)
+        self.assertEqual(scheduler.update(), 1)
+        pyganim.beginFrame(now + 300)
+        self.assertEqual(scheduler.update(), 1)
+        self.assertEqual(events[1:], [('marker', 'halfway'), ('frame', 3, 3)])
+
+        del events[:]
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS)
+        self.assertEqual(scheduler.update(), 1)
+        self.assertEqual(events, [('loop',), ('frame', 0, 0)])
+        self.assertEqual(scheduler.update(), 0)
+
+        scheduler.remove(animObj)
+        pyganim.beginFrame(now + 10000)
+        self.assertEqual(scheduler.update(), 0)
+
+    def test_finishEvent(self):
+        animObj = getTestAnimObj()
+        animObj.loop = False
+        scheduler = pyganim.events.EventScheduler()
+        finished = []
+        scheduler.onFinish(animObj, finished.append)
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS - 1)
+        scheduler.update()
+        self.assertEqual(finished, [])
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS * 3)
+        scheduler.update()
+        self.assertEqual(finished, [animObj])
+        scheduler.update()
+        self.assertEqual(finished, [animObj])
+
+        animObj.play() # replays from the beginning
+        pyganim.beginFrame(now + NUM_BOLT_IMAGES * BOLT_DURATIONS * 4)
+        scheduler.update()
+        self.assertEqual(finished, [animObj, animObj])
+
+    def test_pauseRateAndSeek(self):
+        animObj = getTestAnimObj()
+        scheduler = pyganim.events.EventScheduler()
+        events = []
+        scheduler.onFrame(animObj, 5, lambda anim, frameNum: events.append((pyganim._nowNs() // 1000000, anim.currentFrameNum)))
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        pyganim.beginFrame(now + 200)
+        animObj.pause()
+        pyganim.beginFrame(now + 2000)
+        scheduler.update()
+        self.assertEqual(events, []) # paused animations don't reach frame 5
+
+        animObj.play() # resumes 200 ms in, so frame 5 is 300 ms away
+        pyganim.beginFrame(now + 2299)
+        scheduler.update()
+        self.assertEqual(events, [])
+        pyganim.beginFrame(now + 2300)
+        scheduler.update()
+        self.assertEqual(events, [(now + 2300, 5)])
+
+        pyganim.beginFrame(now + 2400)
+        animObj.elapsed = 450 # seeking forward makes frame 5 sooner
+        pyganim.beginFrame(now + 2449)
+        scheduler.update()
+        self.assertEqual(len(events), 1)
+        pyganim.beginFrame(now + 2450)
+        scheduler.update()
+        self.assertEqual(events[1], (now + 2450, 5))
+
+        animObj.rate = 0.5
+        for i in range(2451, 6000):
+            pyganim.beginFrame(now + i)
+            scheduler.update()
+        self.assertEqual(len(events), 4) # at half speed, frame 5 comes every 2 seconds
+        for eventTime, frameNum in events:
+            self.assertEqual(frameNum, 5) # each event happened as the animation reached frame 5
+
+
+class TestFrameChanged(unittest.TestCase):
+    def tearDown(self):
+        pyganim.endFrame()
+
+    def test_frameChanged(self):
+        animObj = getTestAnimObj()
+        self.assertTrue(animObj.frameChanged()) # always True the first time
+        self.assertFalse(animObj.frameChanged())
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        self.assertTrue(animObj.frameChanged()) # stopped animations don't draw anything
+        pyganim.beginFrame(now + BOLT_DURATIONS - 1)
+        self.assertFalse(animObj.frameChanged())
+        pyganim.beginFrame(now + BOLT_DURATIONS)
+        self.assertTrue(animObj.frameChanged())
+        animObj.scale((BOLT_WIDTH * 2, BOLT_HEIGHT * 2))
+        self.assertTrue(animObj.frameChanged())
+        animObj.pause()
+        self.assertFalse(animObj.frameChanged())
+        animObj.visibility = False
+        self.assertTrue(animObj.frameChanged())
+
+        copyObj = animObj.getCopy()
+        copyObj.pause()
+        self.assertTrue(copyObj.frameChanged())
+        copyObj.flip(True, False) # gets its own clip
+        self.assertTrue(copyObj.frameChanged())
+
+    def test_spritesOfDeltaEncodedAnimation(self):
+        frames = [(pygame.image.load('bolt%s.png' % num), 100) for num in range(1, NUM_BOLT_IMAGES + 1)]
+        animObj = pyganim.PygAnimation(frames)
+        animObj.deltaEncode()
+        copies = animObj.getCopies(2)
+        sprites = [pyganim.sprite.AnimatedSprite(copyObj) for copyObj in copies]
+        for copyObj, frameNum, sprite in zip(copies, (1, 5), sprites):
+            copyObj.pause()
+            copyObj.currentFrameNum = frameNum
+            self.assertTrue(sprite.update())
+        for frameNum, sprite in zip((1, 5), sprites):
+            self.assertEqual(pygame.image.tostring(sprite.image, 'RGBA'), pygame.image.tostring(frames[frameNum][0], 'RGBA'))
+
+    def test_dirtySprite(self):
+        animObj = getTestAnimObj()
+        animObj.anchor(pyganim.CENTER)
+        group = pygame.sprite.LayeredDirty()
+        sprite = pyganim.sprite.AnimatedDirtySprite(animObj, (10, 20), group)
+        self.assertEqual(sprite.visible, 0) # stopped
+
+        now = pyganim.beginFrame(1000000)
+        animObj.play()
+        numRedraws = 0
+        for i in range(144):
+            pyganim.beginFrame(now + i * 1000.0 / 144)
+            group.update()
+            if sprite.dirty:
+                numRedraws += 1
+                sprite.dirty = 0
+        self.assertEqual(numRedraws, NUM_BOLT_IMAGES) # once per frame, not once per update()
+        self.assertEqual(sprite.image, animObj.getCurrentFrame())
+        dx, dy = animObj.getFrameOffset(animObj.currentFrameNum)
+        self.assertEqual(sprite.rect.topleft, (10 + dx, 20 + dy))
+
+        sprite.position = (30, 20)
+        group.update()
+        self.assertEqual(sprite.rect.topleft, (30 + dx, 20 + dy))
+        self.assertEqual(sprite.dirty, 1)
+
+        animObj.stop()
+        group.update()
+        self.assertEqual(sprite.visible, 0)
+
+
+class TestVirtualClock(unittest.TestCase):
+    def test_tick(self):
+        clock = pyganim.VirtualClock(1000)
+        self.assertEqual(clock(), 1000)
+        self.assertEqual(clock.tick(16.5), 1016.5)
+        clock.setTime(50)
+        self.assertEqual(clock(), 50)
+
+        animObj = getTestAnimObj(clock)
+        otherObj = getTestAnimObj() # on the pyganim clock
+        animObj.play()
+        otherObj.play()
+        for i in range(1, NUM_BOLT_IMAGES):
+            clock.tick(BOLT_DURATIONS)
+            self.assertEqual(animObj.currentFrameNum, i)
+            self.assertEqual(otherObj.currentFrameNum, 0) # the pyganim clock hardly moved
+
+    def test_changingClocks(self):
+        clock = pyganim.VirtualClock(500000)
+        animObj = getTestAnimObj()
+        animObj.fastForward(250)
+        animObj.clock = clock
+        self.assertEqual(animObj.elapsed, 250)
+        animObj.play()
+        clock.tick(BOLT_DURATIONS)
+        self.assertEqual(animObj.elapsed, 350)
+        animObj.clock = None
+        self.assertTrue(abs(animObj.elapsed - 350) < 100)
+
+    def test_copiesKeepClock(self):
+        clock = pyganim.VirtualClock(1000)
+        animObj = getTestAnimObj(clock)
+        for copyObj in animObj.getCopies(2) + [animObj.getCopy()] + animObj.getPlayheads(2):
+            self.assertTrue(copyObj.clock is clock)
+            copyObj.play()
+            clock.tick(BOLT_DURATIONS)
+            self.assertEqual(copyObj.currentFrameNum, 1)
+        self.assertEqual(getTestAnimObj().getCopy().clock, None)
+
+    def test_getTime(self):
+        self.assertEqual(pyganim.beginFrame(1234.5), 1234.5)
+        self.assertEqual(pyganim.getTime(), 1234.5)
+        now = pyganim.beginFrame()
+        pyganim.endFrame()
+        self.assertTrue(pyganim.getTime() >= now) # reads the clock again
+
+    def test_conductorOfClockedAnimations(self):
+        # a conductor without a clock leaves each animation on its own
+        clocks = [pyganim.VirtualClock(1000), pyganim.VirtualClock(50000)]
+        animObjs = [getTestAnimObj(clock) for clock in clocks]
+        conductor = pyganim.PygConductor(animObjs)
+        conductor.play()
+        clocks[0].tick(250)
+        clocks[1].tick(BOLT_DURATIONS)
+        self.assertEqual([animObj.elapsed for animObj in animObjs], [250, BOLT_DURATIONS])
+        conductor.pause()
+        clocks[0].tick(250)
+        self.assertEqual(animObjs[0].elapsed, 250)
+        conductor.togglePause()
+        clocks[0].tick(50)
+        self.assertEqual(animObjs[0].elapsed, 300)
+
+    def test_conductorPoolAndEvents(self):
+        clock = pyganim.VirtualClock()
+        animObjs = [getTestAnimObj(), getTestAnimObj()]
+        conductor = pyganim.PygConductor(animObjs)
+        conductor.clock = clock
+        conductor.play()
+        clock.tick(BOLT_DURATIONS * 3)
+        self.assertEqual([animObj.currentFrameNum for animObj in animObjs], [3, 3])
+        conductor.add(getTestAnimObj())
+        self.assertTrue(conductor.animations[2].clock is clock)
+
+        scheduler = pyganim.events.EventScheduler(clock)
+        events = []
+        scheduler.onFrame(animObjs[0], 5, lambda anim, frameNum: events.append(frameNum))
+        clock.tick(BOLT_DURATIONS * 2)
+        scheduler.update()
+        self.assertEqual(events, [5])
+
+        if numpy is not None:
+            pool = pyganim.pool.AnimationPool([animObjs[0]], clock=clock)
+            instances = pool.add(0, count=2)
+            pool.play(instances)
+            clock.tick(BOLT_DURATIONS * 4)
+            self.assertEqual(list(pool.getFrameNums()), [4, 4])
+
+
+class TestSharedConductor(unittest.TestCase):
+    def test_sharedTimeline(self):
+        clock = pyganim.VirtualClock()
+        animObjs = getTestAnimObj().getCopies(8)
+        conductor = pyganim.PygConductor(animObjs, shared=True)
+        conductor.clock = clock
+        self.assertEqual(conductor.state, pyganim.STOPPED)
+        conductor.play()
+        clock.tick(250)
+        self.assertEqual([animObj.currentFrameNum for animObj in animObjs], [2] * 8)
+
+        conductor.pause()
+        clock.tick(1000)
+        self.assertEqual(conductor.elapsed, 250)
+        self.assertEqual(animObjs[0].currentFrameNum, 2)
+        self.assertEqual(animObjs[0]._playingStartTime, 0) # pausing only changed the timeline
+
+        conductor.setPhase(animObjs[1], 100)
+        self.assertEqual(conductor.getPhase(animObjs[1]), 100)
+        self.assertEqual(animObjs[1].currentFrameNum, 3)
+        conductor.elapsed = 550
+        self.assertEqual(animObjs[0].currentFrameNum, 5)
+        self.assertEqual(animObjs[1].currentFrameNum, 6)
+        conductor.nextFrame()
+        self.assertEqual(animObjs[0].currentFrameNum, 6)
+        conductor.prevFrame(2)
+        self.assertEqual(animObjs[0].currentFrameNum, 4)
+        self.assertEqual(animObjs[1].currentFrameNum, 5)
+        conductor.rewind()
+        self.assertEqual(animObjs[0].elapsed, 0)
+
+        conductor.play()
+        clock.tick(BOLT_DURATIONS * (NUM_BOLT_IMAGES + 1)) # loops back around
+        self.assertEqual(animObjs[0].currentFrameNum, 1)
+        newObj = getTestAnimObj()
+        conductor.add(newObj)
+        self.assertEqual(newObj.currentFrameNum, 1) # in step with the rest
+
+        conductor.stop()
+        self.assertEqual([animObj.state for animObj in conductor.animations], [pyganim.STOPPED] * 9)
+        conductor.play()
+        clock.tick(BOLT_DURATIONS)
+        self.assertEqual(newObj.currentFrameNum, 1)
+        self.assertEqual(newObj.state, pyganim.PLAYING)
+
+    def test_sharedTimelineFinishes(self):
+        clock = pyganim.VirtualClock()
+        animObj = getTestAnimObj()
+        animObj.loop = False
+        conductor = pyganim.PygConductor(animObj, shared=True)
+        conductor.clock = clock
+        conductor.play()
+        clock.tick(BOLT_DURATIONS * NUM_BOLT_IMAGES)
+        self.assertTrue(animObj.isFinished())
+        self.assertEqual(animObj.state, pyganim.STOPPED)
+        self.assertRaises(TypeError, pyganim.PygConductor, animObj, sharde=True)
+
+        conductor.rewind() # plays the finished animation again
+        self.assertEqual(animObj.state, pyganim.PLAYING)
+        clock.tick(BOLT_DURATIONS)
+        self.assertEqual(animObj.currentFrameNum, 1)
+        conductor.elapsed = BOLT_DURATIONS * NUM_BOLT_IMAGES - 1
+        self.assertEqual(animObj.currentFrameNum, NUM_BOLT_IMAGES - 1)
+        self.assertEqual(conductor.elapsed, animObj.elapsed)
+
+    def test_sharedTimelineElapsed(self):
+        # elapsed is the first animation's, in both kinds of conductor
+        clock = pyganim.VirtualClock()
+        for shared in (False, True):
+            conductor = pyganim.PygConductor(getTestAnimObj(clock), getTestAnimObj(clock), shared=shared)
+            conductor.clock = clock
+            conductor.play()
+            clock.tick(BOLT_DURATIONS * NUM_BOLT_IMAGES + 250.5) # looped once
+            self.assertEqual(conductor.elapsed, 250, shared)
+            self.assertEqual(type(conductor.elapsed), int, shared)
+            conductor.elapsed = BOLT_DURATIONS * NUM_BOLT_IMAGES + 120 # wraps around
+            self.assertEqual(conductor.elapsed, 120, shared)
+            conductor.stop()
+            self.assertEqual(conductor.elapsed, 0, shared)
+
+    def test_sharedTimelineEvents(self):
+        clock = pyganim.VirtualClock(1000)
+        animObjs = getTestAnimObj().getCopies(2)
+        animObjs[1].loop = False
+        conductor = pyganim.PygConductor(animObjs, shared=True)
+        conductor.clock = clock
+        scheduler = pyganim.events.EventScheduler(clock)
+        events = []
+        scheduler.onFrame(animObjs[0], 2, lambda anim, frameNum: events.append((clock(), 'frame')))
+        scheduler.onFinish(animObjs[1], lambda anim: events.append((clock(), 'finish')))
+
+        conductor.play()
+        for i in range(500):
+            clock.tick(1)
+            scheduler.update()
+        self.assertEqual(events, [(1200, 'frame')])
+        conductor.pause()
+        for i in range(2000):
+            clock.tick(1)
+            scheduler.update()
+        self.assertEqual(events, [(1200, 'frame')]) # nothing happens while paused
+
+        conductor.play() # at 500 ms on the timeline
+        for i in range(1000):
+            clock.tick(1)
+            scheduler.update()
+        self.assertEqual(events, [(1200, 'frame'), (4000, 'finish'), (4200, 'frame')])
+        self.assertEqual(animObjs[1].state, pyganim.STOPPED)
+
+        conductor.elapsed = 150 # both animations play from 150 ms again
+        for i in range(1000):
+            clock.tick(1)
+            scheduler.update()
+        self.assertEqual(events, [(1200, 'frame'), (4000, 'finish'), (4200, 'frame'), (4550, 'frame'), (5350, 'finish')])
+
+
 class MiscTests(unittest.TestCase):
     # This is here just to make sure the test images of the lightning bolts haven't changed.
     def test_getBoundedValue(self):
@@ -519,6 +2067,26 @@ class MiscTests(unittest.TestCase):
         self.assertEqual(pyganim.findStartTime(st, 3999), 2)
         self.assertEqual(pyganim.findStartTime(st, 4000), 3)
         self.assertEqual(pyganim.findStartTime(st, 9999999), 4)
+        self.assertEqual(pyganim.findStartTime(st, -1), 0)
+
+    def test_frameLookup(self):
+        # every kind of lookup gives the same answers as findStartTime()
+        for durations in ([100] * 10, [100, 50, 150, 250], [100, 0, 100], [33.5, 12.25, 80], [7, 1000003]):
+            startTimes = pyganim._getStartTimes(durations)
+            lookup = pyganim._FrameLookup(startTimes)
+            for target in list(range(-2, int(startTimes[-1]) + 3, 7)) + [t - 0.5 for t in startTimes] + startTimes:
+                self.assertEqual(lookup.find(target), pyganim.findStartTime(startTimes, target), (durations, target))
+
+        self.assertEqual(pyganim._FrameLookup(pyganim._getStartTimes([100] * 10))._step, 100)
+        self.assertEqual(pyganim._FrameLookup(pyganim._getStartTimes([100, 50, 150]))._table, [0, 0, 1, 2, 2, 2])
+        self.assertTrue(pyganim._FrameLookup(pyganim._getStartTimes([7, 1000003]))._array is not None) # too many slices for a table
+
+        animObj = getTestAnimObj()
+        animObj.currentFrameNum = 3
+        self.assertEqual(animObj.currentFrameNum, 3)
+        animObj._durations = [200] + animObj._durations[1:]
+        animObj._startTimes = pyganim._getStartTimes(animObj._durations) # replacing the start times replaces the lookup
+        self.assertEqual(animObj.clip._findFrameNum(250), 1)
 
 
 if __name__ == '__main__':